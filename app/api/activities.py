@@ -1,51 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from collections import defaultdict
 
-from app.database import get_db
+from app.database import get_db, async_endpoint
 from app.models.activity import Activity as ActivityModel
+from app.models.archived_event import ArchivedEvent
+from app.models.recurrence_rule import RecurrenceRule
+from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.hierarchy import add_activity_node, move_activity_node, remove_activity_node
+from app.recurrence import has_recurrence_rules
+from app.rollup import remove_activity_rollup, get_activity_months
+from app.changelog import log_changes
+from app.live import change, change_feed
+from app.versioning import bump_data_version
+from app.view_cache import view_cache
 from app.schemas import Activity, ActivityCreate, ActivityUpdate, ActivityWithChildren
 
 router = APIRouter()
 
 @router.post("/", response_model=Activity)
+@async_endpoint
 def create_activity(activity: ActivityCreate, db: Session = Depends(get_db)):
-    if activity.parent_id:
+    if activity.parent_id is not None:
         parent = db.query(ActivityModel).filter(ActivityModel.id == activity.parent_id).first()
         if not parent:
             raise HTTPException(status_code=404, detail="Parent activity not found")
     
-    db_activity = ActivityModel(**activity.dict())
+    db_activity = ActivityModel(**activity.model_dump())
     db.add(db_activity)
+    db.flush()
+    add_activity_node(db, db_activity.id, db_activity.parent_id)
+    changes = [change("activity", "create", db_activity.id)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
     db.commit()
+    # 新活动不出现在任何缓存视图中
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
     db.refresh(db_activity)
     return db_activity
 
 @router.get("/", response_model=List[Activity])
-def get_activities(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    activities = db.query(ActivityModel).offset(skip).limit(limit).all()
+@async_endpoint
+def get_activities(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: str = None,
+    db: Session = Depends(get_db)
+):
+    """按 id 排序分页；下一页游标通过 X-Next-Cursor 响应头返回"""
+    query = db.query(ActivityModel)
+    if cursor:
+        query = query.filter(ActivityModel.id > decode_cursor(cursor, int)[0])
+    
+    query = query.order_by(ActivityModel.id)
+    if skip and not cursor:
+        query = query.offset(skip)
+    
+    activities = query.limit(limit + 1).all()
+    if len(activities) > limit:
+        activities = activities[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(activities[-1].id)
     return activities
 
 @router.get("/tree", response_model=List[ActivityWithChildren])
-def get_activity_tree(db: Session = Depends(get_db)):
-    def build_tree(parent_id=None):
-        children = db.query(ActivityModel).filter(ActivityModel.parent_id == parent_id).all()
+@async_endpoint
+def get_activity_tree(
+    root_id: Optional[int] = None,
+    max_depth: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """一次查询加载所有活动，在内存中按 parent_id 组装树
+
+    root_id 指定时只返回该活动下的子树；max_depth 限制返回的层数，
+    超出深度的节点 children 为空，供前端按需展开。
+    """
+    rows = db.query(
+        ActivityModel.id,
+        ActivityModel.name,
+        ActivityModel.parent_id,
+        ActivityModel.description,
+        ActivityModel.created_at
+    ).order_by(ActivityModel.id).all()
+    
+    children_by_parent = defaultdict(list)
+    for row in rows:
+        children_by_parent[row.parent_id].append(row)
+    
+    if root_id is not None and not any(row.id == root_id for row in rows):
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    def build_tree(parent_id, depth):
         result = []
-        for child in children:
-            child_dict = {
+        for child in children_by_parent.get(parent_id, []):
+            expand = max_depth is None or depth < max_depth
+            result.append({
                 "id": child.id,
                 "name": child.name,
                 "parent_id": child.parent_id,
                 "description": child.description,
                 "created_at": child.created_at,
-                "children": build_tree(child.id)
-            }
-            result.append(ActivityWithChildren(**child_dict))
+                "children": build_tree(child.id, depth + 1) if expand else []
+            })
         return result
     
-    return build_tree()
+    return build_tree(root_id, 1)
 
 @router.get("/{activity_id}", response_model=Activity)
+@async_endpoint
 def get_activity(activity_id: int, db: Session = Depends(get_db)):
     activity = db.query(ActivityModel).filter(ActivityModel.id == activity_id).first()
     if activity is None:
@@ -53,30 +119,77 @@ def get_activity(activity_id: int, db: Session = Depends(get_db)):
     return activity
 
 @router.put("/{activity_id}", response_model=Activity)
+@async_endpoint
 def update_activity(activity_id: int, activity: ActivityUpdate, db: Session = Depends(get_db)):
     db_activity = db.query(ActivityModel).filter(ActivityModel.id == activity_id).first()
     if db_activity is None:
         raise HTTPException(status_code=404, detail="Activity not found")
     
-    update_data = activity.dict(exclude_unset=True)
-    if "parent_id" in update_data and update_data["parent_id"]:
+    update_data = activity.model_dump(exclude_unset=True)
+    if update_data.get("parent_id") is not None:
         parent = db.query(ActivityModel).filter(ActivityModel.id == update_data["parent_id"]).first()
         if not parent:
             raise HTTPException(status_code=404, detail="Parent activity not found")
     
+    # 父活动变化时同步闭包表，并拒绝形成环
+    if "parent_id" in update_data and update_data["parent_id"] != db_activity.parent_id:
+        move_activity_node(db, activity_id, update_data["parent_id"])
+    
+    # 改名会影响日历视图中显示的活动名称
+    renamed = "name" in update_data and update_data["name"] != db_activity.name
+    
     for key, value in update_data.items():
         setattr(db_activity, key, value)
     
+    changes = [change("activity", "update", activity_id)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
     db.commit()
+    if renamed:
+        if has_recurrence_rules(db, [activity_id]):
+            view_cache.clear()
+        else:
+            view_cache.invalidate_months(get_activity_months(db, activity_id))
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
     db.refresh(db_activity)
     return db_activity
 
 @router.delete("/{activity_id}")
+@async_endpoint
 def delete_activity(activity_id: int, db: Session = Depends(get_db)):
     db_activity = db.query(ActivityModel).filter(ActivityModel.id == activity_id).first()
     if db_activity is None:
         raise HTTPException(status_code=404, detail="Activity not found")
     
+    # 级联删除的事件所在月份需要从视图缓存中失效
+    affected_months = get_activity_months(db, activity_id)
+    has_rules = has_recurrence_rules(db, [activity_id])
+    # 直接子活动的 parent_id 随删除置空、成为顶级活动，同步客户端需要收到它们的更新
+    child_ids = [row.id for row in db.query(ActivityModel.id).filter(ActivityModel.parent_id == activity_id)]
+    remove_activity_node(db, activity_id)
+    remove_activity_rollup(db, activity_id)
+    # 级联删除的日程与重复规则也要留下墓碑
+    cascaded = [
+        *(change("event", "delete", row.id) for row in
+          db.query(ScheduledEventModel.id).filter(ScheduledEventModel.activity_id == activity_id)),
+        *(change("event", "delete", row.id) for row in
+          db.query(ArchivedEvent.id).filter(ArchivedEvent.activity_id == activity_id)),
+        *(change("recurrence", "delete", row.id) for row in
+          db.query(RecurrenceRule.id).filter(RecurrenceRule.activity_id == activity_id))
+    ]
+    # 归档的日程不在 ORM 级联中，直接删除
+    db.execute(delete(ArchivedEvent).where(ArchivedEvent.activity_id == activity_id))
     db.delete(db_activity)
+    changes = [change("activity", "delete", activity_id), *(change("activity", "update", child_id) for child_id in child_ids)]
+    version = bump_data_version(db)
+    log_changes(db, version, [*cascaded, *changes])
     db.commit()
+    if has_rules:
+        view_cache.clear()
+    else:
+        view_cache.invalidate_months(affected_months)
+    view_cache.applied(version)
+    # 级联删除的日程不逐条推送，活动变更没有日期，所有订阅者都会收到
+    change_feed.publish(version, changes)
     return {"message": "Activity deleted successfully"}
\ No newline at end of file
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import case, func, literal
 from sqlalchemy.orm import Session
 from typing import List, Dict
 from datetime import date, datetime, timedelta
 from collections import defaultdict
 
-from app.database import get_db
-from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
+from app.archive import event_source
+from app.database import get_db, async_endpoint
 from app.models.activity import Activity as ActivityModel
 from app.schemas import ScheduledEventWithActivity
+from app.recurrence import expand_occurrences
+from app.serialization import json_response
+from app.versioning import get_data_version, not_modified_response
+from app.view_cache import view_cache, week_key, month_key
 
 router = APIRouter()
 
+TIME_SLOTS = [21, 22, 51, 52, 71]
+
+# 区间热力图中每个时间槽的编码：0 空闲，1 计划中，2 已完成
+RANGE_STATUS_CODES = {0: None, 1: "planned", 2: "completed"}
+MAX_RANGE_DAYS = 3660
+
 def get_week_dates(target_date: date):
     """获取指定日期所在周的7天日期"""
     days_since_monday = target_date.weekday()
@@ -36,21 +47,63 @@ def get_month_dates(year: int, month: int):
     
     return dates
 
+def query_view_events(db: Session, start_date: date, end_date: date):
+    """一次联表查询取出日历视图所需的列，避免逐条懒加载 activity；并入重复规则在区间内的发生
+
+    区间包含归档区时从热表与归档表的并集中查询。
+    """
+    source = event_source(db, start_date)
+    events = db.query(
+        source.id,
+        literal(None).label("recurrence_id"),
+        source.activity_id,
+        source.event_date,
+        source.time_slot,
+        source.goal,
+        source.notes,
+        source.status,
+        ActivityModel.name.label("activity_name")
+    ).join(
+        ActivityModel, source.activity_id == ActivityModel.id
+    ).filter(
+        source.event_date >= start_date,
+        source.event_date <= end_date
+    ).all()
+    occurrences = expand_occurrences(db, start_date, end_date)
+    if not occurrences:
+        return events
+    return sorted([*events, *occurrences], key=lambda event: (event.event_date, event.time_slot))
+
+@router.get("/cache/stats")
+async def get_view_cache_stats():
+    """周/月视图缓存的命中、未命中与淘汰计数"""
+    return view_cache.stats()
+
 @router.get("/week/{target_date}")
-def get_week_schedule(target_date: date, db: Session = Depends(get_db)):
+@async_endpoint
+def get_week_schedule(target_date: date, request: Request, response: Response, db: Session = Depends(get_db)):
     """获取指定日期所在周的完整日程"""
+    # 版本号同时用于 ETag 和校验视图缓存（其他 worker 的写入）
+    version = get_data_version(db)
+    not_modified = not_modified_response(db, request, response, version=version)
+    if not_modified:
+        return not_modified
+    
     week_dates = get_week_dates(target_date)
+    return json_response(
+        view_cache.get_or_build(week_key(target_date), lambda: build_week_schedule(db, week_dates), version),
+        response
+    )
+
+def build_week_schedule(db: Session, week_dates):
+    """构建周视图数据，结果会被缓存"""
     start_date = week_dates[0]
     end_date = week_dates[6]
     
-    events = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.event_date >= start_date,
-        ScheduledEventModel.event_date <= end_date
-    ).all()
+    events = query_view_events(db, start_date, end_date)
     
     # 组织数据为周视图格式
     schedule_grid = {}
-    time_slots = [21, 22, 51, 52, 71]
     
     for day in week_dates:
         schedule_grid[day.isoformat()] = {
@@ -58,7 +111,7 @@ def get_week_schedule(target_date: date, db: Session = Depends(get_db)):
             "weekday": day.strftime("%A"),
             "slots": {}
         }
-        for slot in time_slots:
+        for slot in TIME_SLOTS:
             schedule_grid[day.isoformat()]["slots"][slot] = None
     
     # 填入实际事件
@@ -67,8 +120,9 @@ def get_week_schedule(target_date: date, db: Session = Depends(get_db)):
         if day_key in schedule_grid:
             schedule_grid[day_key]["slots"][event.time_slot] = {
                 "id": event.id,
+                "recurrence_id": event.recurrence_id,
                 "activity_id": event.activity_id,
-                "activity_name": event.activity.name,
+                "activity_name": event.activity_name,
                 "goal": event.goal,
                 "notes": event.notes,
                 "status": event.status
@@ -81,24 +135,42 @@ def get_week_schedule(target_date: date, db: Session = Depends(get_db)):
     }
 
 @router.get("/month/{year}/{month}")
-def get_month_schedule(year: int, month: int, db: Session = Depends(get_db)):
+@async_endpoint
+def get_month_schedule(year: int, month: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """获取指定月份的日程概览"""
+    # is_today 随日期变化，ETag 中加入今天的日期
+    version = get_data_version(db)
+    not_modified = not_modified_response(db, request, response, date.today().isoformat(), version=version)
+    if not_modified:
+        return not_modified
+    
     month_dates = get_month_dates(year, month)
+    cached = view_cache.get_or_build(
+        month_key(year, month), lambda: build_month_schedule(db, year, month, month_dates), version
+    )
+    
+    # 缓存中不含 is_today，每次按当天日期补上
+    today = date.today().isoformat()
+    return json_response({
+        **cached,
+        "schedule": [{**day, "is_today": day["date"] == today} for day in cached["schedule"]]
+    }, response)
+
+def build_month_schedule(db: Session, year: int, month: int, month_dates):
+    """构建月视图数据（不含 is_today），结果会被缓存"""
     start_date = month_dates[0]
     end_date = month_dates[-1]
     
-    events = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.event_date >= start_date,
-        ScheduledEventModel.event_date <= end_date
-    ).all()
+    events = query_view_events(db, start_date, end_date)
     
     # 按日期聚合事件
     daily_events = defaultdict(list)
     for event in events:
         daily_events[event.event_date.isoformat()].append({
             "id": event.id,
+            "recurrence_id": event.recurrence_id,
             "activity_id": event.activity_id,
-            "activity_name": event.activity.name,
+            "activity_name": event.activity_name,
             "time_slot": event.time_slot,
             "goal": event.goal,
             "notes": event.notes,
@@ -116,7 +188,7 @@ def get_month_schedule(year: int, month: int, db: Session = Depends(get_db)):
             "day": day.day,
             "event_count": len(events_for_day),
             "events": events_for_day,
-            "is_today": day == date.today()
+            "is_today": False
         })
     
     return {
@@ -126,15 +198,68 @@ def get_month_schedule(year: int, month: int, db: Session = Depends(get_db)):
         "schedule": schedule_data
     }
 
+@router.get("/range")
+@async_endpoint
+def get_range_heatmap(start: date, end: date, request: Request, response: Response, db: Session = Depends(get_db)):
+    """获取日期区间的占用/状态矩阵，用于年度或多年概览
+
+    days 为字符串，每天依次占 len(slots) 个字符，对应 slots 中的时间槽，字符取 status_codes 的键；
+    一年约 1.8 KB，不含目标和备注文本。
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    day_count = (end - start).days + 1
+    if day_count > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {MAX_RANGE_DAYS} days)")
+    
+    not_modified = not_modified_response(db, request, response)
+    if not_modified:
+        return not_modified
+    
+    # 每个日期一行，每个时间槽一列状态码，在 SQL 中完成聚合
+    source = event_source(db, start)
+    status_code = case((source.status == "completed", 2), else_=1)
+    rows = db.query(
+        source.event_date,
+        *(
+            func.max(case((source.time_slot == slot, status_code), else_=0))
+            for slot in TIME_SLOTS
+        )
+    ).filter(
+        source.event_date >= start,
+        source.event_date <= end
+    ).group_by(source.event_date).all()
+    
+    cells = ["0" * len(TIME_SLOTS)] * day_count
+    for event_date, *codes in rows:
+        cells[(event_date - start).days] = "".join(str(code) for code in codes)
+    
+    # 重复规则的发生只会落在空闲时间槽上（已占用的被单独日程覆盖）
+    for occurrence in expand_occurrences(db, start, end):
+        index = (occurrence.event_date - start).days
+        position = TIME_SLOTS.index(occurrence.time_slot)
+        code = "2" if occurrence.status == "completed" else "1"
+        cells[index] = cells[index][:position] + code + cells[index][position + 1:]
+    
+    return json_response({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "slots": TIME_SLOTS,
+        "status_codes": {str(code): status for code, status in RANGE_STATUS_CODES.items()},
+        "days": "".join(cells)
+    }, response)
+
 @router.get("/day/{target_date}")
-def get_day_schedule(target_date: date, db: Session = Depends(get_db)):
+@async_endpoint
+def get_day_schedule(target_date: date, request: Request, response: Response, db: Session = Depends(get_db)):
     """获取指定日期的详细日程"""
-    events = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.event_date == target_date
-    ).all()
+    not_modified = not_modified_response(db, request, response)
+    if not_modified:
+        return not_modified
+    
+    events = query_view_events(db, target_date, target_date)
     
     # 组织为时间槽格式
-    time_slots = [21, 22, 51, 52, 71]
     slot_names = {
         21: "上午第1时段",
         22: "上午第2时段", 
@@ -144,7 +269,7 @@ def get_day_schedule(target_date: date, db: Session = Depends(get_db)):
     }
     
     day_schedule = {}
-    for slot in time_slots:
+    for slot in TIME_SLOTS:
         day_schedule[slot] = {
             "time_slot": slot,
             "slot_name": slot_names[slot],
@@ -155,15 +280,16 @@ def get_day_schedule(target_date: date, db: Session = Depends(get_db)):
         if event.time_slot in day_schedule:
             day_schedule[event.time_slot]["event"] = {
                 "id": event.id,
+                "recurrence_id": event.recurrence_id,
                 "activity_id": event.activity_id,
-                "activity_name": event.activity.name,
+                "activity_name": event.activity_name,
                 "goal": event.goal,
                 "notes": event.notes,
                 "status": event.status
             }
     
-    return {
+    return json_response({
         "date": target_date.isoformat(),
         "weekday": target_date.strftime("%A"),
         "schedule": list(day_schedule.values())
-    }
\ No newline at end of file
+    }, response)
\ No newline at end of file
@@ -0,0 +1,120 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+
+from app.database import get_db, async_endpoint
+from app.models.activity import Activity as ActivityModel
+from app.models.recurrence_exception import RecurrenceException
+from app.models.recurrence_rule import RecurrenceRule as RecurrenceRuleModel
+from app.changelog import log_changes
+from app.live import change, change_feed
+from app.recurrence import expand_occurrences, format_weekdays, iter_rule_dates
+from app.api.scheduled_events import VALID_SLOTS, MAX_LOOKAHEAD_DAYS
+from app.versioning import bump_data_version, not_modified_response
+from app.view_cache import view_cache
+from app.schemas import RecurrenceRule, RecurrenceRuleCreate, OccurrenceStatusUpdate, ScheduledEvent
+
+router = APIRouter()
+
+@router.post("/", response_model=RecurrenceRule)
+@async_endpoint
+def create_recurrence_rule(rule: RecurrenceRuleCreate, db: Session = Depends(get_db)):
+    """创建重复规则；规则只存一行，不生成日程记录"""
+    activity = db.query(ActivityModel).filter(ActivityModel.id == rule.activity_id).first()
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    if rule.time_slot not in VALID_SLOTS:
+        raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {VALID_SLOTS}")
+    if rule.weekdays and any(not 0 <= weekday <= 6 for weekday in rule.weekdays):
+        raise HTTPException(status_code=400, detail="Invalid weekday. Must be 0 (Monday) to 6 (Sunday)")
+    if rule.until and rule.until < rule.start_date:
+        raise HTTPException(status_code=400, detail="until must not be before start_date")
+    if rule.until and (rule.until - rule.start_date).days >= MAX_LOOKAHEAD_DAYS:
+        raise HTTPException(status_code=400, detail=f"until must be within {MAX_LOOKAHEAD_DAYS} days of start_date")
+    
+    db_rule = RecurrenceRuleModel(**{**rule.model_dump(), "weekdays": format_weekdays(rule.weekdays)})
+    db.add(db_rule)
+    db.flush()
+    changes = [change("recurrence", "create", db_rule.id)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
+    db.commit()
+    # 规则影响的周/月不限，整体清空视图缓存
+    view_cache.clear()
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
+    db.refresh(db_rule)
+    return db_rule
+
+@router.get("/", response_model=List[RecurrenceRule])
+@async_endpoint
+def get_recurrence_rules(activity_id: Optional[int] = None, db: Session = Depends(get_db)):
+    query = db.query(RecurrenceRuleModel)
+    if activity_id is not None:
+        query = query.filter(RecurrenceRuleModel.activity_id == activity_id)
+    return query.order_by(RecurrenceRuleModel.id).all()
+
+@router.get("/occurrences", response_model=List[ScheduledEvent])
+@async_endpoint
+def get_occurrences(start_date: date, end_date: date, request: Request, response: Response, db: Session = Depends(get_db)):
+    """展开区间内所有重复规则的发生（已被单独日程占用或已取消的不返回）"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_LOOKAHEAD_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {MAX_LOOKAHEAD_DAYS} days)")
+    not_modified = not_modified_response(db, request, response)
+    if not_modified:
+        return not_modified
+    return expand_occurrences(db, start_date, end_date)
+
+@router.get("/{rule_id}", response_model=RecurrenceRule)
+@async_endpoint
+def get_recurrence_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule = db.query(RecurrenceRuleModel).filter(RecurrenceRuleModel.id == rule_id).first()
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Recurrence rule not found")
+    return rule
+
+@router.delete("/{rule_id}")
+@async_endpoint
+def delete_recurrence_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule = db.query(RecurrenceRuleModel).filter(RecurrenceRuleModel.id == rule_id).first()
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Recurrence rule not found")
+    db.delete(rule)
+    changes = [change("recurrence", "delete", rule_id)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
+    db.commit()
+    view_cache.clear()
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
+    return {"message": "Recurrence rule deleted successfully"}
+
+@router.put("/{rule_id}/occurrences/{occurrence_date}")
+@async_endpoint
+def update_occurrence(rule_id: int, occurrence_date: date, update: OccurrenceStatusUpdate, db: Session = Depends(get_db)):
+    """记录某一次发生的状态：completed / planned，或 skipped 取消该次"""
+    rule = db.query(RecurrenceRuleModel).filter(RecurrenceRuleModel.id == rule_id).first()
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Recurrence rule not found")
+    if next(iter_rule_dates(rule, occurrence_date, occurrence_date), None) is None:
+        raise HTTPException(status_code=400, detail="Date is not an occurrence of this rule")
+    
+    exception = db.query(RecurrenceException).filter(
+        RecurrenceException.rule_id == rule_id,
+        RecurrenceException.occurrence_date == occurrence_date
+    ).first()
+    if exception is None:
+        db.add(RecurrenceException(rule_id=rule_id, occurrence_date=occurrence_date, status=update.status))
+    else:
+        exception.status = update.status
+    changes = [change("recurrence", "update", rule_id, occurrence_date, rule.time_slot)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
+    db.commit()
+    view_cache.invalidate_dates([occurrence_date])
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
+    return {"recurrence_id": rule_id, "event_date": occurrence_date.isoformat(), "status": update.status}
@@ -1,73 +1,642 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Literal
+from datetime import date, timedelta
+from collections import Counter
+import csv
+import io
 
-from app.database import get_db
+import orjson
+
+from app.archive import archived_through, event_source, is_archived_event
+from app.database import get_db, async_endpoint, get_async_session_scope
+from app.models.archived_event import ArchivedEvent
 from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
 from app.models.activity import Activity as ActivityModel
-from app.schemas import ScheduledEvent, ScheduledEventCreate, ScheduledEventUpdate, ScheduledEventWithActivity
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.rollup import record_event_added, record_event_removed, collect_event_delta, apply_rollup_deltas
+from app.occupancy import iter_free_slots
+from app.changelog import log_changes
+from app.live import change, change_feed
+from app.recurrence import expand_occurrences
+from app.serialization import json_response
+from app.versioning import bump_data_version
+from app.view_cache import view_cache
+from app.schemas import (
+    ScheduledEvent, ScheduledEventCreate, ScheduledEventUpdate, ScheduledEventWithActivity,
+    ScheduledEventBatch, ScheduledEventBatchResult, BatchItemResult, FreeSlot, AutoScheduleRequest
+)
 
 router = APIRouter()
 
+# 有效时间槽 (21, 22, 51, 52, 71)
+VALID_SLOTS = [21, 22, 51, 52, 71]
+
+ARCHIVED_EVENT_DETAIL = "Scheduled event is archived; restore its dates before editing"
+
+# 空闲时间槽查找与自动排程的默认/最大前瞻天数
+DEFAULT_LOOKAHEAD_DAYS = 365
+MAX_LOOKAHEAD_DAYS = 3660
+
+def flush_slot_writes(db: Session):
+    """刷新待写入的事件；(event_date, time_slot) 唯一索引冲突映射为 400"""
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Time slot already occupied")
+
+def try_slot_write(db: Session, write):
+    """在 SAVEPOINT 中执行 write 并刷新；唯一索引冲突时只回滚这一部分并返回 False"""
+    try:
+        with db.begin_nested():
+            write()
+    except IntegrityError:
+        return False
+    return True
+
+def order_slot_moves(targets: dict, occupied: dict):
+    """排定批量修改的写入顺序，使每条修改在其目标时间槽的当前占用者移走之后写入
+
+    targets 按请求顺序给出 {event_id: 目标 (event_date, time_slot)}，occupied 为 {(event_date, time_slot): 当前占用者 id}。
+    返回分组列表：链式移动逐条成组，从链尾开始；互相占用对方目标的修改（互换、轮换）构成环，整组一起写入。
+    多条修改争用同一时间槽时，请求中靠前的先写入，其余由唯一索引判定失败。
+    """
+    def blocker(event_id):
+        holder = occupied.get(targets[event_id])
+        return holder if holder != event_id and holder in targets else None
+    
+    groups = []
+    done = set()
+    for event_id in targets:
+        path, position = [], {}
+        while event_id is not None and event_id not in done and event_id not in position:
+            position[event_id] = len(path)
+            path.append(event_id)
+            event_id = blocker(event_id)
+        done.update(path)
+        if event_id in position:
+            groups.append(path[position[event_id]:])
+            path = path[:position[event_id]]
+        groups.extend([member] for member in reversed(path))
+    return groups
+
+def event_not_found(db: Session, event_id: int):
+    """热表中没有该日程：已归档时为 409（归档区只读），否则为 404"""
+    if is_archived_event(db, event_id):
+        return HTTPException(status_code=409, detail=ARCHIVED_EVENT_DETAIL)
+    return HTTPException(status_code=404, detail="Scheduled event not found")
+
+def archived_dates_detail(through: date):
+    return f"Dates up to {through} are archived; restore them before editing"
+
+def check_writable_date(db: Session, event_date: date):
+    """归档区只读：日期不晚于归档边界时返回 409"""
+    through = archived_through(db)
+    if through is not None and event_date <= through:
+        raise HTTPException(status_code=409, detail=archived_dates_detail(through))
+
+def vacate_slot(db: Session, event_date: date, time_slot: int, exclude_id: int = None):
+    """upsert 模式：删除当前占用该时间槽的事件，并扣减其汇总计数；返回被删除事件的变更"""
+    stmt = delete(ScheduledEventModel).where(
+        ScheduledEventModel.event_date == event_date,
+        ScheduledEventModel.time_slot == time_slot
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(ScheduledEventModel.id != exclude_id)
+    removed = db.execute(stmt.returning(
+        ScheduledEventModel.id,
+        ScheduledEventModel.activity_id,
+        ScheduledEventModel.event_date,
+        ScheduledEventModel.time_slot,
+        ScheduledEventModel.status
+    )).all()
+    for row in removed:
+        record_event_removed(db, row)
+    return [change("event", "delete", row.id, row.event_date, row.time_slot) for row in removed]
+
 @router.post("/", response_model=ScheduledEvent)
-def create_scheduled_event(event: ScheduledEventCreate, db: Session = Depends(get_db)):
+@async_endpoint
+def create_scheduled_event(event: ScheduledEventCreate, replace: bool = False, db: Session = Depends(get_db)):
+    """创建日程；时间槽冲突由唯一索引检测，replace=true 时替换原有安排"""
     # 验证activity存在
     activity = db.query(ActivityModel).filter(ActivityModel.id == event.activity_id).first()
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
-    # 验证时间槽格式 (21, 22, 51, 52, 71)
-    valid_slots = [21, 22, 51, 52, 71]
-    if event.time_slot not in valid_slots:
-        raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {valid_slots}")
-    
-    # 检查同一时间槽是否已有安排
-    existing = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.event_date == event.event_date,
-        ScheduledEventModel.time_slot == event.time_slot
-    ).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Time slot already occupied")
+    # 验证时间槽格式
+    if event.time_slot not in VALID_SLOTS:
+        raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {VALID_SLOTS}")
+    check_writable_date(db, event.event_date)
+    
+    changes = vacate_slot(db, event.event_date, event.time_slot) if replace else []
     
-    db_event = ScheduledEventModel(**event.dict())
+    db_event = ScheduledEventModel(**event.model_dump())
     db.add(db_event)
+    record_event_added(db, db_event)
+    flush_slot_writes(db)
+    changes.append(change("event", "create", db_event.id, db_event.event_date, db_event.time_slot))
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
     db.commit()
+    view_cache.invalidate_dates([event.event_date])
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
     db.refresh(db_event)
     return db_event
 
+@router.post("/batch", response_model=ScheduledEventBatchResult)
+@async_endpoint
+def batch_scheduled_events(batch: ScheduledEventBatch, db: Session = Depends(get_db)):
+    """在一个事务中批量删除、修改、创建日程（按此顺序应用）
+
+    每条在各自的 SAVEPOINT 中写入，时间槽冲突由唯一索引判定并记为该条失败；修改按依赖顺序写入，
+    链式移动与时间槽互换都可以在一个批次内完成。同一日程在一个批次中只能修改一次。
+    all_or_nothing 模式下任一条失败则整体回滚并返回 400；
+    best_effort 模式下跳过失败的条目，其余照常提交。
+    """
+    update_payloads = [item.model_dump(exclude_unset=True) for item in batch.update]
+    
+    # 一次查询取出所有要修改或删除的事件
+    target_ids = set(batch.delete) | {payload["id"] for payload in update_payloads}
+    existing = {}
+    if target_ids:
+        existing = {
+            event.id: event for event in
+            db.query(ScheduledEventModel).filter(ScheduledEventModel.id.in_(target_ids)).all()
+        }
+    # 不在热表中的目标可能已归档，归档区只读
+    archived_ids = set()
+    if target_ids - existing.keys():
+        archived_ids = {
+            row.id for row in
+            db.query(ArchivedEvent.id).filter(ArchivedEvent.id.in_(target_ids - existing.keys())).all()
+        }
+    through = archived_through(db)
+    
+    def missing_detail(event_id):
+        return ARCHIVED_EVENT_DETAIL if event_id in archived_ids else "Scheduled event not found"
+    
+    def is_archived_date(event_date):
+        return through is not None and event_date <= through
+    
+    # 一次查询验证所有引用到的活动
+    activity_ids = {item.activity_id for item in batch.create}
+    activity_ids |= {payload["activity_id"] for payload in update_payloads if "activity_id" in payload}
+    known_activities = set()
+    if activity_ids:
+        known_activities = {
+            row.id for row in
+            db.query(ActivityModel.id).filter(ActivityModel.id.in_(activity_ids)).all()
+        }
+    
+    # 一次查询取出所有涉及日期上已占用的时间槽
+    dates = {item.event_date for item in batch.create}
+    dates |= {payload["event_date"] for payload in update_payloads if "event_date" in payload}
+    dates |= {event.event_date for event in existing.values()}
+    occupied = {}
+    if dates:
+        rows = db.query(
+            ScheduledEventModel.id,
+            ScheduledEventModel.event_date,
+            ScheduledEventModel.time_slot
+        ).filter(ScheduledEventModel.event_date.in_(dates)).all()
+        occupied = {(row.event_date, row.time_slot): row.id for row in rows}
+    
+    results = []
+    deltas = Counter()
+    touched_dates = set()
+    changes = []
+    # 先递增版本号：SQLite 驱动在第一条 DML 之前不开启事务，之后每条的 SAVEPOINT 才都在这一事务之内
+    version = bump_data_version(db)
+    
+    for index, event_id in enumerate(batch.delete):
+        db_event = existing.pop(event_id, None)
+        if db_event is None:
+            results.append(BatchItemResult(operation="delete", index=index, success=False, id=event_id,
+                                           detail=missing_detail(event_id)))
+            continue
+        key = (db_event.event_date, db_event.time_slot)
+        if occupied.get(key) == event_id:
+            del occupied[key]
+        collect_event_delta(deltas, db_event, -1)
+        touched_dates.add(db_event.event_date)
+        changes.append(change("event", "delete", event_id, db_event.event_date, db_event.time_slot))
+        db.delete(db_event)
+        results.append(BatchItemResult(operation="delete", index=index, success=True, id=event_id))
+    db.flush()
+    
+    # 修改：时间槽以外的校验在内存中完成，时间槽冲突由唯一索引逐条判定
+    update_results = {}
+    valid_updates = {}
+    for index, payload in enumerate(update_payloads):
+        event_id = payload.pop("id")
+        db_event = existing.get(event_id)
+        detail = None
+        if db_event is None:
+            detail = missing_detail(event_id)
+        elif event_id in valid_updates:
+            detail = "Scheduled event is updated more than once in this batch"
+        elif "event_date" in payload and is_archived_date(payload["event_date"]):
+            detail = archived_dates_detail(through)
+        elif "activity_id" in payload and payload["activity_id"] not in known_activities:
+            detail = "Activity not found"
+        elif "time_slot" in payload and payload["time_slot"] not in VALID_SLOTS:
+            detail = f"Invalid time_slot. Must be one of: {VALID_SLOTS}"
+        if detail:
+            update_results[index] = BatchItemResult(operation="update", index=index, success=False, id=event_id,
+                                                    detail=detail)
+            continue
+        valid_updates[event_id] = (index, payload)
+    
+    targets = {
+        event_id: (payload.get("event_date", existing[event_id].event_date),
+                   payload.get("time_slot", existing[event_id].time_slot))
+        for event_id, (_, payload) in valid_updates.items()
+    }
+    for group in order_slot_moves(targets, occupied):
+        pending = Counter()
+        previous = {}
+        for event_id in group:
+            db_event = existing[event_id]
+            previous[event_id] = (db_event.event_date, db_event.time_slot)
+            collect_event_delta(pending, db_event, -1)
+        
+        def write():
+            if len(group) > 1:
+                # 环中每条修改的目标都被下一条占用：先把第一条移到临时时间槽（-id）腾出位置
+                parked = existing[group[0]]
+                parked.time_slot = -parked.id
+                db.flush()
+            for event_id in reversed(group):
+                for key, value in valid_updates[event_id][1].items():
+                    setattr(existing[event_id], key, value)
+                # 逐条刷新：同一次 flush 中的 UPDATE 按主键顺序执行，会违反唯一索引
+                db.flush()
+        
+        success = try_slot_write(db, write)
+        for event_id in group:
+            index = valid_updates[event_id][0]
+            update_results[index] = BatchItemResult(operation="update", index=index, success=success, id=event_id,
+                                                    detail=None if success else "Time slot already occupied")
+            if not success:
+                continue
+            db_event = existing[event_id]
+            collect_event_delta(pending, db_event, 1)
+            touched_dates.update([previous[event_id][0], db_event.event_date])
+            changes.append(change("event", "update", event_id, db_event.event_date, db_event.time_slot,
+                                  *previous[event_id]))
+        if success:
+            deltas.update(pending)
+    results.extend(update_results[index] for index in sorted(update_results))
+    
+    for index, item in enumerate(batch.create):
+        detail = None
+        if item.activity_id not in known_activities:
+            detail = "Activity not found"
+        elif item.time_slot not in VALID_SLOTS:
+            detail = f"Invalid time_slot. Must be one of: {VALID_SLOTS}"
+        elif is_archived_date(item.event_date):
+            detail = archived_dates_detail(through)
+        else:
+            db_event = ScheduledEventModel(**item.model_dump())
+            if not try_slot_write(db, lambda: db.add(db_event)):
+                detail = "Time slot already occupied"
+        if detail:
+            results.append(BatchItemResult(operation="create", index=index, success=False, detail=detail))
+            continue
+        
+        collect_event_delta(deltas, db_event, 1)
+        touched_dates.add(item.event_date)
+        changes.append(change("event", "create", db_event.id, db_event.event_date, db_event.time_slot))
+        results.append(BatchItemResult(operation="create", index=index, success=True, id=db_event.id))
+    
+    if batch.mode == "all_or_nothing" and not all(result.success for result in results):
+        db.rollback()
+        raise HTTPException(status_code=400, detail={
+            "message": "Batch rejected, no changes were applied",
+            "results": [result.model_dump() for result in results if not result.success]
+        })
+    
+    apply_rollup_deltas(db, deltas)
+    log_changes(db, version, changes)
+    db.commit()
+    view_cache.invalidate_dates(touched_dates)
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
+    return ScheduledEventBatchResult(committed=True, results=results)
+
+def resolve_slot_constraints(start_date: date, end_date: date, slots, weekdays):
+    """补全默认区间并校验时间槽、星期约束"""
+    start_date = start_date or date.today()
+    end_date = end_date or start_date + timedelta(days=DEFAULT_LOOKAHEAD_DAYS - 1)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_LOOKAHEAD_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {MAX_LOOKAHEAD_DAYS} days)")
+    if slots and any(slot not in VALID_SLOTS for slot in slots):
+        raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {VALID_SLOTS}")
+    if weekdays and any(not 0 <= weekday <= 6 for weekday in weekdays):
+        raise HTTPException(status_code=400, detail="Invalid weekday. Must be 0 (Monday) to 6 (Sunday)")
+    return start_date, end_date
+
+@router.get("/free-slots", response_model=List[FreeSlot])
+@async_endpoint
+def get_free_slots(
+    start_date: date = None,
+    end_date: date = None,
+    count: int = Query(10, ge=1, le=1000),
+    slots: List[int] = Query(None),
+    weekdays: List[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """按日期顺序返回前 count 个满足时间槽、星期约束的空闲时间槽（默认从今天起一年内）"""
+    start_date, end_date = resolve_slot_constraints(start_date, end_date, slots, weekdays)
+    free_slots = []
+    for day, slot in iter_free_slots(db, start_date, end_date, slots, weekdays):
+        free_slots.append(FreeSlot(event_date=day, time_slot=slot, weekday=day.weekday()))
+        if len(free_slots) >= count:
+            break
+    return free_slots
+
+@router.post("/auto-schedule", response_model=List[ScheduledEvent])
+@async_endpoint
+def auto_schedule(request: AutoScheduleRequest, db: Session = Depends(get_db)):
+    """在区间内为活动安排 sessions 次日程，一个事务内全部写入
+
+    spread=earliest 取最早的空闲时间槽；spread=even 在所有候选时间槽中等距选取。
+    每天最多安排 max_per_day 次；空闲时间槽不足时返回 400，不做任何修改。
+    """
+    activity = db.query(ActivityModel).filter(ActivityModel.id == request.activity_id).first()
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    start_date, end_date = resolve_slot_constraints(request.start_date, request.end_date, request.slots, request.weekdays)
+    
+    candidates = []
+    per_day = Counter()
+    for day, slot in iter_free_slots(db, start_date, end_date, request.slots, request.weekdays):
+        if per_day[day] >= request.max_per_day:
+            continue
+        per_day[day] += 1
+        candidates.append((day, slot))
+        if request.spread == "earliest" and len(candidates) >= request.sessions:
+            break
+    
+    if len(candidates) < request.sessions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only {len(candidates)} free slots available for {request.sessions} sessions"
+        )
+    if request.spread == "even":
+        candidates = [candidates[index * len(candidates) // request.sessions] for index in range(request.sessions)]
+    
+    deltas = Counter()
+    created = []
+    for day, slot in candidates:
+        db_event = ScheduledEventModel(
+            activity_id=request.activity_id,
+            event_date=day,
+            time_slot=slot,
+            goal=request.goal,
+            notes=request.notes,
+            status="planned"
+        )
+        db.add(db_event)
+        collect_event_delta(deltas, db_event, 1)
+        created.append(db_event)
+    apply_rollup_deltas(db, deltas)
+    flush_slot_writes(db)
+    changes = [change("event", "create", event.id, event.event_date, event.time_slot) for event in created]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
+    db.commit()
+    view_cache.invalidate_dates([day for day, _ in candidates])
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
+    return created
+
 @router.get("/", response_model=List[ScheduledEventWithActivity])
+@async_endpoint
 def get_scheduled_events(
+    response: Response,
     skip: int = 0, 
-    limit: int = 100, 
+    limit: int = Query(100, ge=1), 
     start_date: date = None,
     end_date: date = None,
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(ScheduledEventModel)
+    """按 (event_date, time_slot, id) 排序分页；下一页游标通过 X-Next-Cursor 响应头返回
+
+    传入 cursor 时按键集分页，深页不再随偏移量变慢；skip 仅为兼容旧客户端保留。
+    同时给出 start_date 与 end_date 时并入重复规则在区间内的发生（id 为空，recurrence_id 为规则 id）。
+    只有本页的起点不晚于归档边界时才读取归档的日程。
+    """
+    after = decode_cursor(cursor, date, int, int) if cursor else None
+    source = event_source(db, max(filter(None, [start_date, after[0] if after else None]), default=None))
+    query = db.query(*event_with_activity_columns(source)).join(
+        ActivityModel, source.activity_id == ActivityModel.id
+    )
     
     if start_date:
-        query = query.filter(ScheduledEventModel.event_date >= start_date)
+        query = query.filter(source.event_date >= start_date)
     if end_date:
-        query = query.filter(ScheduledEventModel.event_date <= end_date)
+        query = query.filter(source.event_date <= end_date)
+    if after:
+        query = query.filter(tuple_(source.event_date, source.time_slot, source.id) > tuple_(*after))
+    
+    query = query.order_by(
+        source.event_date,
+        source.time_slot,
+        source.id
+    )
+    
+    expand = start_date is not None and end_date is not None
+    offset = skip if skip and not cursor else 0
+    if offset and not expand:
+        query = query.offset(offset)
+        offset = 0
+    
+    # 多取一条判断是否还有下一页
+    fetch = offset + limit + 1
+    events = [event_with_activity(row) for row in query.limit(fetch).all()]
+    if expand:
+        # 本页取满时，最后一条之后的发生不可能进入本页，只需展开到该日期
+        window_end = events[-1]["event_date"] if len(events) == fetch else end_date
+        occurrences = [
+            occurrence for occurrence in expand_occurrences(db, after[0] if after else start_date, window_end)
+            if not after or (occurrence.event_date, occurrence.time_slot) > after[:2]
+        ]
+        if occurrences:
+            activities = {
+                row.id: activity_dict(row) for row in
+                db.query(*ACTIVITY_COLUMNS).filter(ActivityModel.id.in_({o.activity_id for o in occurrences})).all()
+            }
+            merged = [*events, *(occurrence_with_activity(o, activities[o.activity_id]) for o in occurrences)]
+            merged.sort(key=event_key)
+            events = merged[:fetch]
+        events = events[offset:]
     
-    events = query.offset(skip).limit(limit).all()
-    return events
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*event_key(events[-1]))
+    # 行来自数据库，结构与 ScheduledEventWithActivity 一致，跳过逐行校验直接序列化
+    return json_response(events, response)
+
+ACTIVITY_COLUMNS = [
+    ActivityModel.id,
+    ActivityModel.name,
+    ActivityModel.parent_id,
+    ActivityModel.description,
+    ActivityModel.created_at
+]
+
+def event_with_activity_columns(source):
+    """列表查询的列；source 为 event_source 返回的日程实体"""
+    return [
+        source.id.label("event_id"),
+        source.activity_id,
+        source.event_date,
+        source.time_slot,
+        source.goal,
+        source.notes,
+        source.status,
+        *ACTIVITY_COLUMNS
+    ]
+
+def activity_dict(row):
+    """按 schemas.Activity 的字段顺序投影"""
+    return {
+        "name": row.name,
+        "parent_id": row.parent_id,
+        "description": row.description,
+        "id": row.id,
+        "created_at": row.created_at
+    }
+
+def event_with_activity(row):
+    """按 schemas.ScheduledEventWithActivity 的字段顺序投影 event_with_activity_columns 的一行"""
+    return {
+        "activity_id": row.activity_id,
+        "event_date": row.event_date,
+        "time_slot": row.time_slot,
+        "goal": row.goal,
+        "notes": row.notes,
+        "status": row.status,
+        "id": row.event_id,
+        "recurrence_id": None,
+        "activity": activity_dict(row)
+    }
+
+def event_key(event):
+    """列表排序键 (event_date, time_slot, id)；重复规则的发生 id 记为 0"""
+    return event["event_date"], event["time_slot"], event["id"] or 0
+
+def occurrence_with_activity(occurrence, activity):
+    return {
+        "activity_id": occurrence.activity_id,
+        "event_date": occurrence.event_date,
+        "time_slot": occurrence.time_slot,
+        "goal": occurrence.goal,
+        "notes": occurrence.notes,
+        "status": occurrence.status,
+        "id": None,
+        "recurrence_id": occurrence.recurrence_id,
+        "activity": activity
+    }
+
+EXPORT_COLUMNS = ["id", "event_date", "time_slot", "activity_id", "activity_name", "goal", "notes", "status"]
+EXPORT_BATCH_SIZE = 1000
+
+async def iter_export_rows(session_scope, start_date: date = None, end_date: date = None):
+    """以服务端游标分批读取导出行，内存占用与导出范围无关；范围包含归档区时一并导出归档的日程"""
+    # 流式响应在依赖清理之后仍在发送，由 session_scope 单独持有会话
+    async with session_scope() as db:
+        source = await db.run_sync(lambda session: event_source(session, start_date))
+        stmt = select(
+            source.id,
+            source.event_date,
+            source.time_slot,
+            source.activity_id,
+            ActivityModel.name.label("activity_name"),
+            source.goal,
+            source.notes,
+            source.status
+        ).join(
+            ActivityModel, source.activity_id == ActivityModel.id
+        ).order_by(
+            source.event_date,
+            source.time_slot,
+            source.id
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        if start_date:
+            stmt = stmt.where(source.event_date >= start_date)
+        if end_date:
+            stmt = stmt.where(source.event_date <= end_date)
+        
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+async def export_ndjson(session_scope, start_date: date, end_date: date):
+    async for rows in iter_export_rows(session_scope, start_date, end_date):
+        yield b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+async def export_csv(session_scope, start_date: date, end_date: date):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in iter_export_rows(session_scope, start_date, end_date):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+@router.get("/export")
+async def export_scheduled_events(
+    start_date: date = None,
+    end_date: date = None,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    session_scope=Depends(get_async_session_scope)
+):
+    """流式导出任意日期范围的日程（NDJSON 或 CSV），附带活动名称"""
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(session_scope, start_date, end_date),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="events.csv"'}
+        )
+    return StreamingResponse(export_ndjson(session_scope, start_date, end_date), media_type="application/x-ndjson")
 
 @router.get("/{event_id}", response_model=ScheduledEventWithActivity)
+@async_endpoint
 def get_scheduled_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(ScheduledEventModel).filter(ScheduledEventModel.id == event_id).first()
+    event = db.query(ScheduledEventModel).options(joinedload(ScheduledEventModel.activity)).filter(ScheduledEventModel.id == event_id).first()
+    if event is None:
+        # 归档的日程与热表的日程字段相同，可按原 id 读取
+        event = db.query(ArchivedEvent).options(joinedload(ArchivedEvent.activity)).filter(ArchivedEvent.id == event_id).first()
     if event is None:
         raise HTTPException(status_code=404, detail="Scheduled event not found")
     return event
 
 @router.put("/{event_id}", response_model=ScheduledEvent)
-def update_scheduled_event(event_id: int, event: ScheduledEventUpdate, db: Session = Depends(get_db)):
+@async_endpoint
+def update_scheduled_event(
+    event_id: int,
+    event: ScheduledEventUpdate,
+    replace: bool = False,
+    db: Session = Depends(get_db)
+):
+    """修改日程；时间槽冲突由唯一索引检测，replace=true 时替换目标时间槽的原有安排"""
     db_event = db.query(ScheduledEventModel).filter(ScheduledEventModel.id == event_id).first()
     if db_event is None:
-        raise HTTPException(status_code=404, detail="Scheduled event not found")
+        raise event_not_found(db, event_id)
     
-    update_data = event.dict(exclude_unset=True)
+    update_data = event.model_dump(exclude_unset=True)
     
     # 验证activity存在
     if "activity_id" in update_data:
@@ -77,36 +646,51 @@ def update_scheduled_event(event_id: int, event: ScheduledEventUpdate, db: Sessi
     
     # 验证时间槽格式
     if "time_slot" in update_data:
-        valid_slots = [21, 22, 51, 52, 71]
-        if update_data["time_slot"] not in valid_slots:
-            raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {valid_slots}")
-    
-    # 检查时间冲突
-    if "event_date" in update_data or "time_slot" in update_data:
-        check_date = update_data.get("event_date", db_event.event_date)
-        check_slot = update_data.get("time_slot", db_event.time_slot)
-        
-        existing = db.query(ScheduledEventModel).filter(
-            ScheduledEventModel.id != event_id,
-            ScheduledEventModel.event_date == check_date,
-            ScheduledEventModel.time_slot == check_slot
-        ).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Time slot already occupied")
+        if update_data["time_slot"] not in VALID_SLOTS:
+            raise HTTPException(status_code=400, detail=f"Invalid time_slot. Must be one of: {VALID_SLOTS}")
+    if "event_date" in update_data:
+        check_writable_date(db, update_data["event_date"])
     
+    changes = []
+    if replace and ("event_date" in update_data or "time_slot" in update_data):
+        changes = vacate_slot(
+            db,
+            update_data.get("event_date", db_event.event_date),
+            update_data.get("time_slot", db_event.time_slot),
+            exclude_id=event_id
+        )
+    
+    previous_date, previous_slot = db_event.event_date, db_event.time_slot
+    record_event_removed(db, db_event)
     for key, value in update_data.items():
         setattr(db_event, key, value)
+    record_event_added(db, db_event)
     
+    flush_slot_writes(db)
+    changes.append(change("event", "update", event_id, db_event.event_date, db_event.time_slot, previous_date, previous_slot))
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
     db.commit()
+    view_cache.invalidate_dates([previous_date, db_event.event_date])
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
     db.refresh(db_event)
     return db_event
 
 @router.delete("/{event_id}")
+@async_endpoint
 def delete_scheduled_event(event_id: int, db: Session = Depends(get_db)):
     db_event = db.query(ScheduledEventModel).filter(ScheduledEventModel.id == event_id).first()
     if db_event is None:
-        raise HTTPException(status_code=404, detail="Scheduled event not found")
+        raise event_not_found(db, event_id)
     
+    record_event_removed(db, db_event)
     db.delete(db_event)
+    changes = [change("event", "delete", event_id, db_event.event_date, db_event.time_slot)]
+    version = bump_data_version(db)
+    log_changes(db, version, changes)
     db.commit()
+    view_cache.invalidate_dates([db_event.event_date])
+    view_cache.applied(version)
+    change_feed.publish(version, changes)
     return {"message": "Scheduled event deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,158 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, column, func, literal, literal_column, or_, table
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import date
+
+from app.archive import reaches_archive
+from app.database import get_db, async_endpoint
+from app.models.activity import Activity as ActivityModel
+from app.models.activity_closure import ActivityClosure
+from app.models.archived_event import ArchivedEvent
+from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.search import search_supported, split_terms, match_expression, like_pattern, highlight, MIN_INDEXED_TERM_LENGTH
+from app.versioning import not_modified_response
+
+router = APIRouter()
+
+event_search = table("event_search", column("rowid"), column("goal"), column("notes"), column("activity_name"), column("activity_description"))
+activity_search = table("activity_search", column("rowid"), column("name"), column("description"))
+
+def text_filters(fts_table, terms):
+    """可走索引的词用 MATCH，短词退化为 LIKE；返回 (过滤条件列表, 排序分数)"""
+    filters = []
+    expression = match_expression(terms)
+    if expression:
+        filters.append(literal_column(fts_table.name).op("MATCH")(expression))
+        rank = func.bm25(literal_column(fts_table.name))
+    else:
+        rank = literal(0.0)
+    for term in terms:
+        if len(term) < MIN_INDEXED_TERM_LENGTH:
+            pattern = like_pattern(term)
+            filters.append(or_(*(
+                fts_table.c[name].like(pattern, escape="\\")
+                for name in fts_table.c.keys() if name != "rowid"
+            )))
+    return filters, rank
+
+@router.get("")
+@async_endpoint
+def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    type: Literal["event", "activity"] = "event",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    activity_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = None,
+    db: Session = Depends(get_db)
+):
+    """全文搜索日程（目标、备注、活动名称/描述）或活动，按相关度排序并标记命中词（文本字段为转义后的 HTML）
+
+    start_date/end_date 只作用于日程；activity_id 限定为该活动及其子树。
+    下一页游标通过 X-Next-Cursor 响应头返回。
+    """
+    if not search_supported(db):
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite FTS5")
+    terms = split_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Empty search query")
+
+    not_modified = not_modified_response(db, request, response)
+    if not_modified:
+        return not_modified
+
+    offset = decode_cursor(cursor, int)[0] if cursor else skip
+
+    if type == "event":
+        filters, rank = text_filters(event_search, terms)
+
+        def event_query(source):
+            query = db.query(
+                source.id,
+                source.event_date,
+                source.time_slot,
+                source.activity_id,
+                ActivityModel.name.label("activity_name"),
+                source.goal,
+                source.notes,
+                source.status,
+                rank.label("rank")
+            ).select_from(event_search).join(
+                source, source.id == event_search.c.rowid
+            ).join(
+                ActivityModel, source.activity_id == ActivityModel.id
+            ).filter(*filters)
+            if start_date:
+                query = query.filter(source.event_date >= start_date)
+            if end_date:
+                query = query.filter(source.event_date <= end_date)
+            if activity_id is not None:
+                query = query.join(
+                    ActivityClosure,
+                    and_(ActivityClosure.descendant_id == source.activity_id, ActivityClosure.ancestor_id == activity_id)
+                )
+            return query
+
+        # 归档的日程也在索引中，范围包含归档区时两张表各自匹配后合并
+        query = event_query(ScheduledEventModel)
+        if reaches_archive(db, start_date):
+            query = query.union_all(event_query(ArchivedEvent))
+            # 合并后按子查询的 rank 列排序
+            rank = literal_column("rank")
+        order = [rank, ScheduledEventModel.event_date.desc(), ScheduledEventModel.id.desc()]
+    else:
+        filters, rank = text_filters(activity_search, terms)
+        query = db.query(
+            ActivityModel.id,
+            ActivityModel.name,
+            ActivityModel.parent_id,
+            ActivityModel.description,
+            rank.label("rank")
+        ).select_from(activity_search).join(
+            ActivityModel, ActivityModel.id == activity_search.c.rowid
+        ).filter(*filters)
+        if activity_id is not None:
+            query = query.join(
+                ActivityClosure,
+                and_(ActivityClosure.descendant_id == ActivityModel.id, ActivityClosure.ancestor_id == activity_id)
+            )
+        order = [rank, ActivityModel.id]
+
+    rows = query.order_by(*order).offset(offset).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit)
+
+    if type == "event":
+        return [
+            {
+                "type": "event",
+                "id": row.id,
+                "event_date": row.event_date.isoformat(),
+                "time_slot": row.time_slot,
+                "activity_id": row.activity_id,
+                "activity_name": highlight(row.activity_name, terms),
+                "goal": highlight(row.goal, terms),
+                "notes": highlight(row.notes, terms),
+                "status": row.status,
+                "rank": row.rank
+            }
+            for row in rows
+        ]
+    return [
+        {
+            "type": "activity",
+            "id": row.id,
+            "name": highlight(row.name, terms),
+            "parent_id": row.parent_id,
+            "description": highlight(row.description, terms),
+            "rank": row.rank
+        }
+        for row in rows
+    ]
@@ -1,48 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict
+from sqlalchemy import func, case
+from typing import List, Dict, Literal, Optional
 from collections import defaultdict
+from datetime import date, timedelta
 
-from app.database import get_db
+from app.archive import event_source
+from app.database import get_db, async_endpoint
 from app.models.activity import Activity as ActivityModel
-from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
+from app.models.activity_closure import ActivityClosure
+from app.models.event_rollup import EventRollup
+from app.hierarchy import get_descendant_ids
+from app.recurrence import statistics_etag_parts, statistics_occurrences
+from app.rollup import month_bucket
+from app.versioning import not_modified_response
 
 router = APIRouter()
 
+# 趋势的补零在事件循环上逐桶执行，限制单次返回的桶数（日粒度约 10 年）
+MAX_TREND_BUCKETS = 3660
+
 def get_activity_descendants(db: Session, activity_id: int):
-    """递归获取活动的所有子活动ID"""
-    descendants = set()
-    
-    def collect_children(parent_id):
-        children = db.query(ActivityModel).filter(ActivityModel.parent_id == parent_id).all()
-        for child in children:
-            descendants.add(child.id)
-            collect_children(child.id)
-    
-    collect_children(activity_id)
-    return descendants
+    """通过闭包表一次查询获取活动的所有子活动ID"""
+    return get_descendant_ids(db, activity_id)
 
 @router.get("/summary")
-def get_summary_statistics(db: Session = Depends(get_db)):
-    """获取系统总体统计信息"""
+@async_endpoint
+def get_summary_statistics(
+    request: Request,
+    response: Response,
+    month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """获取系统总体统计信息，可按月份（YYYY-MM）过滤；事件数据读自汇总表，并计入重复规则的发生"""
+    # 重复规则的发生计到今天为止，有规则时统计随日期变化
+    today = date.today()
+    not_modified = not_modified_response(db, request, response, *statistics_etag_parts(db, today))
+    if not_modified:
+        return not_modified
+    
     total_activities = db.query(ActivityModel).count()
-    total_events = db.query(ScheduledEventModel).count()
-    completed_events = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.status == "completed"
-    ).count()
-    
-    # 按状态统计
-    status_stats = db.query(
-        ScheduledEventModel.status,
-        func.count(ScheduledEventModel.id).label('count')
-    ).group_by(ScheduledEventModel.status).all()
-    
-    # 按时间槽统计
-    timeslot_stats = db.query(
-        ScheduledEventModel.time_slot,
-        func.count(ScheduledEventModel.id).label('count')
-    ).group_by(ScheduledEventModel.time_slot).all()
+    
+    # 一次分组查询汇总表，状态分布与时间槽分布都由此计算
+    query = db.query(
+        EventRollup.status,
+        EventRollup.time_slot,
+        func.sum(EventRollup.event_count)
+    )
+    if month:
+        try:
+            year, month_number = (int(part) for part in month.split("-"))
+            bucket = date(year, month_number, 1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month. Expected YYYY-MM")
+        query = query.filter(EventRollup.bucket == bucket)
+    rollup_rows = query.group_by(EventRollup.status, EventRollup.time_slot).all()
+    
+    status_counts = defaultdict(int)
+    timeslot_counts = defaultdict(int)
+    for status, slot, count in rollup_rows:
+        if count:
+            status_counts[status] += count
+            timeslot_counts[slot] += count
+    
+    # 重复规则的发生不落库，展开后计入
+    for occurrence in statistics_occurrences(db, today):
+        if month and month_bucket(occurrence.event_date) != bucket:
+            continue
+        status_counts[occurrence.status] += 1
+        timeslot_counts[occurrence.time_slot] += 1
+    
+    total_events = sum(status_counts.values())
+    completed_events = status_counts.get("completed", 0)
+    status_stats = sorted(status_counts.items(), key=lambda item: (item[0] is not None, item[0] or ""))
+    timeslot_stats = sorted(timeslot_counts.items())
     
     slot_names = {
         21: "上午第1时段",
@@ -69,9 +100,147 @@ def get_summary_statistics(db: Session = Depends(get_db)):
         ]
     }
 
+def trend_bucket(day: date, granularity: str):
+    """日期所属趋势桶的起始日：当天、所在周的周一或当月第一天"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return month_bucket(day)
+    return day
+
+def next_trend_bucket(bucket: date, granularity: str):
+    if granularity == "week":
+        return bucket + timedelta(days=7)
+    if granularity == "month":
+        return date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+    return bucket + timedelta(days=1)
+
+def trend_bucket_count(first: date, last: date, granularity: str):
+    """[first, last] 覆盖的趋势桶数"""
+    first = trend_bucket(first, granularity)
+    last = trend_bucket(last, granularity)
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days // (7 if granularity == "week" else 1) + 1
+
+def check_trend_span(first: date, last: date, granularity: str):
+    if trend_bucket_count(first, last, granularity) > MAX_TREND_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large (max {MAX_TREND_BUCKETS} {granularity} buckets); narrow start/end or use a coarser granularity"
+        )
+
+@router.get("/trends")
+@async_endpoint
+def get_trends(
+    request: Request,
+    response: Response,
+    granularity: Literal["day", "week", "month"] = "month",
+    activity_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """按日/周/月统计事件数与完成率，可限定为某活动及其子树；每个请求只执行一次分组查询
+
+    月粒度读汇总表（按整月统计）；日、周粒度按日期分组后在内存中折叠为周，起点早于归档边界时包含归档的日程。
+    重复规则的发生在内存中展开后计入。首尾之间最多 MAX_TREND_BUCKETS 个桶，超出时返回 400。
+    """
+    today = date.today()
+    not_modified = not_modified_response(db, request, response, *statistics_etag_parts(db, today))
+    if not_modified:
+        return not_modified
+    
+    if activity_id is not None and db.get(ActivityModel, activity_id) is None:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if start and end:
+        check_trend_span(start, end, granularity)
+    
+    if granularity == "month":
+        date_column = EventRollup.bucket
+        query = db.query(
+            date_column,
+            func.sum(EventRollup.event_count),
+            func.sum(case((EventRollup.status == "completed", EventRollup.event_count), else_=0))
+        )
+        activity_column = EventRollup.activity_id
+        range_start = month_bucket(start) if start else None
+    else:
+        source = event_source(db, start)
+        date_column = source.event_date
+        query = db.query(
+            date_column,
+            func.count(source.id),
+            func.sum(case((source.status == "completed", 1), else_=0))
+        )
+        activity_column = source.activity_id
+        range_start = start
+    
+    subtree_ids = None
+    if activity_id is not None:
+        subtree_ids = get_descendant_ids(db, activity_id) | {activity_id}
+        # 通过闭包表包含整棵子树
+        query = query.join(
+            ActivityClosure, ActivityClosure.descendant_id == activity_column
+        ).filter(ActivityClosure.ancestor_id == activity_id)
+    if range_start:
+        query = query.filter(date_column >= range_start)
+    if end:
+        query = query.filter(date_column <= end)
+    rows = query.group_by(date_column).all()
+    
+    totals = defaultdict(lambda: [0, 0])
+    for day, total, completed in rows:
+        if total:
+            bucket = trend_bucket(day, granularity)
+            totals[bucket][0] += total
+            totals[bucket][1] += completed or 0
+    
+    for occurrence in statistics_occurrences(db, today):
+        if subtree_ids is not None and occurrence.activity_id not in subtree_ids:
+            continue
+        day = month_bucket(occurrence.event_date) if granularity == "month" else occurrence.event_date
+        if (range_start and day < range_start) or (end and day > end):
+            continue
+        bucket = trend_bucket(occurrence.event_date, granularity)
+        totals[bucket][0] += 1
+        totals[bucket][1] += occurrence.status == "completed"
+    
+    # 首尾之间没有事件的桶补零，便于直接绘图
+    buckets = []
+    first = trend_bucket(start, granularity) if start else min(totals, default=None)
+    last = trend_bucket(end, granularity) if end else max(totals, default=None)
+    if first is not None and last is not None and not (start and end):
+        # 未指定的一端由数据决定，补零前同样检查跨度
+        check_trend_span(first, last, granularity)
+    bucket = first
+    while bucket is not None and last is not None and bucket <= last:
+        total, completed = totals.get(bucket, (0, 0))
+        buckets.append({
+            "bucket": bucket.isoformat(),
+            "total_events": total,
+            "completed_events": completed,
+            "completion_rate": round(completed / total * 100, 2) if total > 0 else 0
+        })
+        bucket = next_trend_bucket(bucket, granularity)
+    
+    return {
+        "granularity": granularity,
+        "activity_id": activity_id,
+        "buckets": buckets
+    }
+
 @router.get("/activities/{activity_id}/statistics")
-def get_activity_statistics(activity_id: int, db: Session = Depends(get_db)):
+@async_endpoint
+def get_activity_statistics(activity_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """获取指定活动（包含子活动）的统计信息"""
+    today = date.today()
+    not_modified = not_modified_response(db, request, response, *statistics_etag_parts(db, today))
+    if not_modified:
+        return not_modified
+    
     # 验证活动存在
     activity = db.query(ActivityModel).filter(ActivityModel.id == activity_id).first()
     if not activity:
@@ -81,19 +250,27 @@ def get_activity_statistics(activity_id: int, db: Session = Depends(get_db)):
     target_ids = {activity_id}
     target_ids.update(get_activity_descendants(db, activity_id))
     
-    # 统计相关事件
-    events = db.query(ScheduledEventModel).filter(
-        ScheduledEventModel.activity_id.in_(target_ids)
-    ).all()
+    # 统计相关事件（含归档的日程）
+    source = event_source(db)
+    events = db.query(source, ActivityModel.name).join(
+        ActivityModel, source.activity_id == ActivityModel.id
+    ).filter(
+        source.activity_id.in_(target_ids)
+    ).order_by(source.id).all()
+    # 重复规则的发生与单独日程同样计入
+    events += [
+        (occurrence, occurrence.activity_name)
+        for occurrence in statistics_occurrences(db, today)
+        if occurrence.activity_id in target_ids
+    ]
     
     total_events = len(events)
-    completed_events = sum(1 for event in events if event.status == "completed")
+    completed_events = sum(1 for event, _ in events if event.status == "completed")
     
     # 按子活动分组统计
     activity_stats = defaultdict(lambda: {"total": 0, "completed": 0, "goals": []})
     
-    for event in events:
-        activity_name = db.query(ActivityModel).filter(ActivityModel.id == event.activity_id).first().name
+    for event, activity_name in events:
         activity_stats[activity_name]["total"] += 1
         if event.status == "completed":
             activity_stats[activity_name]["completed"] += 1
@@ -123,23 +300,49 @@ def get_activity_statistics(activity_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/activities/tree-statistics")
-def get_activity_tree_statistics(db: Session = Depends(get_db)):
+@async_endpoint
+def get_activity_tree_statistics(request: Request, response: Response, db: Session = Depends(get_db)):
     """获取活动树形结构及其统计信息"""
+    today = date.today()
+    not_modified = not_modified_response(db, request, response, *statistics_etag_parts(db, today))
+    if not_modified:
+        return not_modified
+    
+    activities = db.query(ActivityModel).order_by(ActivityModel.id).all()
+    
+    # 通过闭包表与汇总表一次聚合出每个活动子树（含自身）的事件数
+    subtree_stats = db.query(
+        ActivityClosure.ancestor_id,
+        func.sum(EventRollup.event_count),
+        func.sum(case((EventRollup.status == "completed", EventRollup.event_count), else_=0))
+    ).join(
+        EventRollup, EventRollup.activity_id == ActivityClosure.descendant_id
+    ).group_by(ActivityClosure.ancestor_id).all()
+    counts = {ancestor_id: [total or 0, completed or 0] for ancestor_id, total, completed in subtree_stats}
+    
+    # 重复规则的发生按闭包表累加到所属活动的每个祖先
+    occurrences = statistics_occurrences(db, today)
+    if occurrences:
+        ancestors = defaultdict(list)
+        for ancestor_id, descendant_id in db.query(ActivityClosure.ancestor_id, ActivityClosure.descendant_id).filter(
+            ActivityClosure.descendant_id.in_({occurrence.activity_id for occurrence in occurrences})
+        ):
+            ancestors[descendant_id].append(ancestor_id)
+        for occurrence in occurrences:
+            for ancestor_id in ancestors[occurrence.activity_id]:
+                stats = counts.setdefault(ancestor_id, [0, 0])
+                stats[0] += 1
+                stats[1] += occurrence.status == "completed"
+    
+    children_by_parent = defaultdict(list)
+    for activity in activities:
+        children_by_parent[activity.parent_id].append(activity)
+    
     def build_tree_with_stats(parent_id=None):
-        children = db.query(ActivityModel).filter(ActivityModel.parent_id == parent_id).all()
         result = []
         
-        for child in children:
-            # 获取该活动及其所有子活动的事件统计
-            target_ids = {child.id}
-            target_ids.update(get_activity_descendants(db, child.id))
-            
-            events = db.query(ScheduledEventModel).filter(
-                ScheduledEventModel.activity_id.in_(target_ids)
-            ).all()
-            
-            total_events = len(events)
-            completed_events = sum(1 for event in events if event.status == "completed")
+        for child in children_by_parent.get(parent_id, []):
+            total_events, completed_events = counts.get(child.id, (0, 0))
             
             child_data = {
                 "id": child.id,
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import date
+import asyncio
+
+import orjson
+
+from app.config import settings
+from app.database import get_async_session_scope
+from app.live import RESYNC, change_feed
+from app.versioning import get_data_version
+
+router = APIRouter()
+
+def sse_message(event: str, data, id: int = None):
+    lines = f"id: {id}\n" if id is not None else ""
+    return f"{lines}event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+async def event_stream(session_scope, start_date: date, end_date: date):
+    """先发送 ready（当前数据版本），之后逐批发送 change；空闲时定期发送注释行作为心跳"""
+    # 先订阅再读版本号，两者之间提交的变更不会漏掉（至多重复一次）
+    subscription = change_feed.subscribe(session_scope, start_date, end_date)
+    try:
+        # 只在建立连接时短暂占用一个数据库连接，长连接期间不持有会话
+        async with session_scope() as db:
+            version = await db.run_sync(get_data_version)
+        yield sse_message("ready", {"version": version}, version)
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), settings.stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is RESYNC:
+                yield sse_message("resync", {})
+            else:
+                yield sse_message("change", item, item["version"])
+    finally:
+        # 客户端断开时 StreamingResponse 取消本生成器
+        change_feed.unsubscribe(subscription)
+
+@router.get("")
+async def stream_changes(start_date: date = None, end_date: date = None, session_scope=Depends(get_async_session_scope)):
+    """Server-Sent Events 变更推送，可只订阅 [start_date, end_date] 日期窗口内的日程变更
+
+    事件：ready（连接时的数据版本）、change（{"version", "changes": [{entity, op, id, date, slot}]}）、
+    resync（积压过多被丢弃，客户端需重新拉取整个视图）。活动与重复规则的变更不带日期，总会推送。
+    其他 worker 进程的写入经轮询变更日志转发，op 为 upsert/delete 且不带日期。
+    """
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    return StreamingResponse(
+        event_stream(session_scope, start_date, end_date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def get_stream_stats():
+    """当前订阅数、已广播批次（forwarded 为转发的其他进程写入）与 resync 次数"""
+    return change_feed.stats()
@@ -0,0 +1,134 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from collections import defaultdict
+
+from app.changelog import SYNC_ENTITIES, get_compacted_version
+from app.database import get_db, async_endpoint
+from app.models.archived_event import ArchivedEvent
+from app.models.change_log import ChangeLogEntry
+from app.models.recurrence_exception import RecurrenceException
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.recurrence import parse_weekdays
+from app.serialization import json_response
+from app.versioning import get_data_version
+
+router = APIRouter()
+
+def activity_row(activity):
+    return {
+        "id": activity.id,
+        "name": activity.name,
+        "parent_id": activity.parent_id,
+        "description": activity.description,
+        "created_at": activity.created_at
+    }
+
+def event_row(event):
+    return {
+        "id": event.id,
+        "activity_id": event.activity_id,
+        "event_date": event.event_date,
+        "time_slot": event.time_slot,
+        "goal": event.goal,
+        "notes": event.notes,
+        "status": event.status
+    }
+
+def recurrence_row(rule, exceptions):
+    return {
+        "id": rule.id,
+        "activity_id": rule.activity_id,
+        "time_slot": rule.time_slot,
+        "freq": rule.freq,
+        "interval": rule.interval,
+        "weekdays": sorted(parse_weekdays(rule.weekdays)) or None,
+        "start_date": rule.start_date,
+        "until": rule.until,
+        "count": rule.count,
+        "goal": rule.goal,
+        "notes": rule.notes,
+        "exceptions": exceptions
+    }
+
+def load_rows(db: Session, entity: str, ids):
+    """按实体一次查询取出当前行，返回 {id: 行字典}"""
+    if not ids:
+        return {}
+    model = SYNC_ENTITIES[entity]
+    rows = db.query(model).filter(model.id.in_(ids)).all()
+    if entity == "activity":
+        return {row.id: activity_row(row) for row in rows}
+    if entity == "event":
+        # 不在热表中的日程可能已归档，归档不改变内容，仍按原 id 同步
+        missing = set(ids) - {row.id for row in rows}
+        if missing:
+            rows += db.query(ArchivedEvent).filter(ArchivedEvent.id.in_(missing)).all()
+        return {row.id: event_row(row) for row in rows}
+
+    exceptions = defaultdict(list)
+    for exception in db.query(RecurrenceException).filter(
+        RecurrenceException.rule_id.in_(ids)
+    ).order_by(RecurrenceException.occurrence_date):
+        exceptions[exception.rule_id].append({"date": exception.occurrence_date, "status": exception.status})
+    return {row.id: recurrence_row(row, exceptions[row.id]) for row in rows}
+
+@router.get("/changes")
+@async_endpoint
+def get_changes(
+    response: Response,
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: str = None,
+    db: Session = Depends(get_db)
+):
+    """返回数据版本 since 之后变更过的实体：upsert 附带当前行，delete 为墓碑
+
+    since=0 为全量同步（只含现存的行）。一页未取完时 has_more 为 true，下一页游标通过 X-Next-Cursor
+    响应头返回（请求时保留同一个 since）；取完后把 next_since 保存为下次的 since。
+    since 早于日志压缩版本时墓碑可能已被清除，返回 410，客户端需以 since=0 重新全量同步。
+    """
+    compacted = get_compacted_version(db)
+    if 0 < since < compacted:
+        raise HTTPException(
+            status_code=410,
+            detail=f"Change log compacted through version {compacted}; resync with since=0"
+        )
+
+    # 先读当前版本并只取不超过它的变更：之后提交的变更版本更高，下次同步一定能取到
+    current = get_data_version(db)
+    query = db.query(ChangeLogEntry).filter(ChangeLogEntry.version > since, ChangeLogEntry.version <= current)
+    if since == 0:
+        query = query.filter(ChangeLogEntry.op == "upsert")
+    if cursor:
+        query = query.filter(tuple_(ChangeLogEntry.version, ChangeLogEntry.id) > tuple_(*decode_cursor(cursor, int, int)))
+    entries = query.order_by(ChangeLogEntry.version, ChangeLogEntry.id).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    if has_more:
+        entries = entries[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(entries[-1].version, entries[-1].id)
+
+    ids_by_entity = defaultdict(list)
+    for entry in entries:
+        if entry.op == "upsert":
+            ids_by_entity[entry.entity].append(entry.entity_id)
+    rows = {entity: load_rows(db, entity, ids) for entity, ids in ids_by_entity.items()}
+
+    changes = []
+    for entry in entries:
+        data = rows.get(entry.entity, {}).get(entry.entity_id) if entry.op == "upsert" else None
+        changes.append({
+            "entity": entry.entity,
+            "id": entry.entity_id,
+            "op": entry.op,
+            "version": entry.version,
+            "data": data
+        })
+
+    return json_response({
+        "changes": changes,
+        "has_more": has_more,
+        "next_since": None if has_more else max(current, since),
+        "version": current
+    }, response)
@@ -0,0 +1,172 @@
+"""历史日程的冷热分离
+
+早于归档期限的日程从 scheduled_events 移到 archived_events（保留原 id），热表只保留近期数据，
+常用的近期查询扫描的行数与历史长度无关。归档区是日期的前缀：archived_events 中最大的日期即归档边界，
+热表中的日程都晚于该边界。查询范围起点不晚于边界时才读取 scheduled_events 与 archived_events 的并集。
+
+归档不改变数据内容：汇总表、变更日志和全文索引继续包含归档的日程，统计与同步不受影响。
+归档区只读，修改其中的日程前需要先把该日期之后的归档恢复到热表。
+
+用法:
+    python -m app.archive archive [--days 365]
+    python -m app.archive restore --since 2023-01-01
+    python -m app.archive status
+"""
+import argparse
+from datetime import date, timedelta
+
+from sqlalchemy import delete, func, insert, select, text, union_all
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models.models import ArchivedEvent, ScheduledEvent as ScheduledEventModel
+from app.search import install_search_index
+from app.versioning import bump_data_version
+
+EVENT_COLUMNS = ("id", "activity_id", "event_date", "time_slot", "goal", "notes", "status")
+
+def archived_through(db: Session):
+    """归档边界：归档区最晚的日期，没有归档时为 None"""
+    return db.query(func.max(ArchivedEvent.event_date)).scalar()
+
+def reaches_archive(db: Session, start_date: date = None):
+    """查询范围（起点为 None 表示不限）是否包含归档区"""
+    through = archived_through(db)
+    return through is not None and (start_date is None or start_date <= through)
+
+def all_events():
+    """热表与归档表的 UNION ALL 子查询，列与 scheduled_events 相同"""
+    return union_all(
+        select(*(ScheduledEventModel.__table__.c[name] for name in EVENT_COLUMNS)),
+        select(*(ArchivedEvent.__table__.c[name] for name in EVENT_COLUMNS))
+    ).subquery("all_events")
+
+def event_source(db: Session, start_date: date = None):
+    """查询日程的实体：范围包含归档区时为映射到并集的 ScheduledEvent 别名，否则为 ScheduledEvent 本身
+
+    两者属性相同，调用方把原来的 ScheduledEventModel 替换为返回值即可。
+    """
+    if reaches_archive(db, start_date):
+        return aliased(ScheduledEventModel, all_events(), name="all_events")
+    return ScheduledEventModel
+
+def is_archived_event(db: Session, event_id: int):
+    return db.query(ArchivedEvent.id).filter(ArchivedEvent.id == event_id).first() is not None
+
+def _year_ranges(first: date, last: date):
+    """把 [first, last] 按自然年切分，每年一个事务内的批次"""
+    start = first
+    while start <= last:
+        end = min(date(start.year, 12, 31), last)
+        yield start, end
+        start = end + timedelta(days=1)
+
+def _move(db: Session, source, target, start: date, end: date):
+    """把 source 表中 [start, end] 的日程移到 target 表，返回移动的行数
+
+    先 DELETE ... RETURNING 再写入：两张表各自的触发器先删后建全文索引行，rowid 不会冲突。
+    """
+    rows = db.execute(delete(source).where(
+        source.c.event_date >= start,
+        source.c.event_date <= end
+    ).returning(*(source.c[name] for name in EVENT_COLUMNS))).mappings().all()
+    if rows:
+        db.execute(insert(target), [dict(row) for row in rows])
+    return len(rows)
+
+def archive_events(db: Session, before: date):
+    """把早于 before 的热表日程移入归档区，按年分批；返回移动的行数"""
+    hot = ScheduledEventModel.__table__
+    first = db.query(func.min(hot.c.event_date)).filter(hot.c.event_date < before).scalar()
+    if first is None:
+        return 0
+    moved = 0
+    for start, end in _year_ranges(first, before - timedelta(days=1)):
+        moved += _move(db, hot, ArchivedEvent.__table__, start, end)
+    # 内容不变，但读取路径变了：递增版本使各进程的视图缓存与客户端 ETag 失效
+    bump_data_version(db)
+    return moved
+
+def restore_events(db: Session, since: date):
+    """把 since 及之后的归档日程移回热表（归档区保持为日期前缀），返回移动的行数"""
+    through = archived_through(db)
+    if through is None or through < since:
+        return 0
+    cold = ArchivedEvent.__table__
+    first = db.query(func.min(cold.c.event_date)).filter(cold.c.event_date >= since).scalar()
+    moved = 0
+    for start, end in _year_ranges(first, through):
+        moved += _move(db, cold, ScheduledEventModel.__table__, start, end)
+    bump_data_version(db)
+    return moved
+
+def archive_cutoff(days: int, today: date = None):
+    """早于该日期的日程会被归档"""
+    return (today or date.today()) - timedelta(days=days)
+
+def install_archive(db: Session):
+    """旧 SQLite 数据库的 scheduled_events 没有 AUTOINCREMENT，最大 id 的行被归档后该 id 会被新日程复用；
+    此时按原结构重建为 AUTOINCREMENT 表（保留 id）。返回是否重建。
+
+    旧表的全文索引触发器随表删除，重建后需要调用 install_search_index 重新创建（索引内容不变）。
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    ddl = db.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'scheduled_events'"
+    )).scalar()
+    if ddl is None or "AUTOINCREMENT" in ddl.upper():
+        return False
+
+    columns = ", ".join(EVENT_COLUMNS)
+    db.execute(text("CREATE TEMP TABLE scheduled_events_copy AS SELECT * FROM scheduled_events WHERE 0"))
+    # 第一条 DML 开启事务，之后的 DDL 都在同一事务中，中途失败时整体回滚
+    db.execute(text("INSERT INTO scheduled_events_copy SELECT * FROM scheduled_events"))
+    # 活动改名的触发器引用 scheduled_events，重建期间表不存在，先删除
+    db.execute(text("DROP TRIGGER IF EXISTS activity_search_au"))
+    db.execute(text("DROP TABLE scheduled_events"))
+    ScheduledEventModel.__table__.create(bind=db.connection())
+    db.execute(text(f"INSERT INTO scheduled_events ({columns}) SELECT {columns} FROM scheduled_events_copy"))
+    db.execute(text("DROP TABLE scheduled_events_copy"))
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old events or restore archived ones")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_parser = commands.add_parser("archive", help="move events older than the horizon to the archive")
+    archive_parser.add_argument("--days", type=int, default=settings.archive_after_days or None,
+                                required=not settings.archive_after_days,
+                                help="archive events older than this many days")
+    restore_parser = commands.add_parser("restore", help="move archived events back to the hot table")
+    restore_parser.add_argument("--since", required=True, type=date.fromisoformat,
+                                help="restore events on or after this date (YYYY-MM-DD)")
+    commands.add_parser("status", help="show the archive horizon")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if install_archive(db):
+            install_search_index(db)
+            db.commit()
+        if args.command == "archive":
+            if args.days <= 0:
+                parser.error("--days must be positive")
+            moved = archive_events(db, archive_cutoff(args.days))
+            db.commit()
+            print(f"Events archived: {moved}, archived through {archived_through(db)}")
+        elif args.command == "restore":
+            moved = restore_events(db, args.since)
+            db.commit()
+            print(f"Events restored: {moved}, archived through {archived_through(db)}")
+        else:
+            hot = db.query(func.count(ScheduledEventModel.id)).scalar()
+            cold = db.query(func.count(ArchivedEvent.id)).scalar()
+            print(f"Hot events: {hot}, archived events: {cold}, archived through {archived_through(db)}")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+"""直接写库的批量导入与合成数据生成
+
+用法:
+    python -m app.bulk_load load --activities activities.json --events events.csv
+    python -m app.bulk_load generate --years 3 --depth 3 --fanout 4 --fill 0.6 --seed 42
+    python -m app.bulk_load generate --events 1000000 --fill 1.0 --database-url sqlite:///data/capacity.db
+
+活动文件字段: id, name, parent_id, description（id/parent_id 为文件内的编号，
+parent_id 不在文件中时视为数据库中已有的活动ID）。
+日程文件字段: activity_id, event_date, time_slot, goal, notes, status（activity_id
+优先匹配活动文件中的编号，否则视为已有活动ID）。
+文件格式按扩展名识别：.json 为对象数组，.csv 首行为列名。
+"""
+import argparse
+import csv
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import replace
+from datetime import date, timedelta
+from itertools import islice
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.scheduled_events import VALID_SLOTS
+from app.archive import archived_through
+from app.changelog import log_new_rows, max_entity_id
+from app.config import settings
+from app.database import Base, SessionLocal, create_db_engine, engine
+from app.hierarchy import add_activity_node
+from app.models.models import Activity as ActivityModel, ScheduledEvent as ScheduledEventModel
+from app.rollup import apply_rollup_deltas, month_bucket
+from app.versioning import bump_data_version
+
+CHUNK_SIZE = 10000
+VALID_STATUSES = {"planned", "completed"}
+SAMPLE_GOALS = ["阅读文献", "整理笔记", "编写代码", "数据分析", "撰写报告", "复盘总结", None]
+# 生成数据默认的最后一天；固定日期保证同一 --seed 在任何一天生成的数据都相同
+DEFAULT_END_DATE = date(2025, 6, 30)
+
+def read_records(path: str):
+    """读取 JSON 数组或 CSV 文件，返回字典列表；CSV 中的空字符串视为空值"""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError(f"{path}: expected a JSON array")
+        return records
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            return [{key: value if value != "" else None for key, value in row.items()} for row in csv.DictReader(f)]
+    raise ValueError(f"{path}: unsupported file type, expected .json or .csv")
+
+def insert_activities(db: Session, records):
+    """按父活动优先的顺序写入活动并维护闭包表，返回文件编号到数据库ID的映射"""
+    keys = {str(record.get("id", index)) for index, record in enumerate(records)}
+    pending = [(str(record.get("id", index)), record) for index, record in enumerate(records)]
+    id_map = {}
+
+    while pending:
+        remaining = []
+        for key, record in pending:
+            parent_key = record.get("parent_id")
+            if parent_key is None:
+                parent_id = None
+            elif str(parent_key) in keys:
+                if str(parent_key) not in id_map:
+                    remaining.append((key, record))
+                    continue
+                parent_id = id_map[str(parent_key)]
+            else:
+                parent_id = int(parent_key)
+                if db.get(ActivityModel, parent_id) is None:
+                    raise ValueError(f"Activity {key}: parent {parent_key} not found")
+
+            activity = ActivityModel(name=record["name"], parent_id=parent_id, description=record.get("description"))
+            db.add(activity)
+            db.flush()
+            add_activity_node(db, activity.id, parent_id)
+            id_map[key] = activity.id
+
+        if len(remaining) == len(pending):
+            raise ValueError(f"Activities with cyclic parents: {', '.join(key for key, _ in remaining)}")
+        pending = remaining
+    return id_map
+
+def _parse_event(record, id_map, known_activity_ids):
+    activity_key = str(record["activity_id"])
+    activity_id = id_map[activity_key] if activity_key in id_map else int(activity_key)
+    if activity_id not in known_activity_ids:
+        raise ValueError(f"Activity {record['activity_id']} not found")
+
+    event_date = record["event_date"]
+    if not isinstance(event_date, date):
+        event_date = date.fromisoformat(event_date)
+    time_slot = int(record["time_slot"])
+    if time_slot not in VALID_SLOTS:
+        raise ValueError(f"Invalid time slot {time_slot}")
+    status = record.get("status") or "planned"
+    if status not in VALID_STATUSES:
+        raise ValueError(f"Invalid status {status}")
+
+    return {
+        "activity_id": activity_id,
+        "event_date": event_date,
+        "time_slot": time_slot,
+        "goal": record.get("goal"),
+        "notes": record.get("notes"),
+        "status": status
+    }
+
+def _occupied_slots(db: Session, rows):
+    """查询本批日期范围内已被占用的时间槽"""
+    dates = [row["event_date"] for row in rows]
+    occupied = db.query(ScheduledEventModel.event_date, ScheduledEventModel.time_slot).filter(
+        ScheduledEventModel.event_date >= min(dates),
+        ScheduledEventModel.event_date <= max(dates)
+    ).all()
+    return {(event_date, time_slot) for event_date, time_slot in occupied}
+
+def insert_events(db: Session, rows):
+    """分批 executemany 写入日程并累计汇总表增量；已占用的时间槽与归档区（只读）内的日期跳过。
+
+    返回 (写入数, 跳过数)。
+    """
+    deltas = Counter()
+    inserted = skipped = 0
+    rows = iter(rows)
+    through = archived_through(db)
+
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        taken = _occupied_slots(db, chunk)
+        accepted = []
+        for row in chunk:
+            slot_key = (row["event_date"], row["time_slot"])
+            if slot_key in taken or (through is not None and row["event_date"] <= through):
+                skipped += 1
+                continue
+            taken.add(slot_key)
+            accepted.append(row)
+            deltas[(row["activity_id"], month_bucket(row["event_date"]), row["time_slot"], row["status"])] += 1
+
+        if accepted:
+            db.execute(insert(ScheduledEventModel.__table__), accepted)
+            inserted += len(accepted)
+
+    apply_rollup_deltas(db, deltas)
+    return inserted, skipped
+
+def build_activity_tree(roots: int, depth: int, fanout: int):
+    """生成完整的活动树记录：roots 个顶级活动，每层 fanout 个子活动，共 depth 层"""
+    records = []
+    level = []
+    for index in range(1, roots + 1):
+        key = str(index)
+        records.append({"id": key, "name": f"活动 {key}", "parent_id": None})
+        level.append(key)
+
+    for _ in range(depth - 1):
+        next_level = []
+        for parent_key in level:
+            for index in range(1, fanout + 1):
+                key = f"{parent_key}.{index}"
+                records.append({"id": key, "name": f"活动 {key}", "parent_id": parent_key})
+                next_level.append(key)
+        level = next_level
+    return records
+
+def generate_events(rng: random.Random, activity_ids, end_date: date, fill: float,
+                    years: float = None, max_events: int = None, completed_ratio: float = 0.7):
+    """从 end_date 向前逐日生成日程；给定 max_events 时历史向前延伸到数量足够为止
+
+    end_date 视为数据集的"今天"：之前的日程按 completed_ratio 标记为已完成。结果只取决于 rng 与参数。
+    """
+    first_day = end_date - timedelta(days=round(years * 365)) + timedelta(days=1) if years else None
+    day = end_date
+    emitted = 0
+
+    while (first_day is None or day >= first_day) and (max_events is None or emitted < max_events):
+        for slot in VALID_SLOTS:
+            if rng.random() >= fill:
+                continue
+            completed = rng.random() < completed_ratio
+            yield {
+                "activity_id": rng.choice(activity_ids),
+                "event_date": day,
+                "time_slot": slot,
+                "goal": rng.choice(SAMPLE_GOALS),
+                "notes": None,
+                "status": "completed" if completed and day < end_date else "planned"
+            }
+            emitted += 1
+            if max_events is not None and emitted >= max_events:
+                return
+        day -= timedelta(days=1)
+
+def load_files(db: Session, activities_path: str = None, events_path: str = None):
+    id_map = insert_activities(db, read_records(activities_path)) if activities_path else {}
+    print(f"Activities loaded: {len(id_map)}")
+
+    inserted = skipped = 0
+    if events_path:
+        known_activity_ids = {row.id for row in db.query(ActivityModel.id)}
+        rows = (
+            _parse_event(record, id_map, known_activity_ids)
+            for record in read_records(events_path)
+        )
+        inserted, skipped = insert_events(db, rows)
+    return inserted, skipped
+
+def generate(db: Session, args):
+    rng = random.Random(args.seed)
+    id_map = insert_activities(db, build_activity_tree(args.roots, args.depth, args.fanout))
+    print(f"Activities generated: {len(id_map)}")
+
+    # 时间槽唯一，每天最多 5 条；给定 --events 而未给 --years 时，历史长度由数量决定
+    years = args.years if args.years is not None or args.events is not None else 1
+    end_date = date.fromisoformat(args.end_date) if args.end_date else DEFAULT_END_DATE
+    rows = generate_events(rng, sorted(id_map.values()), end_date, args.fill, years, args.events, args.completed_ratio)
+    return insert_events(db, rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load activities and events directly into the database")
+    parser.add_argument("--database-url", help="target database (defaults to LAE_DATABASE_URL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = commands.add_parser("load", help="load activities/events from JSON or CSV files")
+    load_parser.add_argument("--activities")
+    load_parser.add_argument("--events")
+
+    generate_parser = commands.add_parser("generate", help="generate a synthetic dataset")
+    generate_parser.add_argument("--years", type=float, help="years of history (default 1)")
+    generate_parser.add_argument("--events", type=int, help="stop after this many events")
+    generate_parser.add_argument("--end-date", help=f"last generated date, YYYY-MM-DD (default {DEFAULT_END_DATE})")
+    generate_parser.add_argument("--roots", type=int, default=3)
+    generate_parser.add_argument("--depth", type=int, default=3)
+    generate_parser.add_argument("--fanout", type=int, default=4)
+    generate_parser.add_argument("--fill", type=float, default=0.6, help="probability that a slot is scheduled")
+    generate_parser.add_argument("--completed-ratio", type=float, default=0.7)
+    generate_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "load" and not (args.activities or args.events):
+        parser.error("load requires --activities and/or --events")
+    if args.command == "generate" and not 0 < args.fill <= 1:
+        parser.error("--fill must be in (0, 1]")
+
+    target_engine = create_db_engine(replace(settings, database_url=args.database_url)) if args.database_url else engine
+    Base.metadata.create_all(bind=target_engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=target_engine)() if args.database_url else SessionLocal()
+
+    start = time.perf_counter()
+    try:
+        # 新写入的行 id 都大于导入前的最大值，导入后一次性记入增量同步日志
+        last_ids = {entity: max_entity_id(db, entity) for entity in ("activity", "event")}
+        if args.command == "load":
+            inserted, skipped = load_files(db, args.activities, args.events)
+        else:
+            inserted, skipped = generate(db, args)
+        version = bump_data_version(db)
+        for entity, last_id in last_ids.items():
+            log_new_rows(db, version, entity, last_id)
+        db.commit()
+    except (ValueError, KeyError) as exc:
+        db.rollback()
+        print(f"Load failed: {exc!r}")
+        return 1
+    finally:
+        db.close()
+
+    print(f"Events inserted: {inserted}, skipped (slot occupied or archived): {skipped}, {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+"""增量同步的变更日志
+
+每个写接口在提交前把本事务的变更写入 change_log（与写入同一事务），版本号为本次递增后的数据版本。
+日志按实体压缩：每个 (entity, entity_id) 只保留最近一次变更，删除留下墓碑（op=delete）。
+墓碑超过保留期后由 compact_change_log 清除，并记录压缩到的版本；since 早于该版本的客户端需要全量同步。
+
+用法: python -m app.changelog compact [--days 90]
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models.models import (
+    Activity as ActivityModel, ChangeLogEntry, DataVersion, RecurrenceRule, ScheduledEvent as ScheduledEventModel
+)
+from app.versioning import get_data_version
+
+# 同步的实体及其表；重复规则的例外随规则一起同步
+SYNC_ENTITIES = {
+    "activity": ActivityModel,
+    "event": ScheduledEventModel,
+    "recurrence": RecurrenceRule
+}
+
+# data_version 表中记录压缩版本的行
+COMPACTED_VERSION_ID = 2
+
+# 按实体删除旧日志行时每条语句的 IN 列表长度
+DELETE_CHUNK_SIZE = 500
+
+def log_changes(db: Session, version: int, changes):
+    """把变更（app.live.change 构造的字典）写入日志；同一实体多次变更只保留最后一次"""
+    latest = {}
+    for item in changes:
+        latest[(item["entity"], item["id"])] = "delete" if item["op"] == "delete" else "upsert"
+    if not latest:
+        return
+
+    ids_by_entity = defaultdict(list)
+    for entity, entity_id in latest:
+        ids_by_entity[entity].append(entity_id)
+    for entity, ids in ids_by_entity.items():
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            db.execute(delete(ChangeLogEntry).where(
+                ChangeLogEntry.entity == entity,
+                ChangeLogEntry.entity_id.in_(ids[start:start + DELETE_CHUNK_SIZE])
+            ))
+    db.execute(insert(ChangeLogEntry), [
+        {"entity": entity, "entity_id": entity_id, "op": op, "version": version}
+        for (entity, entity_id), op in latest.items()
+    ])
+
+def max_entity_id(db: Session, entity: str):
+    return db.query(func.max(SYNC_ENTITIES[entity].id)).scalar() or 0
+
+def log_new_rows(db: Session, version: int, entity: str, after_id: int = 0):
+    """把 id 大于 after_id 的行全部记为 upsert，在数据库内一条 INSERT ... SELECT 完成（批量导入与回填用）"""
+    model = SYNC_ENTITIES[entity]
+    db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.entity == entity, ChangeLogEntry.entity_id > after_id))
+    db.execute(insert(ChangeLogEntry).from_select(
+        ["entity", "entity_id", "op", "version"],
+        select(literal(entity), model.id, literal("upsert"), literal(version)).where(model.id > after_id)
+    ))
+
+def install_change_log(db: Session):
+    """日志为空时（旧数据库升级）把已有数据记为当前版本的 upsert；返回是否做了回填"""
+    if db.query(ChangeLogEntry.id).first() is not None:
+        return False
+    version = get_data_version(db)
+    for entity in SYNC_ENTITIES:
+        log_new_rows(db, version, entity)
+    return True
+
+def get_compacted_version(db: Session):
+    row = db.query(DataVersion.version).filter(DataVersion.id == COMPACTED_VERSION_ID).first()
+    return row.version if row else 0
+
+def compact_change_log(db: Session, retention_days: int):
+    """清除早于保留期的删除墓碑并推进压缩版本；返回清除的行数"""
+    cutoff = datetime.utcnow().replace(microsecond=0) - timedelta(days=retention_days)
+    horizon = db.query(func.max(ChangeLogEntry.version)).filter(
+        ChangeLogEntry.op == "delete",
+        ChangeLogEntry.changed_at < cutoff
+    ).scalar()
+    if horizon is None:
+        return 0
+
+    removed = db.execute(delete(ChangeLogEntry).where(
+        ChangeLogEntry.op == "delete",
+        ChangeLogEntry.version <= horizon
+    )).rowcount
+    if get_compacted_version(db) == 0:
+        db.execute(insert(DataVersion).values(id=COMPACTED_VERSION_ID, version=horizon))
+    else:
+        db.execute(update(DataVersion).where(
+            DataVersion.id == COMPACTED_VERSION_ID,
+            DataVersion.version < horizon
+        ).values(version=horizon))
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the sync change log")
+    parser.add_argument("command", choices=["compact"])
+    parser.add_argument("--days", type=int, default=settings.change_log_retention_days,
+                        help="keep delete tombstones for this many days")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        removed = compact_change_log(db, args.days)
+        db.commit()
+        print(f"Tombstones removed: {removed}, compacted through version {get_compacted_version(db)}")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+import os
+from dataclasses import dataclass
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+@dataclass(frozen=True)
+class Settings:
+    """运行配置，全部可通过 LAE_ 前缀的环境变量覆盖"""
+    database_url: str = "sqlite:///data/lae_schedule.db"
+    # 为空时由 database_url 推导（sqlite -> sqlite+aiosqlite 等）
+    async_database_url: str = ""
+    echo_sql: bool = False
+    
+    # 连接池（内存 SQLite 不使用）
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: int = 30
+    pool_recycle: int = -1
+    
+    # 周/月视图缓存条目数，0 表示关闭
+    view_cache_size: int = 256
+    
+    # 超过该毫秒数的请求记录慢请求日志（含最慢的 SQL），0 表示关闭
+    slow_request_ms: int = 500
+    
+    # /api/stream 每个订阅者最多积压的变更批次，超过后改发 resync；心跳间隔秒数
+    stream_queue_size: int = 256
+    stream_heartbeat_seconds: int = 15
+    # 有订阅者时轮询数据版本、转发其他进程写入的间隔毫秒数，0 表示关闭（单进程部署）
+    stream_poll_ms: int = 1000
+    
+    # 增量同步日志中删除墓碑的保留天数，启动时清除更早的墓碑；0 表示不自动压缩
+    change_log_retention_days: int = 90
+    
+    # 早于该天数的日程在启动时移入归档表，热表只保留近期数据；0 表示不自动归档
+    archive_after_days: int = 0
+    
+    # 生产模式（serve.py）：监听地址、worker 进程数（0 为 CPU 核数）、
+    # 优雅退出等待秒数、每个 worker 处理多少请求后重启（0 为不重启）
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 0
+    graceful_timeout: int = 30
+    max_requests: int = 0
+    # 应用启动时建表并回填派生数据；serve.py 在主进程执行一次后对 worker 关闭
+    init_db_on_startup: bool = True
+    
+    # SQLite 连接级 PRAGMA
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 64000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    
+    @classmethod
+    def from_env(cls):
+        defaults = cls()
+        return cls(
+            database_url=os.environ.get("LAE_DATABASE_URL", defaults.database_url),
+            async_database_url=os.environ.get("LAE_ASYNC_DATABASE_URL", defaults.async_database_url),
+            echo_sql=_env_bool("LAE_ECHO_SQL", defaults.echo_sql),
+            pool_size=_env_int("LAE_DB_POOL_SIZE", defaults.pool_size),
+            max_overflow=_env_int("LAE_DB_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=_env_int("LAE_DB_POOL_TIMEOUT", defaults.pool_timeout),
+            pool_recycle=_env_int("LAE_DB_POOL_RECYCLE", defaults.pool_recycle),
+            view_cache_size=_env_int("LAE_VIEW_CACHE_SIZE", defaults.view_cache_size),
+            slow_request_ms=_env_int("LAE_SLOW_REQUEST_MS", defaults.slow_request_ms),
+            stream_queue_size=_env_int("LAE_STREAM_QUEUE_SIZE", defaults.stream_queue_size),
+            stream_heartbeat_seconds=_env_int("LAE_STREAM_HEARTBEAT_SECONDS", defaults.stream_heartbeat_seconds),
+            stream_poll_ms=_env_int("LAE_STREAM_POLL_MS", defaults.stream_poll_ms),
+            change_log_retention_days=_env_int("LAE_CHANGE_LOG_RETENTION_DAYS", defaults.change_log_retention_days),
+            archive_after_days=_env_int("LAE_ARCHIVE_AFTER_DAYS", defaults.archive_after_days),
+            host=os.environ.get("LAE_HOST", defaults.host),
+            port=_env_int("LAE_PORT", defaults.port),
+            workers=_env_int("LAE_WORKERS", defaults.workers),
+            graceful_timeout=_env_int("LAE_GRACEFUL_TIMEOUT", defaults.graceful_timeout),
+            max_requests=_env_int("LAE_MAX_REQUESTS", defaults.max_requests),
+            init_db_on_startup=_env_bool("LAE_INIT_DB_ON_STARTUP", defaults.init_db_on_startup),
+            sqlite_wal=_env_bool("LAE_SQLITE_WAL", defaults.sqlite_wal),
+            sqlite_synchronous=os.environ.get("LAE_SQLITE_SYNCHRONOUS", defaults.sqlite_synchronous).upper(),
+            sqlite_busy_timeout_ms=_env_int("LAE_SQLITE_BUSY_TIMEOUT_MS", defaults.sqlite_busy_timeout_ms),
+            sqlite_cache_size_kb=_env_int("LAE_SQLITE_CACHE_SIZE_KB", defaults.sqlite_cache_size_kb),
+            sqlite_mmap_size=_env_int("LAE_SQLITE_MMAP_SIZE", defaults.sqlite_mmap_size),
+        )
+
+    def __post_init__(self):
+        if self.sqlite_synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid LAE_SQLITE_SYNCHRONOUS: {self.sqlite_synchronous}")
+
+settings = Settings.from_env()
@@ -1,14 +1,62 @@
-from app.database import engine, Base
-from app.models.models import Activity, ScheduledEvent
+from app.database import engine, Base, SessionLocal
+from app.archive import archive_cutoff, archive_events, install_archive
+from app.changelog import install_change_log, compact_change_log
+from app.config import settings
+from app.models.models import Activity, ActivityClosure, EventRollup, ScheduledEvent
+from app.hierarchy import rebuild_closure
+from app.rollup import rebuild_rollup
+from app.search import install_search_index, rebuild_search_index
+from app.slots import install_slot_index
 import os
 
-def create_tables():
+def init_db():
+    """创建缺失的表，并为已有数据回填派生索引"""
     # 确保data目录存在
     os.makedirs("data", exist_ok=True)
     
     # 创建所有表
     Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        # 旧数据库没有时间槽唯一索引：没有重复占用时直接补建；有重复时列出冲突并拒绝启动，
+        # 由 python -m app.slots resolve 显式处理，启动时不修改日程
+        install_slot_index(db)
+        db.commit()
+        
+        # 旧数据库升级后闭包表为空，需要根据 parent_id 回填
+        if db.query(ActivityClosure).first() is None and db.query(Activity).first() is not None:
+            rebuild_closure(db)
+            db.commit()
+        if db.query(EventRollup).first() is None and db.query(ScheduledEvent).first() is not None:
+            rebuild_rollup(db)
+            db.commit()
+        
+        # 归档前热表需为 AUTOINCREMENT；重建表会删除全文索引触发器，由下面的 install_search_index 重新创建
+        install_archive(db)
+        
+        # 全文索引由触发器维护，首次创建时回填已有数据
+        if install_search_index(db):
+            rebuild_search_index(db)
+        db.commit()
+        
+        # 增量同步日志：旧数据库首次升级时回填，之后按保留期清除过期的删除墓碑
+        install_change_log(db)
+        if settings.change_log_retention_days > 0:
+            compact_change_log(db, settings.change_log_retention_days)
+        db.commit()
+        
+        if settings.archive_after_days > 0:
+            archived = archive_events(db, archive_cutoff(settings.archive_after_days))
+            db.commit()
+            if archived:
+                print(f"Archived {archived} events older than {settings.archive_after_days} days")
+    finally:
+        db.close()
+
+def create_tables():
+    init_db()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    create_tables()
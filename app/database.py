@@ -1,12 +1,97 @@
-from sqlalchemy import create_engine
+import contextlib
+import functools
+import inspect
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import Settings, settings
+from app.metrics import install_query_hooks
+
+DATABASE_URL = settings.database_url
+
+# 同步驱动到异步驱动的对应关系
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def _is_sqlite_memory(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def to_async_url(database_url: str):
+    """把同步 URL 换成对应的异步驱动，已指定异步驱动时保持不变"""
+    url = make_url(database_url)
+    if url.get_driver_name() in ("aiosqlite", "asyncpg", "aiomysql"):
+        return url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set LAE_ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def _engine_options(config: Settings, url):
+    options = {"echo": config.echo_sql}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    if not _is_sqlite_memory(url):
+        options.update(
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.pool_timeout,
+            pool_recycle=config.pool_recycle,
+            pool_pre_ping=url.get_backend_name() != "sqlite"
+        )
+    return options
+
+def _install_sqlite_pragmas(sync_engine, config: Settings, url):
+    """SQLite 连接在建立时应用 WAL 等 PRAGMA"""
+    if url.get_backend_name() != "sqlite":
+        return
+    
+    @event.listens_for(sync_engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not _is_sqlite_memory(url):
+            # WAL 模式会持久化到数据库文件，关闭时需显式切回回滚日志
+            cursor.execute(f"PRAGMA journal_mode={'WAL' if config.sqlite_wal else 'DELETE'}")
+        cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA cache_size={-int(config.sqlite_cache_size_kb)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+        cursor.close()
+
+def create_db_engine(config: Settings):
+    """按配置创建同步 engine，供命令行脚本和迁移使用"""
+    url = make_url(config.database_url)
+    db_engine = create_engine(url, **_engine_options(config, url))
+    _install_sqlite_pragmas(db_engine, config, url)
+    install_query_hooks(db_engine)
+    return db_engine
 
-DATABASE_URL = "sqlite:///data/lae_schedule.db"
+def create_async_db_engine(config: Settings):
+    """按配置创建异步 engine，供 API 路由使用"""
+    url = to_async_url(config.async_database_url or config.database_url)
+    options = _engine_options(config, url)
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_memory(url):
+        # aiosqlite 默认不使用连接池
+        options["poolclass"] = AsyncAdaptedQueuePool
+    db_engine = create_async_engine(url, **options)
+    _install_sqlite_pragmas(db_engine.sync_engine, config, url)
+    install_query_hooks(db_engine.sync_engine)
+    return db_engine
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine(settings)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(settings)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,4 +99,42 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_session_scope(request: Request):
+    """返回打开独立会话的异步上下文管理器工厂，供在依赖清理之后仍在发送的流式响应使用
+
+    会话由 get_async_db（或 app.dependency_overrides 中替换它的依赖）提供，测试与基准替换的数据库同样生效。
+    """
+    return contextlib.asynccontextmanager(request.app.dependency_overrides.get(get_async_db, get_async_db))
+
+def async_endpoint(view):
+    """把使用同步 Session 编写的视图包装成异步路由
+
+    视图通过 AsyncSession.run_sync 在异步连接上执行，不再占用线程池；
+    原同步函数保留在 __wrapped__ 上，可直接传入同步 Session 调用。
+    返回 ORM 对象的视图需预先加载响应用到的关系，序列化时不能再懒加载。
+
+    限制：run_sync 在事件循环线程上以 greenlet 执行整个视图，视图中的 Python 计算（组装结果、展开重复规则等）
+    同样占用事件循环，期间本 worker 的其他请求与 /api/stream 连接都会停顿。该方式不能改用 run_in_threadpool，
+    异步驱动只能在事件循环线程上调用。因此视图必须限制单次请求的计算量：按日期区间工作的视图限制区间长度
+    （MAX_RANGE_DAYS / MAX_LOOKAHEAD_DAYS / MAX_TREND_BUCKETS），统计只展开到今天为止的重复规则发生，并按
+    数据版本缓存。确实需要长时间计算的任务应放到命令行脚本（app.rollup、app.archive 等）中执行。
+    """
+    signature = inspect.signature(view)
+    parameters = [
+        param.replace(annotation=AsyncSession, default=Depends(get_async_db)) if param.name == "db" else param
+        for param in signature.parameters.values()
+    ]
+    
+    @functools.wraps(view)
+    async def endpoint(**kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda session: view(db=session, **kwargs))
+    
+    endpoint.__signature__ = signature.replace(parameters=parameters)
+    return endpoint
@@ -0,0 +1,93 @@
+from fastapi import HTTPException
+from sqlalchemy import insert, select, delete, true
+from sqlalchemy.orm import Session, aliased
+
+from app.models.activity import Activity as ActivityModel
+from app.models.activity_closure import ActivityClosure
+
+def add_activity_node(db: Session, activity_id: int, parent_id: int = None):
+    """为新活动写入闭包行：自身一行，加上父活动每个祖先各一行"""
+    db.execute(insert(ActivityClosure).values(ancestor_id=activity_id, descendant_id=activity_id, depth=0))
+    if parent_id is not None:
+        db.execute(insert(ActivityClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                ActivityClosure.ancestor_id,
+                activity_id,
+                ActivityClosure.depth + 1
+            ).where(ActivityClosure.descendant_id == parent_id)
+        ))
+
+def is_descendant(db: Session, ancestor_id: int, descendant_id: int):
+    """判断 descendant_id 是否位于 ancestor_id 的子树中（含自身）"""
+    return db.query(ActivityClosure).filter(
+        ActivityClosure.ancestor_id == ancestor_id,
+        ActivityClosure.descendant_id == descendant_id
+    ).first() is not None
+
+def _detach_subtree(db: Session, activity_id: int):
+    """删除子树与其外部祖先之间的闭包行，子树内部的行保持不变"""
+    subtree = select(ActivityClosure.descendant_id).where(ActivityClosure.ancestor_id == activity_id)
+    outer_ancestors = select(ActivityClosure.ancestor_id).where(
+        ActivityClosure.descendant_id == activity_id,
+        ActivityClosure.depth > 0
+    )
+    db.execute(delete(ActivityClosure).where(
+        ActivityClosure.descendant_id.in_(subtree),
+        ActivityClosure.ancestor_id.in_(outer_ancestors)
+    ))
+
+def move_activity_node(db: Session, activity_id: int, new_parent_id: int = None):
+    """把活动及其子树挂到新的父活动下；新父活动位于自身子树中时拒绝"""
+    if new_parent_id is not None and is_descendant(db, activity_id, new_parent_id):
+        raise HTTPException(status_code=400, detail="Cannot move an activity under itself or its descendants")
+    
+    _detach_subtree(db, activity_id)
+    if new_parent_id is not None:
+        super_tree = aliased(ActivityClosure)
+        sub_tree = aliased(ActivityClosure)
+        db.execute(insert(ActivityClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                super_tree.ancestor_id,
+                sub_tree.descendant_id,
+                super_tree.depth + sub_tree.depth + 1
+            ).select_from(super_tree).join(sub_tree, true()).where(
+                super_tree.descendant_id == new_parent_id,
+                sub_tree.ancestor_id == activity_id
+            )
+        ))
+
+def remove_activity_node(db: Session, activity_id: int):
+    """删除活动的闭包行；其直接子活动成为顶级活动，各自的子树保持不变"""
+    subtree = select(ActivityClosure.descendant_id).where(ActivityClosure.ancestor_id == activity_id)
+    ancestors = select(ActivityClosure.ancestor_id).where(ActivityClosure.descendant_id == activity_id)
+    db.execute(delete(ActivityClosure).where(
+        ActivityClosure.descendant_id.in_(subtree),
+        ActivityClosure.ancestor_id.in_(ancestors)
+    ))
+
+def get_descendant_ids(db: Session, activity_id: int):
+    """一次索引查询获取活动的所有后代ID（不含自身）"""
+    rows = db.query(ActivityClosure.descendant_id).filter(
+        ActivityClosure.ancestor_id == activity_id,
+        ActivityClosure.depth > 0
+    ).all()
+    return {row.descendant_id for row in rows}
+
+def rebuild_closure(db: Session):
+    """根据 activities.parent_id 重建整张闭包表，用于回填已有数据"""
+    rows = db.query(ActivityModel.id, ActivityModel.parent_id).all()
+    parent_of = {row.id: row.parent_id for row in rows}
+    
+    db.execute(delete(ActivityClosure))
+    mappings = []
+    for activity_id in parent_of:
+        ancestor_id, depth, seen = activity_id, 0, set()
+        while ancestor_id is not None and ancestor_id in parent_of and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            mappings.append({"ancestor_id": ancestor_id, "descendant_id": activity_id, "depth": depth})
+            ancestor_id = parent_of[ancestor_id]
+            depth += 1
+    db.bulk_insert_mappings(ActivityClosure, mappings)
+    return len(mappings)
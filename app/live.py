@@ -0,0 +1,151 @@
+"""实时变更推送：写接口提交后把紧凑的变更事件广播给 /api/stream 的订阅者
+
+每个订阅者持有一个有界队列和日期窗口，发布时只投递窗口内的变更；没有日期的变更（活动、重复规则）投递给所有订阅者。
+空闲连接只是一个等待队列的协程，单个 asyncio worker 可承载数百个连接。
+慢消费者的队列满时丢弃其积压，改为投递一次 resync，客户端收到后整体重新拉取视图，发布方从不阻塞。
+多 worker 部署时每个进程只能直接广播自己的写入；有订阅者期间后台轮询数据版本，
+把其他进程（其他 worker、命令行脚本）提交的变更从变更日志转发给本进程的订阅者。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date
+
+from app.config import settings
+from app.models.change_log import ChangeLogEntry
+from app.versioning import get_data_version
+
+logger = logging.getLogger("app.live")
+
+# 队列中的 resync 标记
+RESYNC = None
+
+def change(entity: str, op: str, id: int, event_date: date = None, time_slot: int = None,
+           previous_date: date = None, previous_slot: int = None):
+    """构造一条变更事件；日程被移动时附带原日期/时间槽"""
+    item = {"entity": entity, "op": op, "id": id}
+    if event_date is not None:
+        item["date"] = event_date.isoformat()
+        item["slot"] = time_slot
+    if previous_date is not None and (previous_date, previous_slot) != (event_date, time_slot):
+        item["from_date"] = previous_date.isoformat()
+        item["from_slot"] = previous_slot
+    return item
+
+class Subscription:
+    __slots__ = ("queue", "start", "end")
+
+    def __init__(self, queue_size: int, start: date = None, end: date = None):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.start = start.isoformat() if start else None
+        self.end = end.isoformat() if end else None
+
+    def wants(self, item):
+        dates = [day for day in (item.get("date"), item.get("from_date")) if day]
+        if not dates:
+            return True
+        # ISO 日期字符串的字典序与日期顺序一致
+        return any(
+            (self.start is None or day >= self.start) and (self.end is None or day <= self.end)
+            for day in dates
+        )
+
+class ChangeFeed:
+    """进程内的变更广播；publish 可在任意线程调用，投递在事件循环中完成"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._loop = None
+        self._watcher = None
+        # 本进程已直接广播过的版本，轮询时跳过；只在轮询运行期间记录，由轮询按已读版本清理
+        self._local_versions = set()
+        self.published = 0
+        self.resyncs = 0
+        self.forwarded = 0
+
+    def subscribe(self, session_scope, start: date = None, end: date = None):
+        """session_scope 为打开异步会话的上下文管理器工厂（见 get_async_session_scope），由后台轮询使用"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.queue_size, start, end)
+        self._subscribers.add(subscription)
+        if self._watcher is None and settings.stream_poll_ms > 0:
+            self._watcher = asyncio.create_task(self._watch(session_scope))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, version: int, changes):
+        """在提交之后调用；没有订阅者时不做任何事"""
+        if not self._subscribers or not changes:
+            return
+        if self._watcher is not None:
+            self._local_versions.add(version)
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, version, list(changes))
+        except RuntimeError:
+            # 事件循环已关闭（进程退出中）
+            pass
+
+    def _dispatch(self, version, changes):
+        self.published += 1
+        for subscription in list(self._subscribers):
+            matching = [item for item in changes if subscription.wants(item)]
+            if not matching:
+                continue
+            try:
+                subscription.queue.put_nowait({"version": version, "changes": matching})
+            except asyncio.QueueFull:
+                # 积压已无意义，清空后只留一个 resync
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(RESYNC)
+                self.resyncs += 1
+
+    async def _watch(self, session_scope):
+        """有订阅者期间轮询数据版本，转发其他进程的写入；变更日志已按实体压缩，转发的变更不带日期"""
+        seen = None
+        try:
+            while self._subscribers:
+                try:
+                    async with session_scope() as db:
+                        previous = seen
+                        seen, batches = await db.run_sync(lambda session: foreign_changes(session, previous))
+                except Exception:
+                    logger.exception("Polling the change log failed")
+                else:
+                    for version in sorted(batches):
+                        if version not in self._local_versions:
+                            self.forwarded += 1
+                            self._dispatch(version, batches[version])
+                    self._local_versions = {version for version in self._local_versions if version > seen}
+                await asyncio.sleep(settings.stream_poll_ms / 1000)
+        finally:
+            self._watcher = None
+            self._local_versions.clear()
+    
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "forwarded": self.forwarded,
+            "queue_size": self.queue_size
+        }
+
+def foreign_changes(db, seen: int = None):
+    """返回 (当前数据版本, {版本: 变更列表})，包含 seen 之后写入变更日志的所有变更；seen 为 None 时只读取版本"""
+    current = get_data_version(db)
+    batches = defaultdict(list)
+    if seen is None:
+        return current, batches
+    if current > seen:
+        for entry in db.query(ChangeLogEntry).filter(
+            ChangeLogEntry.version > seen,
+            ChangeLogEntry.version <= current
+        ).order_by(ChangeLogEntry.version, ChangeLogEntry.id):
+            batches[entry.version].append(change(entry.entity, entry.op, entry.entity_id))
+    return max(current, seen), batches
+
+change_feed = ChangeFeed(settings.stream_queue_size)
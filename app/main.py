@@ -1,15 +1,36 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from app.api import activities, scheduled_events, calendar, statistics
+from app.api import activities, scheduled_events, calendar, statistics, search, recurrences, stream, sync
+from app.config import settings
+from app.create_db import init_db
+from app.database import async_engine
+from app.metrics import MetricsMiddleware, metrics
+from app.view_cache import view_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时补建新增的表并回填派生数据（多 worker 部署由 serve.py 在主进程中执行）
+    if settings.init_db_on_startup:
+        init_db()
+    yield
+    await async_engine.dispose()
 
 app = FastAPI(
     title="LAE - 个人日程与主支线管理系统",
     description="Personal schedule and task management system",
-    version="1.0.0"
+    version="1.0.0",
+    # 未直接返回响应对象的路由也用 orjson 输出
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
@@ -17,6 +38,10 @@ app.include_router(activities.router, prefix="/api/activities", tags=["activitie
 app.include_router(scheduled_events.router, prefix="/api/events", tags=["scheduled_events"])
 app.include_router(calendar.router, prefix="/api/calendar", tags=["calendar"])
 app.include_router(statistics.router, prefix="/api/statistics", tags=["statistics"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(recurrences.router, prefix="/api/recurrences", tags=["recurrences"])
+app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 
 @app.get("/")
 async def root(request: Request):
@@ -24,4 +49,26 @@ async def root(request: Request):
 
 @app.get("/api")
 async def api_root():
-    return {"message": "LAE Schedule System API"}
\ No newline at end of file
+    return {"message": "LAE Schedule System API"}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 文本格式的请求与 SQL 指标，附带周/月视图缓存计数"""
+    cache = view_cache.stats()
+    cache_lines = [
+        "# HELP lae_view_cache_events_total Week/month view cache hits, misses, evictions, invalidations and clears caused by other processes' writes.",
+        "# TYPE lae_view_cache_events_total counter"
+    ]
+    cache_lines += [
+        f'lae_view_cache_events_total{{event="{name}"}} {cache[name]}'
+        for name in ("hits", "misses", "evictions", "invalidations", "foreign_clears")
+    ]
+    cache_lines += [
+        "# HELP lae_view_cache_entries Cached week/month views.",
+        "# TYPE lae_view_cache_entries gauge",
+        f"lae_view_cache_entries {cache['entries']}",
+        "# HELP lae_view_cache_max_entries Configured view cache capacity.",
+        "# TYPE lae_view_cache_max_entries gauge",
+        f"lae_view_cache_max_entries {cache['max_entries']}"
+    ]
+    return PlainTextResponse(metrics.render(cache_lines), media_type="text/plain; version=0.0.4")
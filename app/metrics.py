@@ -0,0 +1,204 @@
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger("app.metrics")
+
+# 请求延迟直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_REQUEST_TOP_STATEMENTS = 5
+
+class RequestStats:
+    """单个请求内执行的 SQL 语句数、耗时及每条语句的明细"""
+
+    __slots__ = ("queries", "sql_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = []
+
+_request_stats: ContextVar = ContextVar("lae_request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间记在本条语句的执行上下文上：语句抛出异常时 after_cursor_execute 不会触发，
+    # 记在连接上的话残留值会随连接回到连接池，与之后的语句错配
+    if context is not None:
+        context._lae_query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_lae_query_start", None)
+    if start is None:
+        # 方言内部不带执行上下文的语句（如预取序列值）不计入
+        return
+    elapsed = time.perf_counter() - start
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        stats.statements.append((elapsed, statement))
+
+def install_query_hooks(sync_engine):
+    """在 engine 上注册语句计时钩子；异步 engine 传入其 sync_engine
+
+    run_sync 的 greenlet 继承调用方的 contextvars，钩子可以找到当前请求的统计对象。
+    """
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class MetricsRegistry:
+    """按 (method, route) 聚合的请求计数、延迟直方图与 SQL 统计"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._histograms = {}
+        self._latency_sums = defaultdict(float)
+        self._sql_queries = defaultdict(int)
+        self._sql_seconds = defaultdict(float)
+
+    def observe(self, method, route, status, seconds, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status)] += 1
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(self.buckets) + 1)
+            for index, upper in enumerate(self.buckets):
+                if seconds <= upper:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._latency_sums[key] += seconds
+            self._sql_queries[key] += stats.queries
+            self._sql_seconds[key] += stats.sql_seconds
+
+    def render(self, extra_lines=()):
+        """按 Prometheus 文本格式（0.0.4）输出全部指标"""
+        with self._lock:
+            requests = dict(self._requests)
+            histograms = {key: list(counts) for key, counts in self._histograms.items()}
+            latency_sums = dict(self._latency_sums)
+            sql_queries = dict(self._sql_queries)
+            sql_seconds = dict(self._sql_seconds)
+
+        lines = [
+            "# HELP lae_requests_total HTTP requests by route and status.",
+            "# TYPE lae_requests_total counter"
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'lae_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP lae_request_duration_seconds HTTP request latency by route.",
+            "# TYPE lae_request_duration_seconds histogram"
+        ]
+        for (method, route), counts in sorted(histograms.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for upper, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'lae_request_duration_seconds_bucket{{{labels},le="{upper}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'lae_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"lae_request_duration_seconds_sum{{{labels}}} {latency_sums[(method, route)]:.6f}")
+            lines.append(f"lae_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += [
+            "# HELP lae_request_sql_queries_total SQL statements executed while serving requests.",
+            "# TYPE lae_request_sql_queries_total counter"
+        ]
+        for (method, route), count in sorted(sql_queries.items()):
+            lines.append(f'lae_request_sql_queries_total{{method="{method}",route="{_escape(route)}"}} {count}')
+
+        lines += [
+            "# HELP lae_request_sql_seconds_total Time spent in SQL execution while serving requests.",
+            "# TYPE lae_request_sql_seconds_total counter"
+        ]
+        for (method, route), seconds in sorted(sql_seconds.items()):
+            lines.append(f'lae_request_sql_seconds_total{{method="{method}",route="{_escape(route)}"}} {seconds:.6f}')
+
+        lines.extend(extra_lines)
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = MetricsRegistry()
+
+class MetricsMiddleware:
+    """ASGI 中间件：记录每个请求的延迟、SQL 语句数与 SQL 耗时，慢请求写日志
+
+    路由标签取匹配到的路径模板（如 /api/calendar/week/{target_date}），避免按具体参数产生无限多的标签。
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics, slow_request_ms: int = None):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = settings.slow_request_ms if slow_request_ms is None else slow_request_ms
+        self._route_paths = None
+
+    def _route_label(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            router = scope["app"].router
+            self._route_paths = {
+                getattr(route, "endpoint", None) or getattr(route, "app", None): route.path
+                for route in router.routes
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        event_stream = False
+
+        async def send_with_status(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # SSE 长连接的持续时间不是请求延迟，不计入直方图和慢请求日志
+            if not event_stream:
+                route = self._route_label(scope)
+                self.registry.observe(scope["method"], route, status, elapsed, stats)
+                if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                    log_slow_request(scope["method"], scope["path"], route, status, elapsed, stats)
+
+def log_slow_request(method, path, route, status, elapsed, stats: RequestStats):
+    top = heapq.nlargest(SLOW_REQUEST_TOP_STATEMENTS, stats.statements, key=lambda item: item[0])
+    details = "".join(
+        f"\n  {seconds * 1000:.1f} ms  {' '.join(statement.split())[:300]}"
+        for seconds, statement in top
+    )
+    logger.warning(
+        "Slow request %s %s (%s) status=%s %.1f ms, %d queries, %.1f ms in SQL%s",
+        method, path, route, status, elapsed * 1000, stats.queries, stats.sql_seconds * 1000, details
+    )
@@ -13,4 +13,5 @@ class Activity(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     parent = relationship("Activity", remote_side=[id], backref="children")
-    scheduled_events = relationship("ScheduledEvent", back_populates="activity", cascade="all, delete-orphan")
\ No newline at end of file
+    scheduled_events = relationship("ScheduledEvent", back_populates="activity", cascade="all, delete-orphan")
+    recurrence_rules = relationship("RecurrenceRule", back_populates="activity", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.database import Base
+
+class ActivityClosure(Base):
+    """活动层级闭包表：每个祖先-后代对一行（含 depth=0 的自身行）"""
+    __tablename__ = "activity_closure"
+    
+    ancestor_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("activities.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_activity_closure_descendant", "descendant_id", "ancestor_id"),
+    )
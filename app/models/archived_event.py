@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class ArchivedEvent(Base):
+    """归档的历史日程：列与 scheduled_events 相同，保留原 id；只读，恢复后移回 scheduled_events"""
+    __tablename__ = "archived_events"
+    
+    id = Column(Integer, primary_key=True)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    event_date = Column(Date, nullable=False)
+    time_slot = Column(Integer, nullable=False)
+    goal = Column(Text, nullable=True)
+    notes = Column(Text, nullable=True)
+    status = Column(String, default="planned")
+    
+    activity = relationship("Activity")
+    
+    __table_args__ = (
+        Index("ux_archived_events_date_slot", "event_date", "time_slot", unique=True),
+    )
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ChangeLogEntry(Base):
+    """增量同步的变更日志：每个实体只保留最近一次变更（upsert，或删除后的墓碑）
+
+    version 为写入该变更的事务提交时的数据版本号；同一实体再次变更时整行替换，日志按实体自动压缩。
+    """
+    __tablename__ = "change_log"
+    
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)  # activity / event / recurrence
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # upsert / delete
+    version = Column(Integer, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ux_change_log_entity", "entity", "entity_id", unique=True),
+        Index("ix_change_log_version", "version", "id"),
+    )
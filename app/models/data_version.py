@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer
+from app.database import Base
+
+class DataVersion(Base):
+    """全局数据版本号：活动或日程每次写入都会递增，用于生成 ETag
+
+    id=1 为数据版本号；id=2 为变更日志已压缩到的版本（更早的删除墓碑已清除）。
+    """
+    __tablename__ = "data_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
+from app.database import Base
+
+class EventRollup(Base):
+    """日程统计汇总表：按活动、月份、时间槽、状态累计事件数"""
+    __tablename__ = "event_rollups"
+    
+    id = Column(Integer, primary_key=True)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    bucket = Column(Date, nullable=False)  # 所在月份的第一天
+    time_slot = Column(Integer, nullable=False)
+    status = Column(String, nullable=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_event_rollups_key", "activity_id", "bucket", "time_slot", "status", unique=True),
+    )
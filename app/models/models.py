@@ -1,4 +1,11 @@
 from .activity import Activity
+from .activity_closure import ActivityClosure
+from .archived_event import ArchivedEvent
+from .change_log import ChangeLogEntry
+from .data_version import DataVersion
+from .event_rollup import EventRollup
+from .recurrence_exception import RecurrenceException
+from .recurrence_rule import RecurrenceRule
 from .scheduled_event import ScheduledEvent
 
-__all__ = ["Activity", "ScheduledEvent"]
\ No newline at end of file
+__all__ = ["Activity", "ActivityClosure", "ArchivedEvent", "ChangeLogEntry", "DataVersion", "EventRollup", "RecurrenceException", "RecurrenceRule", "ScheduledEvent"]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class RecurrenceException(Base):
+    """重复规则某一次发生的状态：completed / planned，或 skipped 表示取消该次"""
+    __tablename__ = "recurrence_exceptions"
+    
+    id = Column(Integer, primary_key=True)
+    rule_id = Column(Integer, ForeignKey("recurrence_rules.id"), nullable=False)
+    occurrence_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False)
+    
+    rule = relationship("RecurrenceRule", back_populates="exceptions")
+    
+    __table_args__ = (
+        Index("ux_recurrence_exceptions_rule_date", "rule_id", "occurrence_date", unique=True),
+    )
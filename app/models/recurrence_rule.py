@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class RecurrenceRule(Base):
+    """重复日程规则：只存一行，查询时按请求的日期窗口展开为各次发生"""
+    __tablename__ = "recurrence_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False, index=True)
+    time_slot = Column(Integer, nullable=False)
+    freq = Column(String, nullable=False)  # daily, weekly
+    interval = Column(Integer, nullable=False, default=1)
+    weekdays = Column(String, nullable=True)  # weekly 规则的星期，如 "0,2,4"（0 为周一）；为空时取开始日期的星期
+    start_date = Column(Date, nullable=False)
+    until = Column(Date, nullable=True)
+    count = Column(Integer, nullable=True)
+    goal = Column(Text, nullable=True)
+    notes = Column(Text, nullable=True)
+    
+    activity = relationship("Activity", back_populates="recurrence_rules")
+    exceptions = relationship("RecurrenceException", back_populates="rule", cascade="all, delete-orphan")
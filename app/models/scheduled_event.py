@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -13,4 +13,11 @@ class ScheduledEvent(Base):
     notes = Column(Text, nullable=True)  # 备注，不参与统计
     status = Column(String, default="planned")  # planned, completed
     
-    activity = relationship("Activity", back_populates="scheduled_events")
\ No newline at end of file
+    activity = relationship("Activity", back_populates="scheduled_events")
+    
+    __table_args__ = (
+        # 每个日期的每个时间槽最多一条安排
+        Index("ux_scheduled_events_date_slot", "event_date", "time_slot", unique=True),
+        # 归档会删除热表中的行，AUTOINCREMENT 保证新日程不会复用已归档的 id
+        {"sqlite_autoincrement": True},
+    )
\ No newline at end of file
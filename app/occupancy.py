@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.archive import archived_through
+from app.models.scheduled_event import ScheduledEvent as ScheduledEventModel
+from app.recurrence import expand_occurrences
+
+# 与 scheduled_events.VALID_SLOTS 顺序一致，第 i 个时间槽对应掩码的第 i 位
+OCCUPANCY_SLOTS = [21, 22, 51, 52, 71]
+SLOT_BITS = {slot: 1 << index for index, slot in enumerate(OCCUPANCY_SLOTS)}
+FULL_MASK = (1 << len(OCCUPANCY_SLOTS)) - 1
+
+# 分段读取占用掩码，只需要前几个空闲时间槽时不必扫描整个区间
+OCCUPANCY_WINDOW_DAYS = 366
+
+def occupancy_masks(db: Session, start_date: date, end_date: date):
+    """返回区间内每个有安排的日期的占用掩码 {date: mask}
+
+    (event_date, time_slot) 唯一索引即为覆盖索引；每个时间槽在同一天至多一行，SUM 等价于按位或。
+    重复规则的发生同样占用时间槽。
+    """
+    mask = func.sum(case(
+        *((ScheduledEventModel.time_slot == slot, bit) for slot, bit in SLOT_BITS.items()),
+        else_=0
+    ))
+    rows = db.query(ScheduledEventModel.event_date, mask).filter(
+        ScheduledEventModel.event_date >= start_date,
+        ScheduledEventModel.event_date <= end_date
+    ).group_by(ScheduledEventModel.event_date).all()
+    masks = {event_date: day_mask for event_date, day_mask in rows}
+    for occurrence in expand_occurrences(db, start_date, end_date):
+        masks[occurrence.event_date] = masks.get(occurrence.event_date, 0) | SLOT_BITS[occurrence.time_slot]
+    return masks
+
+def iter_free_slots(db: Session, start_date: date, end_date: date, slots=None, weekdays=None):
+    """按日期、时间槽顺序逐个产出 (date, time_slot) 空闲时间槽
+
+    slots 限定时间槽，weekdays 限定星期（0 为周一）；占用掩码按窗口分段读取。
+    归档区只读，从归档边界的次日开始查找。
+    """
+    through = archived_through(db)
+    if through is not None and start_date <= through:
+        start_date = through + timedelta(days=1)
+    wanted_mask = sum(SLOT_BITS[slot] for slot in (slots or OCCUPANCY_SLOTS))
+    wanted_weekdays = set(weekdays) if weekdays else None
+
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=OCCUPANCY_WINDOW_DAYS - 1), end_date)
+        masks = occupancy_masks(db, window_start, window_end)
+        day = window_start
+        while day <= window_end:
+            free = wanted_mask & ~masks.get(day, 0)
+            if free and (wanted_weekdays is None or day.weekday() in wanted_weekdays):
+                for slot, bit in SLOT_BITS.items():
+                    if free & bit:
+                        yield day, slot
+            day += timedelta(days=1)
+        window_start = window_end + timedelta(days=1)
@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import date
+
+from fastapi import HTTPException
+
+# 下一页游标放在响应头中，列表响应体保持不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values):
+    """把排序键编码为不透明的游标字符串"""
+    payload = json.dumps([value.isoformat() if isinstance(value, date) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types):
+    """解析游标，types 为每个排序键的类型（date 或 int）"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError
+        return tuple(
+            date.fromisoformat(value) if value_type is date else value_type(value)
+            for value, value_type in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,192 @@
+"""重复日程规则的展开
+
+规则只存一行（daily / weekly，间隔、星期、结束日期或次数），按请求的日期窗口在内存中展开。
+每次发生的状态记录在 recurrence_exceptions 中（completed / planned / skipped）。
+同一时间槽已有单独安排的日程时，该次发生被单独日程覆盖，不再展开；多个规则冲突时 id 小的规则优先。
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.archive import event_source
+from app.models.activity import Activity as ActivityModel
+from app.models.recurrence_exception import RecurrenceException
+from app.models.recurrence_rule import RecurrenceRule
+from app.rollup import month_bucket
+from app.versioning import get_data_version
+
+class Occurrence:
+    """重复规则的一次发生，属性与日历视图查询的行一致"""
+
+    __slots__ = ("id", "recurrence_id", "activity_id", "activity_name", "event_date", "time_slot", "goal", "notes", "status")
+
+    def __init__(self, rule, activity_name, event_date, status):
+        self.id = None
+        self.recurrence_id = rule.id
+        self.activity_id = rule.activity_id
+        self.activity_name = activity_name
+        self.event_date = event_date
+        self.time_slot = rule.time_slot
+        self.goal = rule.goal
+        self.notes = rule.notes
+        self.status = status
+
+def parse_weekdays(value):
+    return {int(part) for part in value.split(",")} if value else set()
+
+def format_weekdays(weekdays):
+    return ",".join(str(day) for day in sorted(set(weekdays))) if weekdays else None
+
+def _matches(rule, weekdays, day: date):
+    offset = (day - rule.start_date).days
+    if offset < 0:
+        return False
+    if rule.freq == "daily":
+        return offset % rule.interval == 0
+    start_monday = rule.start_date - timedelta(days=rule.start_date.weekday())
+    weeks = (day - timedelta(days=day.weekday()) - start_monday).days // 7
+    return day.weekday() in weekdays and weeks % rule.interval == 0
+
+def _rule_weekdays(rule):
+    return parse_weekdays(rule.weekdays) or {rule.start_date.weekday()}
+
+def rule_end(rule):
+    """规则最后一次发生的日期上界；无结束日期也无次数限制时返回 None"""
+    end = rule.until
+    if rule.count:
+        if rule.freq == "daily":
+            last = rule.start_date + timedelta(days=(rule.count - 1) * rule.interval)
+        else:
+            # 第一周只计开始日期及之后的星期，之后每个有效周（间隔 interval 周）计满
+            weekdays = sorted(_rule_weekdays(rule))
+            start_monday = rule.start_date - timedelta(days=rule.start_date.weekday())
+            first_week = [day for day in weekdays if day >= rule.start_date.weekday()]
+            if rule.count <= len(first_week):
+                last = start_monday + timedelta(days=first_week[rule.count - 1])
+            else:
+                full_weeks, index = divmod(rule.count - len(first_week) - 1, len(weekdays))
+                last = start_monday + timedelta(weeks=(full_weeks + 1) * rule.interval, days=weekdays[index])
+        end = min(end, last) if end else last
+    return end
+
+def iter_rule_dates(rule, start_date: date, end_date: date):
+    """按日期顺序产出规则在 [start_date, end_date] 内的发生日期（不考虑例外）"""
+    last = rule_end(rule)
+    first = max(start_date, rule.start_date)
+    if last is not None:
+        end_date = min(end_date, last)
+    weekdays = _rule_weekdays(rule)
+
+    if rule.freq == "daily":
+        # 对齐到不早于 first 的第一次发生，之后按间隔步进
+        remainder = (first - rule.start_date).days % rule.interval
+        day = first + timedelta(days=(rule.interval - remainder) % rule.interval)
+        step = timedelta(days=rule.interval)
+        while day <= end_date:
+            yield day
+            day += step
+        return
+
+    day = first
+    while day <= end_date:
+        if _matches(rule, weekdays, day):
+            yield day
+        day += timedelta(days=1)
+
+def rules_in_window(db: Session, start_date: date, end_date: date):
+    """与窗口有交集的规则及其活动名称（按规则 id 排序）"""
+    return db.query(RecurrenceRule, ActivityModel.name).join(
+        ActivityModel, RecurrenceRule.activity_id == ActivityModel.id
+    ).filter(
+        RecurrenceRule.start_date <= end_date,
+        or_(RecurrenceRule.until.is_(None), RecurrenceRule.until >= start_date)
+    ).order_by(RecurrenceRule.id).all()
+
+def expand_rules(db: Session, rules, windows):
+    """按各规则自己的窗口展开为 Occurrence 列表（按日期、时间槽排序）
+
+    rules 为 rules_in_window 的结果，windows 为 {rule_id: (start_date, end_date)}；
+    跳过 skipped 的发生，以及已被单独日程或更早规则占用的时间槽。
+    """
+    if not rules:
+        return []
+    start_date = min(window[0] for window in windows.values())
+    end_date = max(window[1] for window in windows.values())
+
+    statuses = {
+        (row.rule_id, row.occurrence_date): row.status
+        for row in db.query(RecurrenceException).filter(
+            RecurrenceException.rule_id.in_([rule.id for rule, _ in rules]),
+            RecurrenceException.occurrence_date >= start_date,
+            RecurrenceException.occurrence_date <= end_date
+        )
+    }
+    # 归档的日程同样覆盖规则的发生
+    source = event_source(db, start_date)
+    occupied = {
+        (row.event_date, row.time_slot)
+        for row in db.query(source.event_date, source.time_slot).filter(
+            source.time_slot.in_({rule.time_slot for rule, _ in rules}),
+            source.event_date >= start_date,
+            source.event_date <= end_date
+        )
+    }
+
+    occurrences = []
+    for rule, activity_name in rules:
+        window_start, window_end = windows[rule.id]
+        for day in iter_rule_dates(rule, window_start, window_end):
+            status = statuses.get((rule.id, day), "planned")
+            if status == "skipped" or (day, rule.time_slot) in occupied:
+                continue
+            occupied.add((day, rule.time_slot))
+            occurrences.append(Occurrence(rule, activity_name, day, status))
+    occurrences.sort(key=lambda occurrence: (occurrence.event_date, occurrence.time_slot))
+    return occurrences
+
+def expand_occurrences(db: Session, start_date: date, end_date: date):
+    """展开窗口内所有规则的发生，供日历视图、列表和空闲时间槽查询使用"""
+    rules = rules_in_window(db, start_date, end_date)
+    return expand_rules(db, rules, {rule.id: (start_date, end_date) for rule, _ in rules})
+
+def statistics_etag_parts(db: Session, today: date):
+    """统计视图 ETag 的附加部分：有重复规则时统计随日期变化（计到今天为止），加入今天的日期"""
+    if db.query(RecurrenceRule.id).first() is None:
+        return ()
+    return (today.isoformat(),)
+
+# 最近一次统计展开的结果：((数据库, 数据版本, 今天), 发生列表)
+_statistics_cache = (None, [])
+
+def statistics_occurrences(db: Session, today: date):
+    """统计用的发生：每个规则只计到今天为止（不计未来的发生），与单独日程一样是已安排过的记录
+
+    展开量与规则已持续的天数成正比，与 until 无关；结果按 (数据版本, 今天) 缓存，
+    写入或跨过零点之前的统计请求不再重复展开。返回的列表为共享的缓存，调用方不得修改。
+    """
+    global _statistics_cache
+    key = (str(db.get_bind().url), get_data_version(db), today)
+    cached_key, occurrences = _statistics_cache
+    if cached_key == key:
+        return occurrences
+
+    rules = db.query(RecurrenceRule, ActivityModel.name).join(
+        ActivityModel, RecurrenceRule.activity_id == ActivityModel.id
+    ).filter(RecurrenceRule.start_date <= today).order_by(RecurrenceRule.id).all()
+    windows = {}
+    for rule, _ in rules:
+        last = rule_end(rule)
+        windows[rule.id] = (rule.start_date, min(last, today) if last else today)
+    rules = [(rule, name) for rule, name in rules if windows[rule.id][0] <= windows[rule.id][1]]
+    occurrences = expand_rules(db, rules, windows)
+    _statistics_cache = (key, occurrences)
+    return occurrences
+
+def has_recurrence_rules(db: Session, activity_ids):
+    """这些活动是否有重复规则；规则的发生可能出现在任意月份，有则需要清空整个视图缓存"""
+    return db.query(RecurrenceRule.id).filter(RecurrenceRule.activity_id.in_(activity_ids)).first() is not None
+
+def occurrence_rollup_key(occurrence):
+    """与 event_rollups 相同的汇总键 (activity_id, bucket, time_slot, status)"""
+    return (occurrence.activity_id, month_bucket(occurrence.event_date), occurrence.time_slot, occurrence.status)
@@ -0,0 +1,153 @@
+import argparse
+from collections import Counter
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.archive import all_events
+from app.database import Base, SessionLocal, engine
+from app.models.models import EventRollup
+
+def month_bucket(event_date):
+    """事件日期所属的月份桶（该月第一天）"""
+    return event_date.replace(day=1)
+
+# 汇总键，对应唯一索引 ix_event_rollups_key
+ROLLUP_KEY = ("activity_id", "bucket", "time_slot", "status")
+
+def rollup_upsert(db: Session):
+    """插入汇总行，键已存在时累加 event_count；并发的首次写入由唯一索引串行化，不会重复插入或丢失计数
+
+    status 为 NULL 的键不会触发唯一冲突，这类增量各自成行，按键求和的统计结果不受影响。
+    """
+    rollup = EventRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(rollup)
+        return stmt.on_duplicate_key_update(event_count=rollup.c.event_count + stmt.inserted.event_count)
+    stmt = (postgresql if dialect == "postgresql" else sqlite).insert(rollup)
+    return stmt.on_conflict_do_update(
+        index_elements=[rollup.c[column] for column in ROLLUP_KEY],
+        set_={"event_count": rollup.c.event_count + stmt.excluded.event_count}
+    )
+
+def _apply_delta(db: Session, activity_id, bucket, time_slot, status, delta):
+    db.execute(rollup_upsert(db).values(
+        activity_id=activity_id,
+        bucket=bucket,
+        time_slot=time_slot,
+        status=status,
+        event_count=delta
+    ))
+
+def record_event_added(db: Session, event):
+    """事件写入后累加汇总计数，需与事件写入在同一事务中调用"""
+    _apply_delta(db, event.activity_id, month_bucket(event.event_date), event.time_slot, event.status, 1)
+
+def record_event_removed(db: Session, event):
+    """事件删除（或修改前）扣减汇总计数"""
+    _apply_delta(db, event.activity_id, month_bucket(event.event_date), event.time_slot, event.status, -1)
+
+def collect_event_delta(deltas: Counter, event, delta: int):
+    """批量写入时先在内存中累计计数变化，最后由 apply_rollup_deltas 一并写入"""
+    deltas[(event.activity_id, month_bucket(event.event_date), event.time_slot, event.status)] += delta
+
+def apply_rollup_deltas(db: Session, deltas: Counter):
+    """以一条 executemany 的 upsert 写入所有增量，语句数与增量键数无关"""
+    rows = [
+        {"activity_id": activity_id, "bucket": bucket, "time_slot": time_slot, "status": status, "event_count": delta}
+        for (activity_id, bucket, time_slot, status), delta in deltas.items()
+        if delta
+    ]
+    if rows:
+        db.execute(rollup_upsert(db), rows)
+
+def remove_activity_rollup(db: Session, activity_id: int):
+    """活动删除时其事件级联删除，对应汇总行一并清除"""
+    db.execute(delete(EventRollup).where(EventRollup.activity_id == activity_id))
+
+def get_activity_months(db: Session, activity_id: int):
+    """活动有事件的所有月份桶"""
+    rows = db.query(EventRollup.bucket).filter(
+        EventRollup.activity_id == activity_id,
+        EventRollup.event_count > 0
+    ).distinct().all()
+    return [row.bucket for row in rows]
+
+def _expected_counts(db: Session):
+    """从 scheduled_events 与 archived_events 重新计算每个汇总键的事件数（汇总包含归档的日程）"""
+    events = all_events()
+    rows = db.query(
+        events.c.activity_id,
+        events.c.event_date,
+        events.c.time_slot,
+        events.c.status,
+        func.count(events.c.id)
+    ).group_by(
+        events.c.activity_id,
+        events.c.event_date,
+        events.c.time_slot,
+        events.c.status
+    ).yield_per(1000)
+
+    counts = Counter()
+    for activity_id, event_date, time_slot, status, count in rows:
+        counts[(activity_id, month_bucket(event_date), time_slot, status)] += count
+    return counts
+
+def rebuild_rollup(db: Session):
+    """清空并根据全部日程（含归档）回填汇总表"""
+    counts = _expected_counts(db)
+    db.execute(delete(EventRollup))
+    db.bulk_insert_mappings(EventRollup, [
+        {
+            "activity_id": activity_id,
+            "bucket": bucket,
+            "time_slot": time_slot,
+            "status": status,
+            "event_count": count
+        }
+        for (activity_id, bucket, time_slot, status), count in counts.items()
+    ])
+    return len(counts)
+
+def check_rollup(db: Session):
+    """比较汇总表与实际事件，返回不一致的键及 (期望值, 实际值)"""
+    expected = _expected_counts(db)
+    actual = Counter()
+    for row in db.query(EventRollup).all():
+        actual[(row.activity_id, row.bucket, row.time_slot, row.status)] += row.event_count
+
+    mismatches = {}
+    for key in set(expected) | set(actual):
+        if expected[key] != actual[key]:
+            mismatches[key] = (expected[key], actual[key])
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the statistics rollup table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rows = rebuild_rollup(db)
+            db.commit()
+            print(f"Rollup rebuilt: {rows} rows")
+        else:
+            mismatches = check_rollup(db)
+            if not mismatches:
+                print("Rollup is consistent with scheduled and archived events")
+                return 0
+            for key, (expected, actual) in sorted(mismatches.items(), key=str):
+                print(f"Mismatch {key}: expected {expected}, found {actual}")
+            return 1
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,19 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Optional, List, Literal
+
+def normalize_parent_id(value):
+    """0 表示没有父活动，统一为 None，使 activities.parent_id 与闭包表一致；负数无效"""
+    if value is not None and value < 0:
+        raise ValueError("parent_id must not be negative")
+    return value or None
 
 class ActivityBase(BaseModel):
     name: str
     parent_id: Optional[int] = None
     description: Optional[str] = None
+    
+    _normalize_parent_id = field_validator("parent_id")(normalize_parent_id)
 
 class ActivityCreate(ActivityBase):
     pass
@@ -14,6 +22,8 @@ class ActivityUpdate(BaseModel):
     name: Optional[str] = None
     parent_id: Optional[int] = None
     description: Optional[str] = None
+    
+    _normalize_parent_id = field_validator("parent_id")(normalize_parent_id)
 
 class Activity(ActivityBase):
     id: int
@@ -23,7 +33,7 @@ class Activity(ActivityBase):
         from_attributes = True
 
 class ActivityWithChildren(Activity):
-    children: List['Activity'] = []
+    children: List['ActivityWithChildren'] = []
 
 class ScheduledEventBase(BaseModel):
     activity_id: int
@@ -45,7 +55,9 @@ class ScheduledEventUpdate(BaseModel):
     status: Optional[str] = None
 
 class ScheduledEvent(ScheduledEventBase):
-    id: int
+    # 重复规则展开的发生没有 id，由 recurrence_id 标识所属规则
+    id: Optional[int] = None
+    recurrence_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -53,4 +65,73 @@ class ScheduledEvent(ScheduledEventBase):
 class ScheduledEventWithActivity(ScheduledEvent):
     activity: Activity
 
+class ScheduledEventBatchUpdate(ScheduledEventUpdate):
+    id: int
+
+class ScheduledEventBatch(BaseModel):
+    create: List[ScheduledEventCreate] = []
+    update: List[ScheduledEventBatchUpdate] = []
+    delete: List[int] = []
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+class BatchItemResult(BaseModel):
+    operation: str
+    index: int
+    success: bool
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class ScheduledEventBatchResult(BaseModel):
+    committed: bool
+    results: List[BatchItemResult]
+
+class FreeSlot(BaseModel):
+    event_date: date
+    time_slot: int
+    weekday: int
+
+class AutoScheduleRequest(BaseModel):
+    activity_id: int
+    sessions: int = Field(..., ge=1, le=1000)
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    slots: Optional[List[int]] = None
+    weekdays: Optional[List[int]] = None
+    max_per_day: int = Field(1, ge=1, le=5)
+    spread: Literal["earliest", "even"] = "even"
+    goal: Optional[str] = None
+    notes: Optional[str] = None
+
+class RecurrenceRuleBase(BaseModel):
+    activity_id: int
+    time_slot: int
+    freq: Literal["daily", "weekly"]
+    interval: int = Field(1, ge=1, le=52)
+    weekdays: Optional[List[int]] = None
+    start_date: date
+    until: Optional[date] = None
+    count: Optional[int] = Field(None, ge=1, le=10000)
+    goal: Optional[str] = None
+    notes: Optional[str] = None
+
+class RecurrenceRuleCreate(RecurrenceRuleBase):
+    pass
+
+class RecurrenceRule(RecurrenceRuleBase):
+    id: int
+    
+    @field_validator("weekdays", mode="before")
+    @classmethod
+    def parse_weekdays(cls, value):
+        # 数据库中以 "0,2,4" 形式存储
+        if isinstance(value, str):
+            return [int(part) for part in value.split(",")]
+        return value
+    
+    class Config:
+        from_attributes = True
+
+class OccurrenceStatusUpdate(BaseModel):
+    status: Literal["planned", "completed", "skipped"]
+
 ActivityWithChildren.model_rebuild()
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""SQLite FTS5 全文索引：日程（含归档的日程）的目标、备注及所属活动名称/描述，活动的名称/描述
+
+索引由触发器在同一事务内同步，API、批量接口和 bulk_load 的写入都无需额外调用。
+使用 trigram 分词器以支持中文子串匹配；少于 3 个字符的词无法走索引，退化为对索引表的 LIKE 扫描。
+
+用法: python -m app.search rebuild
+"""
+import argparse
+import html
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import Base, SessionLocal, engine
+
+MIN_INDEXED_TERM_LENGTH = 3
+
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5("
+    "goal, notes, activity_name, activity_description, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS activity_search USING fts5("
+    "name, description, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS event_search_ai AFTER INSERT ON scheduled_events BEGIN
+        INSERT INTO event_search(rowid, goal, notes, activity_name, activity_description)
+        SELECT new.id, new.goal, new.notes, activities.name, activities.description
+        FROM activities WHERE activities.id = new.activity_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS event_search_ad AFTER DELETE ON scheduled_events BEGIN
+        DELETE FROM event_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS event_search_au AFTER UPDATE OF goal, notes, activity_id ON scheduled_events BEGIN
+        DELETE FROM event_search WHERE rowid = old.id;
+        INSERT INTO event_search(rowid, goal, notes, activity_name, activity_description)
+        SELECT new.id, new.goal, new.notes, activities.name, activities.description
+        FROM activities WHERE activities.id = new.activity_id;
+    END""",
+    # 归档的日程保留在索引中，只读，没有更新触发器
+    """CREATE TRIGGER IF NOT EXISTS archived_event_search_ai AFTER INSERT ON archived_events BEGIN
+        INSERT INTO event_search(rowid, goal, notes, activity_name, activity_description)
+        SELECT new.id, new.goal, new.notes, activities.name, activities.description
+        FROM activities WHERE activities.id = new.activity_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS archived_event_search_ad AFTER DELETE ON archived_events BEGIN
+        DELETE FROM event_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS activity_search_ai AFTER INSERT ON activities BEGIN
+        INSERT INTO activity_search(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS activity_search_ad AFTER DELETE ON activities BEGIN
+        DELETE FROM activity_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS activity_search_au AFTER UPDATE OF name, description ON activities BEGIN
+        DELETE FROM activity_search WHERE rowid = old.id;
+        INSERT INTO activity_search(rowid, name, description) VALUES (new.id, new.name, new.description);
+        UPDATE event_search SET activity_name = new.name, activity_description = new.description
+        WHERE rowid IN (SELECT id FROM scheduled_events WHERE activity_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS archived_activity_search_au AFTER UPDATE OF name, description ON activities BEGIN
+        UPDATE event_search SET activity_name = new.name, activity_description = new.description
+        WHERE rowid IN (SELECT id FROM archived_events WHERE activity_id = new.id);
+    END""",
+]
+
+def search_supported(db: Session):
+    return db.get_bind().dialect.name == "sqlite"
+
+def install_search_index(db: Session):
+    """创建缺失的全文索引表和同步触发器；返回索引表是否为新建（需要回填）"""
+    if not search_supported(db):
+        return False
+    existed = db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_search'"
+    )).first() is not None
+    for statement in SEARCH_DDL:
+        db.execute(text(statement))
+    return not existed
+
+def rebuild_search_index(db: Session):
+    """清空并根据 scheduled_events、archived_events 与 activities 回填全文索引"""
+    db.execute(text("DELETE FROM event_search"))
+    db.execute(text("DELETE FROM activity_search"))
+    for events in ("scheduled_events", "archived_events"):
+        db.execute(text(
+            "INSERT INTO event_search(rowid, goal, notes, activity_name, activity_description) "
+            f"SELECT {events}.id, {events}.goal, {events}.notes, activities.name, activities.description "
+            f"FROM {events} JOIN activities ON activities.id = {events}.activity_id"
+        ))
+    db.execute(text(
+        "INSERT INTO activity_search(rowid, name, description) SELECT id, name, description FROM activities"
+    ))
+    db.execute(text("INSERT INTO event_search(event_search) VALUES ('optimize')"))
+    db.execute(text("INSERT INTO activity_search(activity_search) VALUES ('optimize')"))
+    return db.execute(text("SELECT count(*) FROM event_search")).scalar()
+
+def split_terms(q: str):
+    """按空白拆分查询词，多个词之间为 AND 关系"""
+    return [term for term in q.split() if term]
+
+def match_expression(terms):
+    """可走索引的词拼成 FTS5 查询（每个词作为短语转义，避免用户输入被解析为查询语法）"""
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_TERM_LENGTH]
+    return " ".join('"' + term.replace('"', '""') + '"' for term in indexed)
+
+def like_pattern(term: str):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def highlight(value, terms, start="<mark>", end="</mark>"):
+    """在结果文本中标记所有查询词（不区分大小写），返回可直接作为 HTML 渲染的文本
+
+    命中与未命中的片段都先做 HTML 转义再加标记，用户写入的目标、名称中的标签不会被当作 HTML 执行。
+    """
+    if not value:
+        return value
+    if not terms:
+        return html.escape(value)
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    parts = []
+    position = 0
+    for match in pattern.finditer(value):
+        parts.append(html.escape(value[position:match.start()]))
+        parts.append(start + html.escape(match.group(0)) + end)
+        position = match.end()
+    parts.append(html.escape(value[position:]))
+    return "".join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not search_supported(db):
+            print("Full-text search requires SQLite FTS5")
+            return 1
+        install_search_index(db)
+        rows = rebuild_search_index(db)
+        db.commit()
+        print(f"Search index rebuilt: {rows} events")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
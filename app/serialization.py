@@ -0,0 +1,17 @@
+"""基于 orjson 的快速 JSON 响应
+
+FastAPI 对返回的 dict/ORM 对象会先按 response_model 逐行校验或走 jsonable_encoder 递归转换，
+大页响应中这部分开销远超查询本身。结构已确定的视图直接返回 json_response，
+由 orjson 一次完成序列化（date/datetime 原生支持，非字符串键转为字符串）。
+"""
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+def json_response(content, response: Response = None):
+    """直接返回 ORJSONResponse，带上视图在注入的 response 上设置的响应头（ETag、X-Next-Cursor 等）"""
+    fast = ORJSONResponse(content)
+    if response is not None:
+        fast.raw_headers.extend(
+            (name, value) for name, value in response.raw_headers if name != b"content-length"
+        )
+    return fast
@@ -0,0 +1,147 @@
+"""时间槽唯一索引的补建
+
+新数据库建表时即带有 (event_date, time_slot) 唯一索引；旧数据库可能已有重复占用的时间槽，
+启动时只在没有重复时补建索引，有重复时列出冲突并拒绝启动，由本命令显式处理。
+
+处理方式：每个时间槽保留 id 最小的日程，其余移到同一天的空闲时间槽，当天没有空位时删除。
+移动与删除写入变更日志并递增数据版本，之后补建索引并重建汇总表。
+
+用法:
+    python -m app.slots check
+    python -m app.slots resolve --dry-run
+    python -m app.slots resolve
+"""
+import argparse
+
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session
+
+from app.api.scheduled_events import VALID_SLOTS
+from app.changelog import install_change_log, log_changes
+from app.database import Base, SessionLocal, engine
+from app.live import change
+from app.models.models import ScheduledEvent
+from app.rollup import rebuild_rollup
+from app.versioning import bump_data_version
+
+SLOT_INDEX_NAME = "ux_scheduled_events_date_slot"
+
+def slot_index():
+    return next(index for index in ScheduledEvent.__table__.indexes if index.name == SLOT_INDEX_NAME)
+
+def has_slot_index(db: Session):
+    return any(index["name"] == SLOT_INDEX_NAME for index in inspect(db.connection()).get_indexes("scheduled_events"))
+
+def find_slot_conflicts(db: Session):
+    """重复占用的时间槽：[(日期, 时间槽, 按 id 排序的日程ID列表)]"""
+    rows = db.query(
+        ScheduledEvent.event_date,
+        ScheduledEvent.time_slot
+    ).group_by(
+        ScheduledEvent.event_date,
+        ScheduledEvent.time_slot
+    ).having(func.count(ScheduledEvent.id) > 1).order_by(
+        ScheduledEvent.event_date,
+        ScheduledEvent.time_slot
+    ).all()
+
+    conflicts = []
+    for event_date, time_slot in rows:
+        ids = [row.id for row in db.query(ScheduledEvent.id).filter(
+            ScheduledEvent.event_date == event_date,
+            ScheduledEvent.time_slot == time_slot
+        ).order_by(ScheduledEvent.id)]
+        conflicts.append((event_date, time_slot, ids))
+    return conflicts
+
+def resolve_slot_conflicts(db: Session):
+    """每个时间槽保留 id 最小的日程，其余移到同一天的空闲时间槽，当天没有空位时删除
+
+    返回 (事件ID, 处理方式, 新时间槽) 列表；只修改会话中的数据，由调用方决定提交或回滚。
+    """
+    conflict_dates = sorted({event_date for event_date, _, _ in find_slot_conflicts(db)})
+
+    report = []
+    for event_date in conflict_dates:
+        day_events = db.query(ScheduledEvent).filter(
+            ScheduledEvent.event_date == event_date
+        ).order_by(ScheduledEvent.id).all()
+        taken = {event.time_slot for event in day_events}
+        kept = set()
+        for event in day_events:
+            if event.time_slot not in kept:
+                kept.add(event.time_slot)
+                continue
+            free_slots = [slot for slot in VALID_SLOTS if slot not in taken]
+            if free_slots:
+                event.time_slot = free_slots[0]
+                taken.add(free_slots[0])
+                kept.add(free_slots[0])
+                report.append((event.id, "moved", free_slots[0]))
+            else:
+                db.delete(event)
+                report.append((event.id, "deleted", None))
+    db.flush()
+    return report
+
+def install_slot_index(db: Session):
+    """补建时间槽唯一索引；已存在时返回 False，存在重复占用时抛出 RuntimeError（不修改数据）"""
+    if has_slot_index(db):
+        return False
+    conflicts = find_slot_conflicts(db)
+    if conflicts:
+        for event_date, time_slot, ids in conflicts:
+            print(f"Slot conflict: {event_date} slot {time_slot} is used by events {', '.join(map(str, ids))}")
+        raise RuntimeError(
+            f"{len(conflicts)} time slots are used by more than one event; "
+            "review them with `python -m app.slots resolve --dry-run`, then run `python -m app.slots resolve`"
+        )
+    slot_index().create(bind=db.connection())
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Find or resolve events that share a time slot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("check", help="list time slots used by more than one event")
+    resolve_parser = commands.add_parser("resolve", help="move or delete duplicates, then add the unique index")
+    resolve_parser.add_argument("--dry-run", action="store_true", help="print the changes without applying them")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            conflicts = find_slot_conflicts(db)
+            for event_date, time_slot, ids in conflicts:
+                print(f"Slot conflict: {event_date} slot {time_slot} is used by events {', '.join(map(str, ids))}")
+            print(f"Conflicting slots: {len(conflicts)}, unique index {'present' if has_slot_index(db) else 'missing'}")
+            return 1 if conflicts else 0
+
+        # 日志为空的旧数据库先回填，移动与删除再以新版本记录
+        install_change_log(db)
+        report = resolve_slot_conflicts(db)
+        prefix = "Would " if args.dry_run else ""
+        for event_id, action, new_slot in report:
+            if action == "moved":
+                print(f"{prefix}{'move' if args.dry_run else 'Moved'} event {event_id} to slot {new_slot}")
+            else:
+                print(f"{prefix}{'delete' if args.dry_run else 'Deleted'} event {event_id}")
+        if args.dry_run:
+            db.rollback()
+            print(f"Dry run: {len(report)} events would change, nothing was written")
+            return 0
+
+        if report:
+            version = bump_data_version(db)
+            log_changes(db, version, [change("event", "delete" if action == "deleted" else "update", event_id)
+                                      for event_id, action, _ in report])
+            rebuild_rollup(db)
+        created = install_slot_index(db)
+        db.commit()
+        print(f"Events changed: {len(report)}, unique index {'created' if created else 'already present'}")
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -51,6 +51,12 @@ function laeApp() {
         // 周数据
         weekDates: [],
         
+        // 实时变更推送（/api/stream）
+        liveFeed: null,
+        liveWindow: null,
+        liveRefreshTimer: null,
+        liveReloadActivities: false,
+        
         // 初始化
         async init() {
             await this.loadActivities();
@@ -62,9 +68,50 @@ function laeApp() {
                 await this.loadWeekSchedule();
             } else if (this.currentView === 'month') {
                 await this.loadMonthSchedule();
+            } else {
+                this.connectLiveFeed(null, null);
             }
         },
         
+        // 订阅当前视图日期窗口内的变更，窗口不变时复用现有连接
+        connectLiveFeed(startDate, endDate) {
+            if (typeof EventSource === 'undefined') return;
+            const windowKey = `${startDate || ''}/${endDate || ''}`;
+            if (this.liveFeed && this.liveWindow === windowKey) return;
+            if (this.liveFeed) this.liveFeed.close();
+            
+            const params = new URLSearchParams();
+            if (startDate) params.set('start_date', startDate);
+            if (endDate) params.set('end_date', endDate);
+            this.liveWindow = windowKey;
+            this.liveFeed = new EventSource(`/api/stream?${params}`);
+            
+            this.liveFeed.addEventListener('change', (event) => {
+                const data = JSON.parse(event.data);
+                const activitiesChanged = data.changes.some(change => change.entity === 'activity');
+                this.scheduleLiveRefresh(activitiesChanged);
+            });
+            // 积压过多被服务端丢弃，整体重新拉取
+            this.liveFeed.addEventListener('resync', () => this.scheduleLiveRefresh(true));
+        },
+        
+        // 短时间内的多条变更合并为一次刷新
+        scheduleLiveRefresh(reloadActivities) {
+            this.liveReloadActivities = this.liveReloadActivities || reloadActivities;
+            clearTimeout(this.liveRefreshTimer);
+            this.liveRefreshTimer = setTimeout(async () => {
+                if (this.liveReloadActivities) {
+                    this.liveReloadActivities = false;
+                    await this.loadActivities();
+                }
+                if (this.currentView === 'week') {
+                    await this.loadWeekSchedule();
+                } else if (this.currentView === 'month') {
+                    await this.loadMonthSchedule();
+                }
+            }, 100);
+        },
+        
         // API调用方法
         async apiCall(endpoint, options = {}) {
             try {
@@ -132,6 +179,8 @@ function laeApp() {
                 await this.loadWeekSchedule();
             } else if (view === 'month') {
                 await this.loadMonthSchedule();
+            } else {
+                this.connectLiveFeed(null, null);
             }
         },
         
@@ -152,6 +201,7 @@ function laeApp() {
         async loadWeekSchedule() {
             try {
                 const targetDate = this.weekDates[0]; // 周一
+                this.connectLiveFeed(this.weekDates[0], this.weekDates[6]);
                 const data = await this.apiCall(`/calendar/week/${targetDate}`);
                 
                 // 转换数据格式以便查找
@@ -183,6 +233,9 @@ function laeApp() {
         // 月视图相关方法
         async loadMonthSchedule() {
             try {
+                const month = String(this.currentMonth).padStart(2, '0');
+                const lastDay = new Date(this.currentYear, this.currentMonth, 0).getDate();
+                this.connectLiveFeed(`${this.currentYear}-${month}-01`, `${this.currentYear}-${month}-${lastDay}`);
                 const data = await this.apiCall(`/calendar/month/${this.currentYear}/${this.currentMonth}`);
                 this.monthSchedule = data;
                 this.renderMonthCalendar();
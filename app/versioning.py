@@ -0,0 +1,38 @@
+from fastapi import Request, Response
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.data_version import DataVersion
+
+def bump_data_version(db: Session):
+    """递增数据版本号并返回新版本，需与写入在同一事务中调用"""
+    version = db.execute(
+        update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+        .returning(DataVersion.version)
+    ).scalar()
+    if version is None:
+        db.execute(insert(DataVersion).values(id=1, version=1))
+        version = 1
+    return version
+
+def get_data_version(db: Session):
+    row = db.query(DataVersion.version).filter(DataVersion.id == 1).first()
+    return row.version if row else 0
+
+def not_modified_response(db: Session, request: Request, response: Response, *extra, version: int = None):
+    """按数据版本号生成 ETag；客户端缓存仍有效时返回 304 响应，否则返回 None
+
+    extra 用于加入视图额外依赖的值（如今天的日期），只查询版本号，不执行视图本身的查询；
+    调用方已读取版本号时通过 version 传入，避免重复查询。
+    """
+    if version is None:
+        version = get_data_version(db)
+    etag = 'W/"' + "-".join(str(part) for part in (version, *extra)) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
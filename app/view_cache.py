@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from app.config import settings
+
+# 本进程登记、尚未连续衔接到已校验版本的写入版本上限；中间缺少的版本（其他进程的写入）
+# 迟迟没有读取来校验时，超过上限即按外部写入处理，清空缓存，登记集合不会无限增长
+MAX_PENDING_VERSIONS = 1024
+
+class ViewCache:
+    """日历视图的有界 LRU 缓存
+
+    每个键带一个代数（generation），失效时递增；构建期间键被失效的结果不会写回，
+    避免把提交前读到的旧数据放进缓存。
+    
+    多 worker 进程各有一份缓存，写入只能失效本进程的条目。读取时传入数据库中的数据版本，
+    出现本进程未处理过的版本（其他 worker 或命令行脚本的写入）时清空整个缓存；
+    本进程的写入在失效相关键后通过 applied() 登记版本，不会引起清空。
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        # clear() 递增全局代数，使所有键（包括正在构建、尚未写入的键）一并失效
+        self._epoch = 0
+        # 已校验到的数据版本，以及本进程写入且已失效过的更新版本
+        self._version = None
+        self._applied = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.foreign_clears = 0
+    
+    def get_or_build(self, key, build, version: int = None):
+        with self._lock:
+            if version is not None:
+                self._sync(version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(key, 0))
+        
+        value = build()
+        
+        with self._lock:
+            if self.max_entries > 0 and (self._epoch, self._generations.get(key, 0)) == generation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+    
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+    
+    def invalidate_dates(self, dates):
+        """日程写入后失效包含这些日期的周视图与月视图"""
+        keys = set()
+        for day in dates:
+            keys.add(week_key(day))
+            keys.add(month_key(day.year, day.month))
+        self.invalidate(keys)
+    
+    def invalidate_months(self, month_starts):
+        """失效整月（及与之重叠的各周），用于活动改名等影响整月内容的写入"""
+        keys = set()
+        for first_day in month_starts:
+            keys.add(month_key(first_day.year, first_day.month))
+            monday = first_day - timedelta(days=first_day.weekday())
+            while monday.month == first_day.month or monday < first_day:
+                keys.add(("week", monday))
+                monday += timedelta(days=7)
+        self.invalidate(keys)
+    
+    def applied(self, version: int):
+        """登记本进程已提交并完成失效的写入版本，在失效之后调用
+
+        与已校验版本连续的登记版本直接并入已校验版本，只保留中间有缺口的部分。
+        尚未校验过版本时（本进程还没有读取）缓存为空，无需登记。
+        """
+        with self._lock:
+            if self._version is None or version <= self._version:
+                return
+            self._applied.add(version)
+            while self._version + 1 in self._applied:
+                self._version += 1
+                self._applied.discard(self._version)
+            if len(self._applied) > MAX_PENDING_VERSIONS:
+                # 数据版本的递增在各写事务间串行，登记时更早的版本都已提交，清空后可直接校验到最大版本
+                self._clear()
+                self.foreign_clears += 1
+                self._version = max(self._applied)
+                self._applied = set()
+    
+    def _sync(self, version):
+        if self._version is not None and version > self._version:
+            pending = range(self._version + 1, version + 1)
+            if len(pending) > len(self._applied) or any(v not in self._applied for v in pending):
+                self._clear()
+                self.foreign_clears += 1
+            self._applied = {v for v in self._applied if v > version}
+        if self._version is None or version > self._version:
+            self._version = version
+    
+    def clear(self):
+        with self._lock:
+            self._clear()
+    
+    def _clear(self):
+        self._epoch += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "foreign_clears": self.foreign_clears
+            }
+
+def week_key(day: date):
+    return ("week", day - timedelta(days=day.weekday()))
+
+def month_key(year: int, month: int):
+    return ("month", year, month)
+
+view_cache = ViewCache(settings.view_cache_size)
@@ -0,0 +1,51 @@
+"""活动树接口基准：查询次数与耗时随活动数量的变化
+
+用法: python -m benchmarks.bench_activity_tree
+"""
+from app.api.activities import get_activity_tree
+from app.models.models import Activity
+from benchmarks.common import create_temp_engine, QueryCounter, timed, print_table
+
+SIZES = [100, 1000, 5000]
+FAN_OUT = 5
+
+
+def seed_tree(Session, size):
+    """按固定扇出批量插入一棵活动树"""
+    db = Session()
+    rows = []
+    for i in range(1, size + 1):
+        parent_id = (i - 2) // FAN_OUT + 1 if i > 1 else None
+        rows.append({"id": i, "name": f"activity-{i}", "parent_id": parent_id})
+    db.bulk_insert_mappings(Activity, rows)
+    db.commit()
+    db.close()
+
+
+def run():
+    results = []
+    for size in SIZES:
+        engine, Session = create_temp_engine()
+        seed_tree(Session, size)
+        counter = QueryCounter(engine)
+
+        db = Session()
+        counter.reset()
+        with timed() as full:
+            get_activity_tree.__wrapped__(root_id=None, max_depth=None, db=db)
+        full_queries = counter.count
+
+        counter.reset()
+        with timed() as lazy:
+            get_activity_tree.__wrapped__(root_id=1, max_depth=2, db=db)
+        lazy_queries = counter.count
+        db.close()
+        engine.dispose()
+
+        results.append((size, full_queries, f"{full['ms']:.1f}", lazy_queries, f"{lazy['ms']:.1f}"))
+
+    print_table(["activities", "full queries", "full ms", "subtree queries", "subtree ms"], results)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+"""冷热分离基准：同一个生成数据库在归档前后分别测量近期与历史范围的端点延迟，并核对归档前后响应一致
+
+近期端点只读热表，延迟应与历史长度无关；历史端点读取热表与归档表的并集。
+
+用法: python -m benchmarks.bench_archive [--years 10] [--keep-days 365] [--iterations 30]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.archive import archive_events, archived_through
+from app.database import create_async_db_engine, create_db_engine, get_async_db
+from app.main import app
+from app.models.models import ArchivedEvent, ScheduledEvent
+from app.search import install_search_index, rebuild_search_index
+from app.view_cache import view_cache
+from benchmarks.bench_endpoints import END_DATE, FILL, build_database, measure_endpoint
+from benchmarks.common import print_table
+
+
+def archive_cases(root_id, keep_days):
+    """(名称, 方法, 路径生成函数) 列表：前半为归档边界之后的近期范围，后半跨入归档区"""
+    recent = END_DATE - timedelta(days=keep_days // 2)
+    old = END_DATE - timedelta(days=keep_days * 3)
+    return [
+        ("recent_week", "GET", lambda i: f"/api/calendar/week/{recent}"),
+        ("recent_month", "GET", lambda i: f"/api/calendar/month/{recent.year}/{recent.month}"),
+        ("recent_list", "GET", lambda i: f"/api/events/?start_date={recent - timedelta(days=30)}&end_date={recent}&limit=100"),
+        ("recent_trends_day", "GET", lambda i: f"/api/statistics/trends?granularity=day&start={recent - timedelta(days=90)}&end={recent}"),
+        ("recent_range", "GET", lambda i: f"/api/calendar/range?start={recent - timedelta(days=90)}&end={recent}"),
+        ("recent_search", "GET", lambda i: f"/api/search?q=撰写报告&start_date={recent - timedelta(days=90)}"),
+        ("old_week", "GET", lambda i: f"/api/calendar/week/{old}"),
+        ("old_list", "GET", lambda i: f"/api/events/?start_date={old - timedelta(days=30)}&end_date={old}&limit=100"),
+        ("old_trends_week", "GET", lambda i: f"/api/statistics/trends?granularity=week&activity_id={root_id}"),
+        ("activity_statistics", "GET", lambda i: f"/api/statistics/activities/{root_id}/statistics"),
+    ]
+
+
+def measure(config, root_id, args):
+    async_engine = create_async_db_engine(config)
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    counter = {"n": 0}
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_query(*_):
+        counter["n"] += 1
+
+    async def get_bench_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_bench_db
+    view_cache.clear()
+    results = {}
+    bodies = {}
+    client = TestClient(app)
+    try:
+        for name, method, path_for in archive_cases(root_id, args.keep_days):
+            results[name], _ = measure_endpoint(
+                client, counter, name, method, path_for, root_id,
+                args.iterations, args.warmup, False, 0
+            )
+            bodies[name] = client.get(path_for(0)).content
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        view_cache.clear()
+        asyncio.run(async_engine.dispose())
+    return results, bodies
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=10, help="years of generated history")
+    parser.add_argument("--keep-days", type=int, default=365, help="days kept in the hot table")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+
+    size = int(args.years * 365 * len([21, 22, 51, 52, 71]) * FILL)
+    config, root_id = build_database(size, args.seed)
+    engine = create_db_engine(config)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    if install_search_index(db):
+        rebuild_search_index(db)
+    db.commit()
+    before, before_bodies = measure(config, root_id, args)
+
+    moved = archive_events(db, END_DATE - timedelta(days=args.keep_days - 1))
+    db.commit()
+    hot = db.query(func.count(ScheduledEvent.id)).scalar()
+    through = archived_through(db)
+    archived = db.query(func.count(ArchivedEvent.id)).scalar()
+    db.close()
+    engine.dispose()
+
+    after, after_bodies = measure(config, root_id, args)
+    print(f"events: {size}, archived: {archived} (through {through}, {moved} moved), hot: {hot}")
+    print_table(
+        ["endpoint", "p50 before", "p50 after", "p95 before", "p95 after", "queries", "same body"],
+        [
+            (name, before[name]["p50_ms"], after[name]["p50_ms"], before[name]["p95_ms"], after[name]["p95_ms"],
+             f"{before[name]['queries']}->{after[name]['queries']}", before_bodies[name] == after_bodies[name])
+            for name in before
+        ]
+    )
+    return 0 if all(before_bodies[name] == after_bodies[name] for name in before) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
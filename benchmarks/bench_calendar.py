@@ -0,0 +1,86 @@
+"""日历视图基准：周/月/日视图的查询次数与耗时随事件数量的变化
+
+每个视图的查询次数必须是固定的 VIEW_QUERIES，与事件数量无关，否则以非零状态退出。
+同样的检查（含有重复规则的情形）由 tests/test_calendar_queries.py 在测试中执行。
+
+用法: python -m benchmarks.bench_calendar
+"""
+from datetime import date, timedelta
+
+from fastapi import Request, Response
+
+from app.api.calendar import get_week_schedule, get_month_schedule, get_day_schedule
+from app.models.models import Activity, ScheduledEvent
+from app.view_cache import view_cache
+from benchmarks.common import create_temp_engine, QueryCounter, timed, print_table
+
+TIME_SLOTS = [21, 22, 51, 52, 71]
+START = date(2024, 1, 1)
+# 每种规模对应的连续排满天数
+DAYS = [7, 31, 365, 3650]
+# 数据版本、归档边界、联表查询日程、窗口内的重复规则各一次
+VIEW_QUERIES = 4
+
+
+def seed_events(Session, days):
+    db = Session()
+    db.bulk_insert_mappings(Activity, [{"id": i, "name": f"activity-{i}"} for i in range(1, 21)])
+    rows = []
+    for offset in range(days):
+        for index, slot in enumerate(TIME_SLOTS):
+            rows.append({
+                "activity_id": (offset + index) % 20 + 1,
+                "event_date": START + timedelta(days=offset),
+                "time_slot": slot,
+                "goal": "goal",
+                "status": "planned"
+            })
+    db.bulk_insert_mappings(ScheduledEvent, rows)
+    db.commit()
+    db.close()
+
+
+def conditional_get():
+    """视图需要的 request/response 参数：不带 If-None-Match 的请求，每次都构建完整响应"""
+    return {"request": Request({"type": "http", "headers": []}), "response": Response()}
+
+
+def run():
+    results = []
+    failures = []
+    for days in DAYS:
+        engine, Session = create_temp_engine()
+        seed_events(Session, days)
+        counter = QueryCounter(engine)
+        db = Session()
+
+        row = [days * len(TIME_SLOTS)]
+        for name, view in (
+            ("week", lambda: get_week_schedule.__wrapped__(START, db=db, **conditional_get())),
+            ("month", lambda: get_month_schedule.__wrapped__(START.year, START.month, db=db, **conditional_get())),
+            ("day", lambda: get_day_schedule.__wrapped__(START, db=db, **conditional_get())),
+        ):
+            # 每个规模是新的数据库但版本号相同，清空视图缓存以测量实际查询
+            view_cache.clear()
+            counter.reset()
+            with timed() as elapsed:
+                view()
+            row += [counter.count, f"{elapsed['ms']:.1f}"]
+            if counter.count != VIEW_QUERIES:
+                failures.append(f"{name} view ran {counter.count} queries for {row[0]} events, expected {VIEW_QUERIES}")
+
+        db.close()
+        engine.dispose()
+        results.append(row)
+
+    print_table(
+        ["events", "week q", "week ms", "month q", "month ms", "day q", "day ms"],
+        results
+    )
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,248 @@
+"""API 端点基准：在进程内驱动 FastAPI 应用，对不同规模的生成数据库逐个端点测量
+延迟分位数、SQL 语句数和峰值内存，结果写入 JSON，并可与保存的基线比较。
+
+用法:
+    python -m benchmarks.bench_endpoints [--sizes 1000,10000,100000] [--iterations 30]
+        [--output results.json] [--baseline baseline.json]
+        [--max-latency-regression 0.25] [--max-query-increase 0] [--max-memory-regression 0.5]
+
+超过任一阈值时以退出码 1 结束；把某次的 --output 文件保存下来即可作为之后的 --baseline。
+依赖 httpx（pip install -r requirements-dev.txt）。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.bulk_load import build_activity_tree, generate_events, insert_activities, insert_events
+from app.config import Settings
+from app.database import Base, create_async_db_engine, create_db_engine, get_async_db
+from app.main import app
+from app.versioning import bump_data_version
+from app.view_cache import view_cache
+from benchmarks.common import print_table
+
+END_DATE = date(2025, 6, 30)
+FILL = 0.8
+
+
+def build_database(size, seed):
+    """生成包含 size 条日程的临时数据库（3 层活动树，每层 4 个子活动）"""
+    path = os.path.join(tempfile.mkdtemp(prefix="lae-bench-"), "bench.db")
+    config = replace(Settings(), database_url=f"sqlite:///{path}")
+    engine = create_db_engine(config)
+    Base.metadata.create_all(bind=engine)
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    id_map = insert_activities(db, build_activity_tree(roots=3, depth=3, fanout=4))
+    rows = generate_events(random.Random(seed), sorted(id_map.values()), END_DATE, FILL, max_events=size)
+    insert_events(db, rows)
+    bump_data_version(db)
+    db.commit()
+    db.close()
+    engine.dispose()
+    return config, min(id_map.values())
+
+
+def endpoint_cases(root_id, size):
+    """(名称, 方法, 路径生成函数) 列表；路径函数接收迭代序号，写入类端点每次使用不同的空闲时间槽"""
+    # 数据从 END_DATE 向前生成，取覆盖范围中部的日期
+    middle = END_DATE - timedelta(days=int(size / (5 * FILL) / 2))
+    return [
+        ("activity_tree", "GET", lambda i: "/api/activities/tree"),
+        ("calendar_week", "GET", lambda i: f"/api/calendar/week/{middle}"),
+        ("calendar_month", "GET", lambda i: f"/api/calendar/month/{middle.year}/{middle.month}"),
+        ("calendar_day", "GET", lambda i: f"/api/calendar/day/{middle}"),
+        ("statistics_summary", "GET", lambda i: "/api/statistics/summary"),
+        ("activity_statistics", "GET", lambda i: f"/api/statistics/activities/{root_id}/statistics"),
+        ("tree_statistics", "GET", lambda i: "/api/statistics/activities/tree-statistics"),
+        ("trends_week", "GET", lambda i: f"/api/statistics/trends?granularity=week&activity_id={root_id}"),
+        ("calendar_range_year", "GET", lambda i: f"/api/calendar/range?start={middle - timedelta(days=364)}&end={middle}"),
+        ("list_events", "GET", lambda i: f"/api/events/?start_date={middle - timedelta(days=30)}&end_date={middle}&limit=100"),
+        ("create_event", "POST", lambda i: "/api/events/"),
+    ]
+
+
+def create_payload(root_id, index):
+    # END_DATE 之后的日期都是空闲的
+    return {"activity_id": root_id, "event_date": (END_DATE + timedelta(days=index + 1)).isoformat(), "time_slot": 21}
+
+
+def measure_endpoint(client, counter, name, method, path_for, root_id, iterations, warmup, warm_cache, offset):
+    def call(index):
+        if not warm_cache:
+            view_cache.clear()
+        if method == "POST":
+            response = client.post(path_for(index), json=create_payload(root_id, offset + index))
+        else:
+            response = client.get(path_for(index))
+        if response.status_code != 200:
+            raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+
+    index = 0
+    for _ in range(warmup):
+        call(index)
+        index += 1
+
+    # 单独一轮测量语句数与峰值内存，tracemalloc 的开销不计入延迟
+    counter["n"] = 0
+    tracemalloc.start()
+    call(index)
+    index += 1
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queries = counter["n"]
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call(index)
+        latencies.append((time.perf_counter() - start) * 1000)
+        index += 1
+
+    latencies.sort()
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "queries": queries,
+        "peak_kb": round(peak / 1024, 1)
+    }, index
+
+
+def percentile(sorted_values, pct):
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def run_size(size, args):
+    config, root_id = build_database(size, args.seed)
+    async_engine = create_async_db_engine(config)
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    counter = {"n": 0}
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_query(*_):
+        counter["n"] += 1
+
+    async def get_bench_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_bench_db
+    view_cache.clear()
+    results = {}
+    offset = 0
+    client = TestClient(app)
+    try:
+        for name, method, path_for in endpoint_cases(root_id, size):
+            results[name], used = measure_endpoint(
+                client, counter, name, method, path_for, root_id,
+                args.iterations, args.warmup, args.warm_cache, offset
+            )
+            offset += used
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        view_cache.clear()
+        asyncio.run(async_engine.dispose())
+    return results
+
+
+def compare(results, baseline, args):
+    """返回超出阈值的回归描述列表"""
+    failures = []
+    for size, endpoints in results.items():
+        for name, current in endpoints.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            latency_limit = previous["p95_ms"] * (1 + args.max_latency_regression)
+            if current["p95_ms"] > latency_limit and current["p95_ms"] - previous["p95_ms"] > args.min_latency_delta_ms:
+                failures.append(f"{size}/{name}: p95 {current['p95_ms']}ms > baseline {previous['p95_ms']}ms")
+            if current["queries"] > previous["queries"] + args.max_query_increase:
+                failures.append(f"{size}/{name}: {current['queries']} queries > baseline {previous['queries']}")
+            memory_limit = previous["peak_kb"] * (1 + args.max_memory_regression)
+            if current["peak_kb"] > memory_limit and current["peak_kb"] - previous["peak_kb"] > args.min_memory_delta_kb:
+                failures.append(f"{size}/{name}: peak {current['peak_kb']}KB > baseline {previous['peak_kb']}KB")
+    return failures
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated event counts")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-cache", action="store_true", help="keep the week/month view cache between requests")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--max-latency-regression", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--min-latency-delta-ms", type=float, default=1.0, help="ignore p95 increases below this")
+    parser.add_argument("--max-query-increase", type=int, default=0, help="allowed extra SQL statements")
+    parser.add_argument("--max-memory-regression", type=float, default=0.5, help="allowed relative peak memory increase")
+    parser.add_argument("--min-memory-delta-kb", type=float, default=64.0, help="ignore peak memory increases below this")
+    args = parser.parse_args()
+
+    # 大数据量下部分端点必然超过慢请求阈值，基准运行时不输出慢请求日志
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+
+    results = {}
+    for size in (int(value) for value in args.sizes.split(",")):
+        results[str(size)] = run_size(size, args)
+        print(f"\n{size} events")
+        print_table(
+            ["endpoint", "p50 ms", "p95 ms", "p99 ms", "queries", "peak KB"],
+            [
+                (name, r["p50_ms"], r["p95_ms"], r["p99_ms"], r["queries"], r["peak_kb"])
+                for name, r in results[str(size)].items()
+            ]
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "iterations": args.iterations,
+                    "warm_cache": args.warm_cache
+                },
+                "results": results
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args)
+        if failures:
+            print("\nRegressions:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,84 @@
+"""事件列表分页基准：对比 offset 分页与游标分页在不同深度的单页耗时
+
+用法: python -m benchmarks.bench_pagination [--events 300000]
+"""
+import argparse
+from datetime import date, timedelta
+
+import orjson
+from fastapi import Response
+
+from app.api.scheduled_events import get_scheduled_events
+from app.models.models import Activity, ScheduledEvent
+from app.pagination import encode_cursor
+from benchmarks.common import create_temp_engine, timed, print_table
+
+START = date(1900, 1, 1)
+TIME_SLOTS = [21, 22, 51, 52, 71]
+PAGE_SIZE = 100
+
+
+def seed_events(Session, total):
+    db = Session()
+    db.bulk_insert_mappings(Activity, [{"id": i, "name": f"activity-{i}"} for i in range(1, 51)])
+    rows = []
+    for index in range(total):
+        rows.append({
+            "activity_id": index % 50 + 1,
+            "event_date": START + timedelta(days=index // len(TIME_SLOTS)),
+            "time_slot": TIME_SLOTS[index % len(TIME_SLOTS)],
+            "status": "planned"
+        })
+        if len(rows) == 50000:
+            db.bulk_insert_mappings(ScheduledEvent, rows)
+            rows = []
+    db.bulk_insert_mappings(ScheduledEvent, rows)
+    db.commit()
+    db.close()
+
+
+def fetch_page(db, skip=0, cursor=None):
+    return orjson.loads(get_scheduled_events.__wrapped__(
+        response=Response(), skip=skip, limit=PAGE_SIZE,
+        start_date=None, end_date=None, cursor=cursor, db=db
+    ).body)
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=300000)
+    args = parser.parse_args()
+
+    engine, Session = create_temp_engine()
+    seed_events(Session, args.events)
+    db = Session()
+
+    results = []
+    depth = 1
+    while depth * PAGE_SIZE < args.events:
+        skip = (depth - 1) * PAGE_SIZE
+        # 直接构造该页之前最后一行的游标，等价于逐页翻到这里
+        cursor = None
+        if skip:
+            previous = db.query(ScheduledEvent).order_by(
+                ScheduledEvent.event_date, ScheduledEvent.time_slot, ScheduledEvent.id
+            ).offset(skip - 1).first()
+            cursor = encode_cursor(previous.event_date, previous.time_slot, previous.id)
+
+        with timed() as offset_time:
+            offset_page = fetch_page(db, skip=skip)
+        with timed() as cursor_time:
+            cursor_page = fetch_page(db, cursor=cursor)
+        assert [event["id"] for event in offset_page] == [event["id"] for event in cursor_page]
+
+        results.append((depth, f"{offset_time['ms']:.1f}", f"{cursor_time['ms']:.1f}"))
+        depth *= 10
+
+    db.close()
+    engine.dispose()
+    print(f"{args.events} events, {PAGE_SIZE} per page")
+    print_table(["page", "offset ms", "cursor ms"], results)
+
+
+if __name__ == "__main__":
+    run()
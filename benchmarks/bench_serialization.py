@@ -0,0 +1,96 @@
+"""响应序列化基准：在进程内驱动 FastAPI 应用，测量大页列表与日历视图的端到端耗时
+
+列表一次返回 1k / 10k 行；日历视图开启缓存，耗时主要是序列化本身。
+
+用法: python -m benchmarks.bench_serialization [--rows 1000,10000] [--iterations 20]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import create_async_db_engine, get_async_db
+from app.main import app
+from app.view_cache import view_cache
+from benchmarks.bench_endpoints import END_DATE, FILL, build_database
+from benchmarks.common import print_table
+
+
+def serialization_cases(rows):
+    # 覆盖 rows 条日程所需的天数，从 END_DATE 向前
+    start = END_DATE - timedelta(days=int(rows / (5 * FILL)) + 30)
+    return [
+        (f"list_events_{rows}", f"/api/events/?start_date={start}&end_date={END_DATE}&limit={rows}"),
+        (f"list_events_{rows}_no_range", f"/api/events/?skip=0&limit={rows}"),
+        ("calendar_month_cached", f"/api/calendar/month/{END_DATE.year}/{END_DATE.month}"),
+        ("calendar_week_cached", f"/api/calendar/week/{END_DATE}"),
+    ]
+
+
+def measure(client, path, iterations, warmup):
+    for _ in range(warmup):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path}: HTTP {response.status_code} {response.text[:200]}")
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(latencies), 2),
+        "min_ms": round(min(latencies), 2),
+        "bytes": len(response.content),
+        "rows": len(response.json()) if path.startswith("/api/events/") else None
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1000,10000", help="comma separated page sizes")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("app.metrics").setLevel(logging.ERROR)
+
+    sizes = [int(value) for value in args.rows.split(",")]
+    # 数据量取最大页的两倍，保证每一页都能取满
+    config, _ = build_database(max(sizes) * 2, args.seed)
+    engine = create_async_db_engine(config)
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_bench_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = get_bench_db
+    view_cache.clear()
+    results = []
+    try:
+        client = TestClient(app)
+        seen = set()
+        for rows in sizes:
+            for name, path in serialization_cases(rows):
+                if name in seen:
+                    continue
+                seen.add(name)
+                result = measure(client, path, args.iterations, args.warmup)
+                results.append((name, result["rows"] or "-", result["bytes"], result["median_ms"], result["min_ms"]))
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        view_cache.clear()
+        asyncio.run(engine.dispose())
+
+    print_table(["case", "rows", "bytes", "median ms", "min ms"], results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,129 @@
+"""存储配置基准：对比默认 SQLite 设置与调优设置（WAL 等）下的并发读写吞吐
+
+用法: python -m benchmarks.bench_storage [--seconds 5] [--readers 8] [--writers 2]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.api.calendar import query_view_events
+from app.config import Settings
+from app.database import Base, create_db_engine
+from app.models.models import Activity, ScheduledEvent
+from benchmarks.common import print_table
+
+START = date(2024, 1, 1)
+TIME_SLOTS = [21, 22, 51, 52, 71]
+
+# 旧版 database.py 的行为：回滚日志、synchronous=FULL、默认缓存、无 mmap
+BASELINE = Settings(
+    sqlite_wal=False,
+    sqlite_synchronous="FULL",
+    sqlite_cache_size_kb=2000,
+    sqlite_mmap_size=0
+)
+TUNED = Settings()
+
+
+def prepare(config):
+    path = os.path.join(tempfile.mkdtemp(prefix="lae-bench-"), "bench.db")
+    config = replace(config, database_url=f"sqlite:///{path}", pool_size=32, max_overflow=32)
+    engine = create_db_engine(config)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    db.bulk_insert_mappings(Activity, [{"id": i, "name": f"activity-{i}"} for i in range(1, 11)])
+    db.bulk_insert_mappings(ScheduledEvent, [
+        {
+            "activity_id": offset % 10 + 1,
+            "event_date": START + timedelta(days=offset),
+            "time_slot": slot,
+            "status": "planned"
+        }
+        for offset in range(365) for slot in TIME_SLOTS
+    ])
+    db.commit()
+    db.close()
+    return engine, Session
+
+
+def run_config(config, seconds, readers, writers):
+    engine, Session = prepare(config)
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader(index):
+        done = 0
+        while not stop.is_set():
+            db = Session()
+            try:
+                week_start = START + timedelta(days=(done * 7 + index) % 358)
+                query_view_events(db, week_start, week_start + timedelta(days=6))
+                done += 1
+            finally:
+                db.close()
+        with lock:
+            counts["reads"] += done
+
+    def writer(index):
+        done = errors = 0
+        # 每个写线程使用独立的日期区间，避免时间槽冲突
+        day = START + timedelta(days=1000 + index * 100000)
+        while not stop.is_set():
+            db = Session()
+            try:
+                db.add(ScheduledEvent(activity_id=1, event_date=day, time_slot=TIME_SLOTS[done % 5], status="planned"))
+                db.commit()
+                done += 1
+                if done % 5 == 0:
+                    day += timedelta(days=1)
+            except OperationalError:
+                db.rollback()
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return [
+        f"{counts['reads'] / seconds:.0f}",
+        f"{counts['writes'] / seconds:.0f}",
+        counts["errors"]
+    ]
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+
+    rows = []
+    for name, config in (("baseline", BASELINE), ("tuned", TUNED)):
+        rows.append([name] + run_config(config, args.seconds, args.readers, args.writers))
+    print_table(["settings", "reads/s", "writes/s", "lock errors"], rows)
+
+
+if __name__ == "__main__":
+    run()
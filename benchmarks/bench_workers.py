@@ -0,0 +1,202 @@
+"""多进程扩展基准：用 serve.py 以不同 worker 数启动服务，多个客户端进程并发请求只读端点，
+测量吞吐量随 worker 数的变化；随后在同一服务上做跨 worker 缓存一致性检查。
+
+客户端进程与服务共用本机 CPU，要观察到接近线性的扩展，核数需大于 worker 数与客户端进程数之和。
+
+用法: python -m benchmarks.bench_workers [--workers 1,2,4] [--clients 8] [--duration 10] [--size 20000]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import orjson
+
+from benchmarks.bench_endpoints import END_DATE, FILL, build_database
+from benchmarks.common import print_table
+
+
+def read_paths(size):
+    """只读端点的混合：缓存的周视图、日视图、列表与汇总统计"""
+    middle = END_DATE - timedelta(days=int(size / (5 * FILL) / 2))
+    return [
+        f"/api/calendar/week/{middle}",
+        f"/api/calendar/day/{middle}",
+        f"/api/events/?start_date={middle - timedelta(days=30)}&end_date={middle}&limit=100",
+        "/api/statistics/summary",
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url, port, workers):
+    env = {
+        **os.environ,
+        "LAE_DATABASE_URL": database_url,
+        "LAE_HOST": "127.0.0.1",
+        "LAE_PORT": str(port),
+        "LAE_WORKERS": str(workers),
+        "LAE_SLOW_REQUEST_MS": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/api")
+            if connection.getresponse().status == 200:
+                connection.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def client_loop(port, paths, start_at, stop_at, results):
+    """单个客户端进程：keep-alive 连接上循环请求，直到 stop_at"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    errors = 0
+    index = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    while time.time() < stop_at:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status != 200:
+            errors += 1
+    connection.close()
+    results.put((latencies, errors))
+
+
+def measure_throughput(port, paths, clients, duration):
+    # 先预热每个 worker 的视图缓存与连接池
+    for _ in range(clients * 4):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        for path in paths:
+            connection.request("GET", path)
+            connection.getresponse().read()
+        connection.close()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1
+    processes = [
+        multiprocessing.Process(target=client_loop, args=(port, paths, start_at, start_at + duration, results))
+        for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(value for values, _ in collected for value in values)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in collected),
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def request_json(port, method, path, body=None):
+    # 每次新建连接，使请求分散到不同的 worker
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=orjson.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    payload = orjson.loads(response.read())
+    connection.close()
+    return payload
+
+
+def check_coherence(port, rounds, reads):
+    """每轮在一个 worker 上创建或删除日程，再从多个新连接读取周视图，返回读到旧数据的次数"""
+    activity_id = request_json(port, "POST", "/api/activities/", {"name": "coherence-check"})["id"]
+    day = END_DATE + timedelta(days=7)
+    stale = 0
+    event_ids = []
+    for round_index in range(rounds):
+        slot = [21, 22, 51, 52, 71][round_index % 5]
+        if round_index % 2 == 0:
+            event_ids.append(request_json(port, "POST", "/api/events/", {
+                "activity_id": activity_id, "event_date": day.isoformat(), "time_slot": slot
+            })["id"])
+        else:
+            request_json(port, "DELETE", f"/api/events/{event_ids.pop()}")
+        expected = len(event_ids)
+        for _ in range(reads):
+            week = request_json(port, "GET", f"/api/calendar/week/{day}")
+            found = sum(
+                1 for entry in week["schedule"] for value in entry["slots"].values()
+                if value and value["activity_id"] == activity_id
+            )
+            stale += found != expected
+    return stale
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--duration", type=int, default=10, help="seconds of load per worker count")
+    parser.add_argument("--size", type=int, default=20000, help="events in the generated database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config, _ = build_database(args.size, args.seed)
+    paths = read_paths(args.size)
+    rows = []
+    baseline = None
+    for workers in [int(value) for value in args.workers.split(",")]:
+        port = free_port()
+        server = start_server(config.database_url, port, workers)
+        try:
+            result = measure_throughput(port, paths, args.clients, args.duration)
+            stale = check_coherence(port, rounds=10, reads=workers * 4)
+        finally:
+            stop_server(server)
+        baseline = baseline or result["rps"]
+        rows.append((
+            workers, result["requests"], result["errors"], round(result["rps"]),
+            round(result["p50_ms"], 2), round(result["p99_ms"], 2),
+            f"{result['rps'] / baseline:.2f}x", stale
+        ))
+
+    print(f"cpus: {os.cpu_count()}, clients: {args.clients}, duration: {args.duration}s, events: {args.size}")
+    print_table(["workers", "requests", "errors", "req/s", "p50 ms", "p99 ms", "speedup", "stale reads"], rows)
+    return 1 if any(row[2] or row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -111,16 +111,19 @@ def create_test_data():
         }
     ]
     
-    for event in sample_events:
-        if event["activity_id"]:  # 只有活动ID存在时才创建
-            response = requests.post(f"{BASE_URL}/events/", 
-                                   json=event,
-                                   headers={"Content-Type": "application/json"})
-            if response.status_code == 200:
-                result = response.json()
+    # 一次批量请求创建全部日程（只提交活动ID存在的条目）
+    events_to_create = [event for event in sample_events if event["activity_id"]]
+    response = requests.post(f"{BASE_URL}/events/batch",
+                             json={"create": events_to_create, "mode": "best_effort"},
+                             headers={"Content-Type": "application/json"})
+    if response.status_code == 200:
+        for event, result in zip(events_to_create, response.json()["results"]):
+            if result["success"]:
                 print(f"Created event: {event['goal']} (ID: {result['id']})")
             else:
-                print(f"Failed to create event: {event['goal']} - {response.text}")
+                print(f"Failed to create event: {event['goal']} - {result['detail']}")
+    else:
+        print(f"Failed to create events - {response.text}")
     
     print("\nTest data creation completed!")
     print("Now you can visit http://127.0.0.1:8000 to view the system")
@@ -0,0 +1,57 @@
+"""生产模式入口：gunicorn 主进程管理多个 uvicorn worker 进程
+
+用法: LAE_WORKERS=4 LAE_HOST=0.0.0.0 LAE_PORT=8000 python serve.py
+
+数据库初始化在主进程中执行一次，随后预加载应用并 fork 出 worker。
+kill -HUP <主进程PID> 逐个平滑替换 worker（预加载的代码不会重新导入，升级代码需重启主进程）；
+kill -TERM 停止接受新连接，等待进行中的请求完成（最多 LAE_GRACEFUL_TIMEOUT 秒）后退出。
+"""
+import os
+
+from gunicorn.app.base import BaseApplication
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+def post_fork(server, worker):
+    # 主进程初始化数据库时用过同步 engine，继承的连接不能跨进程共享，丢弃后各 worker 建立自己的连接；
+    # 异步 engine 在主进程中从未连接，无需处理（在事件循环外重建它的连接池会使首批并发请求互相阻塞）
+    from app.database import engine
+    engine.dispose(close=False)
+
+def gunicorn_options(config):
+    return {
+        "bind": f"{config.host}:{config.port}",
+        "workers": config.workers or os.cpu_count() or 1,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": config.graceful_timeout,
+        "max_requests": config.max_requests,
+        # 错开各 worker 的重启时间
+        "max_requests_jitter": config.max_requests // 10,
+        "post_fork": post_fork
+    }
+
+def main():
+    # worker 启动时不再重复建表与回填，避免多个进程同时迁移
+    os.environ["LAE_INIT_DB_ON_STARTUP"] = "false"
+    from app.config import settings
+    from app.create_db import init_db
+    from app.database import engine
+
+    init_db()
+    engine.dispose()
+    ProductionServer(gunicorn_options(settings)).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import tempfile
+from dataclasses import replace
+
+# 导入 app 前把默认数据库指向临时文件，测试不会连接 data/ 下的真实数据库
+os.environ.setdefault("LAE_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='lae-test-'), 'default.db')}")
+os.environ.setdefault("LAE_INIT_DB_ON_STARTUP", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.changelog import install_change_log
+from app.config import Settings
+from app.database import Base, create_async_db_engine, create_db_engine, get_async_db
+from app.main import app
+from app.search import install_search_index
+from app.view_cache import view_cache
+
+
+@pytest.fixture
+def config(tmp_path):
+    """每个测试一个独立的 SQLite 数据库，建表并安装全文索引触发器与变更日志"""
+    config = replace(Settings(), database_url=f"sqlite:///{tmp_path / 'test.db'}")
+    engine = create_db_engine(config)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    install_search_index(db)
+    install_change_log(db)
+    db.commit()
+    db.close()
+    engine.dispose()
+    return config
+
+
+@pytest.fixture
+def db(config):
+    """直接读写测试数据库的同步会话"""
+    engine = create_db_engine(config)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(config):
+    """API 路由使用测试数据库的 TestClient"""
+    async_engine = create_async_db_engine(config)
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_test_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = get_test_db
+    # 各测试数据库的版本号都从 0 开始，视图缓存不能跨测试复用
+    view_cache.clear()
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_async_db, None)
+    view_cache.clear()
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def make_activity(client):
+    def make_activity(name, parent_id=None):
+        response = client.post("/api/activities/", json={"name": name, "parent_id": parent_id})
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return make_activity
+
+
+@pytest.fixture
+def make_event(client):
+    def make_event(activity_id, event_date, time_slot, status="planned", goal=None):
+        response = client.post("/api/events/", json={
+            "activity_id": activity_id,
+            "event_date": str(event_date),
+            "time_slot": time_slot,
+            "status": status,
+            "goal": goal
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return make_event
@@ -0,0 +1,115 @@
+from datetime import date
+
+from app.archive import archive_events, archived_through, event_source, restore_events
+from app.models.models import ArchivedEvent, ScheduledEvent
+from app.rollup import check_rollup
+
+READ_PATHS = [
+    "/api/calendar/week/2024-01-03",
+    "/api/calendar/month/2024/1",
+    "/api/calendar/day/2024-01-02",
+    "/api/calendar/range?start=2023-12-01&end=2024-03-31",
+    "/api/events/?start_date=2024-01-01&end_date=2024-03-31",
+    "/api/events/?limit=100",
+    "/api/events/export",
+    "/api/search?q=report",
+    "/api/statistics/summary",
+    "/api/statistics/trends?granularity=day&start=2024-01-01&end=2024-03-31",
+]
+
+
+def seed(make_activity, make_event):
+    root = make_activity("root")
+    child = make_activity("child", root)
+    ids = []
+    for month in (1, 2, 3):
+        for day in (1, 2, 3):
+            ids.append(make_event(child if day % 2 else root, date(2024, month, day), 21,
+                                  status="completed" if month == 1 else "planned", goal=f"report {month}-{day}"))
+    return root, ids
+
+
+def snapshot(client, paths):
+    responses = {}
+    for path in paths:
+        response = client.get(path)
+        assert response.status_code == 200, f"{path}: {response.text}"
+        responses[path] = response.content
+    return responses
+
+
+def archive(db, before):
+    moved = archive_events(db, before)
+    db.commit()
+    return moved
+
+
+def test_reads_are_unchanged_by_archive_and_restore(client, db, make_activity, make_event):
+    root, ids = seed(make_activity, make_event)
+    paths = READ_PATHS + [f"/api/statistics/activities/{root}/statistics", f"/api/events/{ids[0]}"]
+    before = snapshot(client, paths)
+
+    assert archive(db, date(2024, 2, 2)) == 4
+    assert archived_through(db) == date(2024, 2, 1)
+    assert db.query(ScheduledEvent).count() == 5
+    assert snapshot(client, paths) == before
+    assert check_rollup(db) == {}
+
+    assert restore_events(db, date(2024, 1, 1)) == 4
+    db.commit()
+    assert archived_through(db) is None
+    assert snapshot(client, paths) == before
+
+
+def test_recent_ranges_read_only_the_hot_table(client, db, make_activity, make_event):
+    seed(make_activity, make_event)
+    archive(db, date(2024, 2, 1))
+
+    # 归档边界是归档区最晚的日期，而不是归档时传入的期限
+    assert archived_through(db) == date(2024, 1, 3)
+    assert event_source(db, date(2024, 1, 4)) is ScheduledEvent
+    assert event_source(db, date(2024, 1, 3)) is not ScheduledEvent
+    assert event_source(db) is not ScheduledEvent
+
+
+def test_archived_range_is_read_only(client, db, make_activity, make_event):
+    _, ids = seed(make_activity, make_event)
+    archive(db, date(2024, 2, 1))
+    archived_id = ids[0]
+    activity_id = client.get(f"/api/events/{archived_id}").json()["activity_id"]
+
+    assert client.post("/api/events/", json={
+        "activity_id": activity_id, "event_date": "2024-01-02", "time_slot": 22
+    }).status_code == 409
+    assert client.put(f"/api/events/{archived_id}", json={"status": "planned"}).status_code == 409
+    assert client.delete(f"/api/events/{archived_id}").status_code == 409
+    # 把热表中的日程移入归档区同样被拒绝
+    assert client.put(f"/api/events/{ids[-1]}", json={"event_date": "2024-01-02", "time_slot": 71}).status_code == 409
+
+    response = client.post("/api/events/batch", json={
+        "update": [{"id": archived_id, "status": "planned"}],
+        "mode": "best_effort"
+    })
+    assert not response.json()["results"][0]["success"]
+    assert db.query(ArchivedEvent).filter(ArchivedEvent.id == archived_id).one().status == "completed"
+
+
+def test_new_events_never_reuse_archived_ids(client, db, make_activity, make_event):
+    root, ids = seed(make_activity, make_event)
+    # 把所有日程（包括 id 最大的）都归档
+    archive(db, date(2024, 4, 1))
+    assert db.query(ScheduledEvent).count() == 0
+
+    new_id = make_event(root, date(2024, 5, 1), 21)
+    assert new_id > max(ids)
+    assert db.query(ArchivedEvent).filter(ArchivedEvent.id == new_id).first() is None
+
+
+def test_activity_delete_removes_archived_events(client, db, make_activity, make_event):
+    root, _ = seed(make_activity, make_event)
+    archive(db, date(2024, 2, 1))
+
+    assert client.delete(f"/api/activities/{root}").status_code == 200
+    db.rollback()
+    assert db.query(ArchivedEvent).filter(ArchivedEvent.activity_id == root).count() == 0
+    assert check_rollup(db) == {}
@@ -0,0 +1,168 @@
+from datetime import date
+
+from app.rollup import check_rollup
+from app.versioning import get_data_version
+
+
+def events_on(client, day):
+    return client.get(f"/api/events/?start_date={day}&end_date={day}").json()
+
+
+def test_all_or_nothing_rejects_whole_batch(client, db, make_activity, make_event):
+    a = make_activity("a")
+    existing = make_event(a, date(2024, 1, 1), 21)
+    to_delete = make_event(a, date(2024, 1, 1), 22)
+    db.rollback()
+    version = get_data_version(db)
+
+    response = client.post("/api/events/batch", json={
+        "create": [
+            {"activity_id": a, "event_date": "2024-01-01", "time_slot": 51},
+            {"activity_id": a, "event_date": "2024-01-01", "time_slot": 21}
+        ],
+        "update": [{"id": existing, "status": "completed"}],
+        "delete": [to_delete]
+    })
+    assert response.status_code == 400
+    failures = response.json()["detail"]["results"]
+    assert [(item["operation"], item["index"]) for item in failures] == [("create", 1)]
+
+    assert sorted((event["id"], event["time_slot"], event["status"]) for event in events_on(client, "2024-01-01")) == [
+        (existing, 21, "planned"), (to_delete, 22, "planned")
+    ]
+    db.rollback()
+    assert get_data_version(db) == version
+    assert check_rollup(db) == {}
+
+
+def test_all_or_nothing_commits_when_every_item_succeeds(client, db, make_activity, make_event):
+    a = make_activity("a")
+    moved = make_event(a, date(2024, 1, 1), 21)
+
+    # 先删除再修改再创建：同一批次内释放的时间槽可以被占用
+    response = client.post("/api/events/batch", json={
+        "create": [{"activity_id": a, "event_date": "2024-01-01", "time_slot": 21}],
+        "update": [{"id": moved, "time_slot": 22}]
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"]
+    assert all(item["success"] for item in body["results"])
+    assert sorted(event["time_slot"] for event in events_on(client, "2024-01-01")) == [21, 22]
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def test_best_effort_applies_valid_items(client, db, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2024, 1, 1), 21)
+
+    response = client.post("/api/events/batch", json={
+        "create": [
+            {"activity_id": a, "event_date": "2024-01-01", "time_slot": 21},
+            {"activity_id": a, "event_date": "2024-01-01", "time_slot": 22},
+            {"activity_id": 999, "event_date": "2024-01-01", "time_slot": 51}
+        ],
+        "delete": [12345],
+        "mode": "best_effort"
+    })
+    assert response.status_code == 200
+    results = {(item["operation"], item["index"]): item for item in response.json()["results"]}
+    assert not results[("create", 0)]["success"]
+    assert results[("create", 1)]["success"]
+    assert results[("create", 2)]["detail"] == "Activity not found"
+    assert results[("delete", 0)]["detail"] == "Scheduled event not found"
+    assert sorted(event["time_slot"] for event in events_on(client, "2024-01-01")) == [21, 22]
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def slots_on(client, day):
+    return {event["id"]: event["time_slot"] for event in events_on(client, day)}
+
+
+def test_chained_moves_are_written_in_dependency_order(client, db, make_activity, make_event):
+    a = make_activity("a")
+    first = make_event(a, date(2030, 1, 1), 21)
+    second = make_event(a, date(2030, 1, 1), 22)
+
+    # 按主键顺序一次刷新会先把 first 写到仍被 second 占用的 22
+    response = client.post("/api/events/batch", json={
+        "update": [{"id": second, "time_slot": 51}, {"id": first, "time_slot": 22}]
+    })
+    assert response.status_code == 200, response.text
+    assert slots_on(client, "2030-01-01") == {first: 22, second: 51}
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def test_swap_and_rotation_within_one_batch(client, db, make_activity, make_event):
+    a = make_activity("a")
+    b = make_activity("b")
+    first = make_event(a, date(2030, 1, 1), 21)
+    second = make_event(b, date(2030, 1, 1), 22)
+    x, y, z = (make_event(a, date(2030, 1, 2), slot) for slot in (21, 22, 51))
+
+    response = client.post("/api/events/batch", json={
+        "update": [
+            {"id": first, "time_slot": 22},
+            {"id": second, "time_slot": 21},
+            {"id": x, "time_slot": 22},
+            {"id": y, "time_slot": 51},
+            {"id": z, "time_slot": 21, "status": "completed"}
+        ],
+        "mode": "best_effort"
+    })
+    assert response.status_code == 200, response.text
+    assert all(item["success"] for item in response.json()["results"])
+    assert slots_on(client, "2030-01-01") == {first: 22, second: 21}
+    assert slots_on(client, "2030-01-02") == {x: 22, y: 51, z: 21}
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def test_best_effort_reports_index_conflicts_per_item(client, db, make_activity, make_event):
+    a = make_activity("a")
+    blocked = make_event(a, date(2030, 1, 1), 21)
+    occupant = make_event(a, date(2030, 1, 1), 22)
+    follower = make_event(a, date(2030, 1, 1), 51)
+    free = make_event(a, date(2030, 1, 1), 52)
+
+    response = client.post("/api/events/batch", json={
+        "update": [
+            {"id": blocked, "time_slot": 22},
+            # 目标是 blocked 的原时间槽，blocked 没有移走，同样失败
+            {"id": follower, "time_slot": 21},
+            {"id": free, "time_slot": 71, "status": "completed"}
+        ],
+        "create": [
+            {"activity_id": a, "event_date": "2030-01-01", "time_slot": 52},
+            {"activity_id": a, "event_date": "2030-01-01", "time_slot": 52}
+        ],
+        "mode": "best_effort"
+    })
+    assert response.status_code == 200, response.text
+    results = {(item["operation"], item["index"]): item for item in response.json()["results"]}
+    assert results[("update", 0)]["detail"] == "Time slot already occupied"
+    assert results[("update", 1)]["detail"] == "Time slot already occupied"
+    assert results[("update", 2)]["success"]
+    assert results[("create", 0)]["success"]
+    assert results[("create", 1)]["detail"] == "Time slot already occupied"
+    assert slots_on(client, "2030-01-01") == {
+        blocked: 21, occupant: 22, follower: 51, free: 71, results[("create", 0)]["id"]: 52
+    }
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def test_all_or_nothing_rolls_back_earlier_savepoints(client, make_activity, make_event):
+    a = make_activity("a")
+    existing = make_event(a, date(2030, 1, 1), 21)
+
+    # 批次中没有删除：第一条创建的 SAVEPOINT 也必须位于批次事务之内
+    response = client.post("/api/events/batch", json={"create": [
+        {"activity_id": a, "event_date": "2030-01-01", "time_slot": 22},
+        {"activity_id": a, "event_date": "2030-01-01", "time_slot": 21}
+    ]})
+    assert response.status_code == 400
+    assert slots_on(client, "2030-01-01") == {existing: 21}
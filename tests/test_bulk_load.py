@@ -0,0 +1,75 @@
+import json
+import random
+import sys
+from datetime import date
+
+from app import bulk_load
+from app.hierarchy import get_descendant_ids
+from app.models.models import Activity, ChangeLogEntry, ScheduledEvent
+from app.rollup import check_rollup
+from app.versioning import get_data_version
+
+
+def run_load(monkeypatch, config, tmp_path, activities, events):
+    activities_path = tmp_path / "activities.json"
+    events_path = tmp_path / "events.json"
+    activities_path.write_text(json.dumps(activities), encoding="utf-8")
+    events_path.write_text(json.dumps(events), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", [
+        "bulk_load", "--database-url", config.database_url,
+        "load", "--activities", str(activities_path), "--events", str(events_path)
+    ])
+    return bulk_load.main()
+
+
+def test_load_writes_tree_events_and_derived_tables(monkeypatch, config, db, tmp_path):
+    activities = [{"id": "r", "name": "root"}, {"id": "c", "name": "child", "parent_id": "r"}]
+    events = [
+        {"activity_id": "c", "event_date": f"2024-01-{day:02d}", "time_slot": 21, "status": "completed"}
+        for day in range(1, 21)
+    ] + [{"activity_id": "r", "event_date": "2024-01-01", "time_slot": 21}]
+
+    assert run_load(monkeypatch, config, tmp_path, activities, events) == 0
+
+    root = db.query(Activity).filter(Activity.name == "root").one()
+    child = db.query(Activity).filter(Activity.name == "child").one()
+    assert get_descendant_ids(db, root.id) == {child.id}
+    # 与文件中更早的行冲突的时间槽被跳过
+    assert db.query(ScheduledEvent).count() == 20
+    assert check_rollup(db) == {}
+    assert get_data_version(db) == 1
+    assert db.query(ChangeLogEntry).filter(ChangeLogEntry.version == 1).count() == 22
+
+
+def test_invalid_record_rolls_back_whole_load(monkeypatch, config, db, tmp_path):
+    activities = [{"id": "a", "name": "a"}]
+    events = [
+        {"activity_id": "a", "event_date": f"2024-01-{day:02d}", "time_slot": 21}
+        for day in range(1, 21)
+    ] + [{"activity_id": "a", "event_date": "2024-01-21", "time_slot": 99}]
+
+    monkeypatch.setattr(bulk_load, "CHUNK_SIZE", 5)
+    assert run_load(monkeypatch, config, tmp_path, activities, events) == 1
+
+    assert db.query(Activity).count() == 0
+    assert db.query(ScheduledEvent).count() == 0
+    assert check_rollup(db) == {}
+    assert get_data_version(db) == 0
+
+
+def test_generated_events_do_not_depend_on_the_current_date(monkeypatch):
+    def generate_on(today):
+        class FixedDate(bulk_load.date):
+            @classmethod
+            def today(cls):
+                return today
+
+        monkeypatch.setattr(bulk_load, "date", FixedDate)
+        return list(bulk_load.generate_events(
+            random.Random(7), [1, 2, 3], bulk_load.DEFAULT_END_DATE, 0.8, years=0.1
+        ))
+
+    rows = generate_on(date(2025, 6, 1))
+    assert rows == generate_on(date(2030, 1, 1))
+    assert {row["status"] for row in rows if row["event_date"] < bulk_load.DEFAULT_END_DATE} == {"completed", "planned"}
+    assert {row["status"] for row in rows if row["event_date"] == bulk_load.DEFAULT_END_DATE} <= {"planned"}
@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import event
+
+from app.api.calendar import get_day_schedule, get_month_schedule, get_week_schedule
+from app.models.models import Activity, RecurrenceRule, ScheduledEvent
+from app.view_cache import view_cache
+
+START = date(2024, 1, 1)
+TIME_SLOTS = [21, 22, 51, 52, 71]
+# 数据版本、归档边界、联表查询日程、窗口内的重复规则各一次
+VIEW_QUERIES = 4
+# 窗口内有重复规则时再查例外、归档边界与已占用的时间槽各一次
+RULE_QUERIES = 3
+
+VIEWS = {
+    "week": lambda db, **kwargs: get_week_schedule.__wrapped__(START, db=db, **kwargs),
+    "month": lambda db, **kwargs: get_month_schedule.__wrapped__(START.year, START.month, db=db, **kwargs),
+    "day": lambda db, **kwargs: get_day_schedule.__wrapped__(START, db=db, **kwargs),
+}
+
+
+def seed(db, activities, days, rules):
+    """在已有数据之后追加活动（含层级），重新排满 days 天的日程；rules 时每个活动一条重复规则"""
+    first = (db.query(Activity.id).order_by(Activity.id.desc()).limit(1).scalar() or 0) + 1
+    ids = list(range(first, first + activities))
+    db.bulk_insert_mappings(Activity, [
+        {"id": activity_id, "name": f"activity-{activity_id}", "parent_id": ids[0] if activity_id != ids[0] else None}
+        for activity_id in ids
+    ])
+    db.query(ScheduledEvent).delete()
+    db.bulk_insert_mappings(ScheduledEvent, [
+        {"activity_id": ids[(offset + index) % activities], "event_date": START + timedelta(days=offset),
+         "time_slot": slot, "goal": "goal", "status": "planned"}
+        for offset in range(days) for index, slot in enumerate(TIME_SLOTS)
+    ])
+    if rules:
+        db.bulk_insert_mappings(RecurrenceRule, [
+            {"activity_id": activity_id, "time_slot": 71, "freq": "weekly", "interval": 1, "start_date": START}
+            for activity_id in ids
+        ])
+    db.commit()
+
+
+def count_queries(db, view):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        view_cache.clear()
+        view(db, request=Request({"type": "http", "headers": []}), response=Response())
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    return len(statements)
+
+
+@pytest.mark.parametrize("rules", [False, True])
+@pytest.mark.parametrize("name", VIEWS)
+def test_calendar_views_use_a_fixed_number_of_queries(db, name, rules):
+    counts = []
+    for activities, days in ((2, 3), (20, 40), (200, 400)):
+        seed(db, activities, days, rules)
+        counts.append(count_queries(db, VIEWS[name]))
+    assert counts == [VIEW_QUERIES + (RULE_QUERIES if rules else 0)] * 3
@@ -0,0 +1,96 @@
+from app.hierarchy import rebuild_closure
+from app.models.models import Activity, ActivityClosure
+
+
+def closure_rows(db):
+    db.rollback()
+    return sorted(
+        (row.ancestor_id, row.descendant_id, row.depth)
+        for row in db.query(ActivityClosure.ancestor_id, ActivityClosure.descendant_id, ActivityClosure.depth)
+    )
+
+
+def assert_closure_matches_parents(db):
+    """增量维护的闭包表与按 parent_id 重建的结果一致"""
+    maintained = closure_rows(db)
+    rebuild_closure(db)
+    rebuilt = sorted(
+        (row.ancestor_id, row.descendant_id, row.depth)
+        for row in db.query(ActivityClosure.ancestor_id, ActivityClosure.descendant_id, ActivityClosure.depth)
+    )
+    db.rollback()
+    assert maintained == rebuilt
+
+
+def test_create_adds_rows_for_every_ancestor(client, db, make_activity):
+    root = make_activity("root")
+    child = make_activity("child", root)
+    grandchild = make_activity("grandchild", child)
+
+    assert closure_rows(db) == sorted([
+        (root, root, 0), (child, child, 0), (grandchild, grandchild, 0),
+        (root, child, 1), (child, grandchild, 1), (root, grandchild, 2)
+    ])
+
+
+def test_move_subtree_updates_closure(client, db, make_activity):
+    a = make_activity("a")
+    b = make_activity("b")
+    child = make_activity("child", a)
+    make_activity("grandchild", child)
+
+    response = client.put(f"/api/activities/{child}", json={"parent_id": b})
+    assert response.status_code == 200
+    assert_closure_matches_parents(db)
+    assert (a, child, 1) not in closure_rows(db)
+    assert (b, child, 1) in closure_rows(db)
+
+
+def test_move_under_own_descendant_is_rejected(client, db, make_activity):
+    root = make_activity("root")
+    child = make_activity("child", root)
+    before = closure_rows(db)
+
+    response = client.put(f"/api/activities/{root}", json={"parent_id": child})
+    assert response.status_code == 400
+    assert closure_rows(db) == before
+
+
+def test_parent_id_zero_means_top_level(client, db, make_activity):
+    root = make_activity("root")
+    child = make_activity("child", root)
+    zero = make_activity("zero", 0)
+
+    response = client.put(f"/api/activities/{child}", json={"parent_id": 0})
+    assert response.status_code == 200
+    assert response.json()["parent_id"] is None
+    db.rollback()
+    assert db.get(Activity, child).parent_id is None
+    assert db.get(Activity, zero).parent_id is None
+    assert_closure_matches_parents(db)
+
+
+def test_negative_parent_id_is_rejected(client, make_activity):
+    assert client.post("/api/activities/", json={"name": "x", "parent_id": -1}).status_code == 422
+
+
+def test_delete_reroots_children_and_keeps_their_subtrees(client, db, make_activity):
+    root = make_activity("root")
+    child = make_activity("child", root)
+    grandchild = make_activity("grandchild", child)
+
+    assert client.delete(f"/api/activities/{root}").status_code == 200
+    assert_closure_matches_parents(db)
+    assert (child, grandchild, 1) in closure_rows(db)
+    assert all(root not in (ancestor, descendant) for ancestor, descendant, _ in closure_rows(db))
+
+
+def test_tree_endpoint_follows_moves(client, make_activity):
+    a = make_activity("a")
+    b = make_activity("b")
+    child = make_activity("child", a)
+    client.put(f"/api/activities/{child}", json={"parent_id": b})
+
+    tree = {node["id"]: node for node in client.get("/api/activities/tree").json()}
+    assert tree[a]["children"] == []
+    assert [node["id"] for node in tree[b]["children"]] == [child]
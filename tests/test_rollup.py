@@ -0,0 +1,92 @@
+from collections import Counter
+from datetime import date
+
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import Activity, EventRollup
+from app.rollup import apply_rollup_deltas, check_rollup, rollup_upsert
+
+
+def assert_rollup_consistent(db):
+    db.rollback()
+    assert check_rollup(db) == {}
+
+
+def test_single_event_writes_keep_rollup_consistent(client, db, make_activity, make_event):
+    a = make_activity("a")
+    b = make_activity("b")
+    first = make_event(a, date(2024, 1, 31), 21)
+    make_event(a, date(2024, 2, 1), 22, status="completed")
+    assert_rollup_consistent(db)
+
+    # 跨月移动、改状态、换活动
+    response = client.put(f"/api/events/{first}", json={
+        "event_date": "2024-03-05", "time_slot": 51, "status": "completed", "activity_id": b
+    })
+    assert response.status_code == 200
+    assert_rollup_consistent(db)
+
+    # replace=true 替换已占用的时间槽
+    response = client.post("/api/events/?replace=true", json={
+        "activity_id": a, "event_date": "2024-03-05", "time_slot": 51
+    })
+    assert response.status_code == 200
+    assert_rollup_consistent(db)
+
+    assert client.delete(f"/api/events/{response.json()['id']}").status_code == 200
+    assert_rollup_consistent(db)
+
+
+def test_batch_and_activity_delete_keep_rollup_consistent(client, db, make_activity, make_event):
+    a = make_activity("a")
+    b = make_activity("b")
+    kept = make_event(a, date(2024, 5, 1), 21)
+    removed = make_event(b, date(2024, 5, 1), 22)
+
+    response = client.post("/api/events/batch", json={
+        "create": [{"activity_id": b, "event_date": f"2024-05-{day:02d}", "time_slot": 71} for day in range(1, 11)],
+        "update": [{"id": kept, "status": "completed", "event_date": "2024-06-01"}],
+        "delete": [removed]
+    })
+    assert response.status_code == 200
+    assert response.json()["committed"]
+    assert_rollup_consistent(db)
+
+    assert client.delete(f"/api/activities/{b}").status_code == 200
+    assert_rollup_consistent(db)
+
+
+def test_summary_counts_come_from_rollup(client, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2024, 1, 1), 21, status="completed")
+    make_event(a, date(2024, 1, 2), 21)
+    make_event(a, date(2024, 2, 1), 22)
+
+    summary = client.get("/api/statistics/summary").json()
+    assert summary["total_events"] == 3
+    assert summary["completed_events"] == 1
+    assert {row["time_slot"]: row["count"] for row in summary["timeslot_distribution"]} == {21: 2, 22: 1}
+
+    january = client.get("/api/statistics/summary?month=2024-01").json()
+    assert january["total_events"] == 2
+
+
+def test_rollup_writes_upsert_on_the_rollup_key(db):
+    db.add(Activity(id=1, name="a"))
+    db.commit()
+    key = (1, date(2024, 1, 1), 21, "planned")
+    other = sessionmaker(bind=db.get_bind())()
+
+    # 写入不先查询已有行，是插入还是累加由唯一索引决定（PostgreSQL 上并发的首次写入也只产生一行）
+    apply_rollup_deltas(db, Counter({key: 1}))
+    db.commit()
+    apply_rollup_deltas(other, Counter({key: 2, (1, date(2024, 1, 1), 22, "planned"): 1}))
+    other.commit()
+    other.close()
+    db.execute(rollup_upsert(db).values(
+        activity_id=1, bucket=date(2024, 1, 1), time_slot=21, status="planned", event_count=-1
+    ))
+    db.commit()
+
+    rows = db.query(EventRollup).filter(EventRollup.time_slot == 21).all()
+    assert [(row.status, row.event_count) for row in rows] == [("planned", 2)]
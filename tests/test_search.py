@@ -0,0 +1,29 @@
+from datetime import date
+
+
+def test_highlight_escapes_user_text(client, make_activity, make_event):
+    a = make_activity("<b>team</b>")
+    make_event(a, date(2024, 1, 1), 21, goal="<script>alert(1)</script> report <img src=x onerror=alert(1)>")
+
+    response = client.get("/api/search", params={"q": "report"})
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item["goal"] == (
+        "&lt;script&gt;alert(1)&lt;/script&gt; <mark>report</mark> &lt;img src=x onerror=alert(1)&gt;"
+    )
+    assert item["activity_name"] == "&lt;b&gt;team&lt;/b&gt;"
+
+
+def test_highlighted_terms_are_escaped_too(client, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2024, 1, 1), 21, goal="compare a<b and b>a")
+
+    [item] = client.get("/api/search", params={"q": "a<b"}).json()
+    assert item["goal"] == "compare <mark>a&lt;b</mark> and b&gt;a"
+
+
+def test_activity_results_are_escaped(client, make_activity):
+    make_activity("<script>plan</script>")
+
+    [item] = client.get("/api/search", params={"q": "plan", "type": "activity"}).json()
+    assert item["name"] == "&lt;script&gt;<mark>plan</mark>&lt;/script&gt;"
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.models import ScheduledEvent
+from app.slots import find_slot_conflicts, has_slot_index, install_slot_index, resolve_slot_conflicts
+
+
+def test_create_on_occupied_slot_is_rejected(client, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2024, 1, 1), 21)
+
+    response = client.post("/api/events/", json={"activity_id": a, "event_date": "2024-01-01", "time_slot": 21})
+    assert response.status_code == 400
+    assert len(client.get("/api/events/?start_date=2024-01-01&end_date=2024-01-01").json()) == 1
+
+
+def test_update_onto_occupied_slot_is_rejected(client, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2024, 1, 1), 21)
+    other = make_event(a, date(2024, 1, 1), 22)
+
+    response = client.put(f"/api/events/{other}", json={"time_slot": 21})
+    assert response.status_code == 400
+    assert client.get(f"/api/events/{other}").json()["time_slot"] == 22
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """没有时间槽唯一索引的旧数据库，2024-01-01 的 21 时段有三条日程，当天其余时间槽只剩一个空位"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE scheduled_events (id INTEGER PRIMARY KEY, activity_id INTEGER NOT NULL, "
+            "event_date DATE NOT NULL, time_slot INTEGER NOT NULL, goal TEXT, notes TEXT, status VARCHAR)"
+        ))
+        connection.execute(text(
+            "INSERT INTO scheduled_events (id, activity_id, event_date, time_slot, status) VALUES "
+            "(1, 1, '2024-01-01', 21, 'planned'), (2, 1, '2024-01-01', 21, 'planned'), "
+            "(3, 1, '2024-01-01', 21, 'completed'), (4, 1, '2024-01-01', 22, 'planned'), "
+            "(5, 1, '2024-01-01', 51, 'planned'), (6, 1, '2024-01-01', 52, 'planned'), "
+            "(7, 1, '2024-01-02', 21, 'planned')"
+        ))
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_install_refuses_to_index_conflicting_slots(legacy_db):
+    assert not has_slot_index(legacy_db)
+    assert find_slot_conflicts(legacy_db) == [(date(2024, 1, 1), 21, [1, 2, 3])]
+
+    with pytest.raises(RuntimeError):
+        install_slot_index(legacy_db)
+    legacy_db.rollback()
+    assert not has_slot_index(legacy_db)
+    assert legacy_db.query(ScheduledEvent).count() == 7
+
+
+def test_resolve_keeps_lowest_id_then_moves_or_deletes(legacy_db):
+    report = resolve_slot_conflicts(legacy_db)
+    assert report == [(2, "moved", 71), (3, "deleted", None)]
+    assert find_slot_conflicts(legacy_db) == []
+
+    assert install_slot_index(legacy_db)
+    legacy_db.commit()
+    assert has_slot_index(legacy_db)
+    assert not install_slot_index(legacy_db)
+
+
+def test_resolve_dry_run_leaves_data_unchanged(legacy_db):
+    resolve_slot_conflicts(legacy_db)
+    legacy_db.rollback()
+    assert find_slot_conflicts(legacy_db) == [(date(2024, 1, 1), 21, [1, 2, 3])]
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+
+def test_recurrence_occurrences_count_only_up_to_today(client, make_activity):
+    a = make_activity("a")
+    start = date.today() - timedelta(days=9)
+    response = client.post("/api/recurrences/", json={
+        "activity_id": a, "time_slot": 21, "freq": "daily",
+        "start_date": str(start), "until": str(start + timedelta(days=3000))
+    })
+    assert response.status_code == 200
+
+    summary = client.get("/api/statistics/summary").json()
+    assert summary["total_events"] == 10
+    assert client.get(f"/api/statistics/activities/{a}/statistics").json()["total_events"] == 10
+    tree = client.get("/api/statistics/activities/tree-statistics").json()
+    assert tree[0]["total_events"] == 10
+
+
+def test_until_must_be_bounded(client, make_activity):
+    a = make_activity("a")
+    response = client.post("/api/recurrences/", json={
+        "activity_id": a, "time_slot": 21, "freq": "daily", "start_date": "2024-01-01", "until": "2999-12-31"
+    })
+    assert response.status_code == 400
+
+
+def test_statistics_etag_includes_date_only_while_rules_exist(client, make_activity):
+    a = make_activity("a")
+    etag = client.get("/api/statistics/summary").headers["etag"]
+    assert date.today().isoformat() not in etag
+
+    client.post("/api/recurrences/", json={
+        "activity_id": a, "time_slot": 21, "freq": "weekly", "start_date": str(date.today())
+    })
+    response = client.get("/api/statistics/summary")
+    assert date.today().isoformat() in response.headers["etag"]
+    assert client.get("/api/statistics/summary", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
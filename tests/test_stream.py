@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+from dataclasses import replace
+
+import orjson
+
+from app import live
+from app.api.stream import event_stream
+from app.changelog import log_changes
+from app.database import get_async_db
+from app.live import change, change_feed
+from app.main import app
+from app.versioning import bump_data_version
+
+
+def session_scope():
+    return contextlib.asynccontextmanager(app.dependency_overrides[get_async_db])
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().splitlines())
+    return fields["event"], orjson.loads(fields["data"])
+
+
+def test_stream_reads_through_the_session_dependency(client, make_activity):
+    make_activity("a")
+
+    async def scenario():
+        stream = event_stream(session_scope(), None, None)
+        # 测试数据库的版本号；默认数据库没有建表，绕过依赖时这里会失败
+        assert parse(await stream.__anext__()) == ("ready", {"version": 1})
+        change_feed.publish(2, [change("activity", "update", 1)])
+        assert parse(await stream.__anext__()) == ("change", {
+            "version": 2, "changes": [{"entity": "activity", "op": "update", "id": 1}]
+        })
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert client.get("/api/stream", params={"start_date": "2024-01-02", "end_date": "2024-01-01"}).status_code == 400
+
+
+def test_watcher_forwards_foreign_writes(monkeypatch, client, db, make_activity):
+    monkeypatch.setattr(live, "settings", replace(live.settings, stream_poll_ms=20))
+    a = make_activity("a")
+
+    async def scenario():
+        stream = event_stream(session_scope(), None, None)
+        await stream.__anext__()
+        # 等后台轮询读到当前版本后，模拟另一个进程提交写入
+        await asyncio.sleep(0.1)
+        version = bump_data_version(db)
+        log_changes(db, version, [change("activity", "update", a)])
+        db.commit()
+        event, data = parse(await asyncio.wait_for(stream.__anext__(), 5))
+        await stream.aclose()
+        return event, data, version
+
+    event, data, version = asyncio.run(scenario())
+    assert (event, data) == ("change", {"version": version, "changes": [{"entity": "activity", "op": "upsert", "id": a}]})
+
+
+def test_local_versions_are_not_kept_without_polling(monkeypatch, client):
+    monkeypatch.setattr(live, "settings", replace(live.settings, stream_poll_ms=0))
+
+    async def scenario():
+        subscription = change_feed.subscribe(session_scope())
+        for version in range(1, 101):
+            change_feed.publish(version, [change("activity", "update", 1)])
+        await asyncio.sleep(0)
+        change_feed.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+    assert change_feed._local_versions == set()
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from app.changelog import compact_change_log
+from app.models.models import ChangeLogEntry
+
+
+def sync(client, since, **params):
+    response = client.get("/api/sync/changes", params={"since": since, **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def changes_by_key(body):
+    return {(item["entity"], item["id"]): item for item in body["changes"]}
+
+
+def test_full_sync_returns_live_rows_without_tombstones(client, make_activity, make_event):
+    a = make_activity("a")
+    kept = make_event(a, date(2024, 1, 1), 21)
+    removed = make_event(a, date(2024, 1, 1), 22)
+    client.delete(f"/api/events/{removed}")
+
+    body = sync(client, 0).json()
+    assert set(changes_by_key(body)) == {("activity", a), ("event", kept)}
+    assert body["next_since"] == body["version"]
+    assert changes_by_key(body)[("event", kept)]["data"]["time_slot"] == 21
+
+
+def test_delta_sync_returns_latest_state_and_tombstones(client, make_activity, make_event):
+    a = make_activity("a")
+    updated = make_event(a, date(2024, 1, 1), 21)
+    removed = make_event(a, date(2024, 1, 1), 22)
+    since = sync(client, 0).json()["next_since"]
+
+    client.put(f"/api/events/{updated}", json={"status": "completed"})
+    client.put(f"/api/events/{updated}", json={"time_slot": 51})
+    client.delete(f"/api/events/{removed}")
+    created = make_event(a, date(2024, 1, 2), 21)
+
+    body = sync(client, since).json()
+    changes = changes_by_key(body)
+    # 同一实体多次变更只保留最后一次
+    assert len(body["changes"]) == 3
+    assert changes[("event", updated)]["op"] == "upsert"
+    assert changes[("event", updated)]["data"]["status"] == "completed"
+    assert changes[("event", updated)]["data"]["time_slot"] == 51
+    assert changes[("event", removed)] == {
+        "entity": "event", "id": removed, "op": "delete", "version": changes[("event", removed)]["version"], "data": None
+    }
+    assert changes[("event", created)]["op"] == "upsert"
+
+    assert sync(client, body["next_since"]).json()["changes"] == []
+
+
+def test_activity_delete_logs_cascades_and_rerooted_children(client, make_activity, make_event):
+    parent = make_activity("parent")
+    child = make_activity("child", parent)
+    grandchild = make_activity("grandchild", child)
+    event = make_event(parent, date(2024, 1, 1), 21)
+    since = sync(client, 0).json()["next_since"]
+
+    assert client.delete(f"/api/activities/{parent}").status_code == 200
+
+    changes = changes_by_key(sync(client, since).json())
+    assert changes[("activity", parent)]["op"] == "delete"
+    assert changes[("event", event)]["op"] == "delete"
+    assert changes[("activity", child)]["op"] == "upsert"
+    assert changes[("activity", child)]["data"]["parent_id"] is None
+    # 孙活动的 parent_id 没有变化
+    assert ("activity", grandchild) not in changes
+
+
+def test_cursor_pages_through_every_change_once(client, make_activity, make_event):
+    a = make_activity("a")
+    created = {make_event(a, date(2024, 1, day), 21) for day in range(1, 12)}
+
+    seen = []
+    cursor = None
+    while True:
+        response = sync(client, 0, limit=4, **({"cursor": cursor} if cursor else {}))
+        body = response.json()
+        seen += [(item["entity"], item["id"]) for item in body["changes"]]
+        if not body["has_more"]:
+            break
+        assert body["next_since"] is None
+        cursor = response.headers["X-Next-Cursor"]
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) == {("activity", a)} | {("event", event_id) for event_id in created}
+
+
+def test_since_before_compaction_requires_full_resync(client, db, make_activity, make_event):
+    a = make_activity("a")
+    removed = make_event(a, date(2024, 1, 1), 21)
+    client.delete(f"/api/events/{removed}")
+    make_event(a, date(2024, 1, 2), 21)
+
+    db.execute(update(ChangeLogEntry).where(ChangeLogEntry.op == "delete").values(
+        changed_at=datetime.utcnow() - timedelta(days=30)
+    ))
+    assert compact_change_log(db, 7) == 1
+    db.commit()
+
+    assert client.get("/api/sync/changes", params={"since": 1}).status_code == 410
+    assert ("event", removed) not in changes_by_key(sync(client, 0).json())
@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+from app.api.statistics import MAX_TREND_BUCKETS
+
+
+def test_trends_reject_spans_beyond_bucket_limit(client, make_activity, make_event):
+    a = make_activity("a")
+    make_event(a, date(2000, 1, 1), 21)
+    make_event(a, date(2024, 1, 1), 21)
+
+    too_long = date(2024, 1, 1) - timedelta(days=MAX_TREND_BUCKETS)
+    assert client.get(f"/api/statistics/trends?granularity=day&start={too_long}&end=2024-01-01").status_code == 400
+    # 未指定首尾时由数据决定跨度
+    assert client.get("/api/statistics/trends?granularity=day").status_code == 400
+
+    response = client.get("/api/statistics/trends?granularity=month")
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert len(buckets) == 24 * 12 + 1
+    assert sum(bucket["total_events"] for bucket in buckets) == 2